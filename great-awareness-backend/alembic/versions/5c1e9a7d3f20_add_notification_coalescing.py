@@ -0,0 +1,34 @@
+"""Add notification coalescing columns
+
+Revision ID: 5c1e9a7d3f20
+Revises: 380a1c3e1941
+Create Date: 2026-10-19 09:12:44.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e9a7d3f20'
+down_revision: Union[str, None] = '380a1c3e1941'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('notifications') as batch_op:
+        batch_op.add_column(sa.Column('group_key', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('actor_count', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('latest_actors', sa.Text(), nullable=True))
+        batch_op.create_unique_constraint('_notification_user_group_uc', ['user_id', 'group_key'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('notifications') as batch_op:
+        batch_op.drop_constraint('_notification_user_group_uc', type_='unique')
+        batch_op.drop_column('latest_actors')
+        batch_op.drop_column('actor_count')
+        batch_op.drop_column('group_key')
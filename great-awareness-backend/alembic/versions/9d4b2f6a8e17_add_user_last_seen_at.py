@@ -0,0 +1,28 @@
+"""Add users.last_seen_at
+
+Revision ID: 9d4b2f6a8e17
+Revises: 5c1e9a7d3f20
+Create Date: 2026-10-19 14:03:27.561904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4b2f6a8e17'
+down_revision: Union[str, None] = '5c1e9a7d3f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('last_seen_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('last_seen_at')
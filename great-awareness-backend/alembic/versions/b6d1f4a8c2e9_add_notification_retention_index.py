@@ -0,0 +1,30 @@
+"""Add partial index for notification retention batches
+
+Revision ID: b6d1f4a8c2e9
+Revises: e3a7c5d9b214
+Create Date: 2026-10-19 16:41:09.273518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d1f4a8c2e9'
+down_revision: Union[str, None] = 'e3a7c5d9b214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    is_read = sa.column('is_read', sa.Boolean())
+    op.create_index(
+        'ix_notifications_retention', 'notifications', ['updated_at', 'id'],
+        postgresql_where=(is_read == sa.true()), sqlite_where=(is_read == sa.true())
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_retention', table_name='notifications')
@@ -0,0 +1,41 @@
+"""Add coalescing columns to the notification archive
+
+Revision ID: c8e2a5f1d736
+Revises: b6d1f4a8c2e9
+Create Date: 2026-10-19 18:05:31.640127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e2a5f1d736'
+down_revision: Union[str, None] = 'b6d1f4a8c2e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_archive() -> bool:
+    # The archive table is created by init_db, so only databases that already have one need the columns
+    return sa.inspect(op.get_bind()).has_table('notifications_archive')
+
+
+def upgrade() -> None:
+    if not _has_archive():
+        return
+    with op.batch_alter_table('notifications_archive') as batch_op:
+        batch_op.add_column(sa.Column('group_key', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('actor_count', sa.Integer(), server_default='1', nullable=False))
+        batch_op.add_column(sa.Column('latest_actors', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    if not _has_archive():
+        return
+    with op.batch_alter_table('notifications_archive') as batch_op:
+        batch_op.drop_column('latest_actors')
+        batch_op.drop_column('actor_count')
+        batch_op.drop_column('group_key')
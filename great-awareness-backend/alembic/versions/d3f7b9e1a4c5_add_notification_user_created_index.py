@@ -0,0 +1,26 @@
+"""Add (user_id, created_at) index for the notifications page
+
+Revision ID: d3f7b9e1a4c5
+Revises: c8e2a5f1d736
+Create Date: 2026-10-19 18:42:17.905361
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f7b9e1a4c5'
+down_revision: Union[str, None] = 'c8e2a5f1d736'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_notifications_user_created', 'notifications', ['user_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_user_created', table_name='notifications')
@@ -0,0 +1,41 @@
+"""Add users.streak_started_at and unique user milestones
+
+Revision ID: e3a7c5d9b214
+Revises: 9d4b2f6a8e17
+Create Date: 2026-10-19 15:21:08.407713
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a7c5d9b214'
+down_revision: Union[str, None] = '9d4b2f6a8e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('streak_started_at', sa.DateTime(timezone=True), nullable=True))
+
+    # user_milestones is created by init_db, so it may not exist yet
+    if 'user_milestones' in sa.inspect(op.get_bind()).get_table_names():
+        op.execute(
+            "DELETE FROM user_milestones WHERE id NOT IN "
+            "(SELECT MIN(id) FROM user_milestones GROUP BY user_id, milestone_id)"
+        )
+        with op.batch_alter_table('user_milestones') as batch_op:
+            batch_op.create_unique_constraint('_user_milestone_uc', ['user_id', 'milestone_id'])
+
+
+def downgrade() -> None:
+    if 'user_milestones' in sa.inspect(op.get_bind()).get_table_names():
+        with op.batch_alter_table('user_milestones') as batch_op:
+            batch_op.drop_constraint('_user_milestone_uc', type_='unique')
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('streak_started_at')
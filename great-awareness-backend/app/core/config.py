@@ -47,9 +47,90 @@ class Settings(BaseSettings):
     user_status_active: str = "active"
     user_status_inactive: str = "inactive"
     user_status_suspended: str = "suspended"
-    
 
-    
+    # Background Jobs (intervals in seconds, 0 disables the job)
+    facet_reconcile_interval_seconds: int = 3600
+    question_stats_refresh_interval_seconds: int = 60
+    related_index_sync_interval_seconds: int = 60
+    notification_unread_reconcile_interval_seconds: int = 3600
+    notification_retention_interval_seconds: int = 3600
+    outbox_purge_interval_seconds: int = 3600
+    analytics_rollup_interval_seconds: int = 300
+    activity_flush_interval_seconds: int = 60
+    milestone_unlock_interval_seconds: int = 300
+
+    # Related questions: every worker holds a 1 KiB float32 vector per published question (about
+    # 1 GiB at 1M questions). The hourly full rebuild builds a second index beside the live one,
+    # doubling that while it runs, so above this many indexed questions it is skipped and only
+    # deleted questions are pruned from the live index
+    related_index_full_rebuild_max_questions: int = 100000
+
+    # Milestone unlocking: users are scanned in primary-key ranges of this size, one commit per range
+    milestone_unlock_batch_size: int = 50000
+
+    # Notification retention: read notifications untouched for this many days are deleted (or archived)
+    notification_retention_days: int = 90
+    notification_retention_archive: bool = False
+    notification_retention_batch_size: int = 1000
+    notification_retention_pause_seconds: float = 0.1
+    notification_retention_max_seconds: float = 300
+
+    # Metrics: with several uvicorn workers, point metrics_multiprocess_dir at a directory
+    # shared by them so /metrics aggregates every worker. Each worker writes <pid>.json there;
+    # files of exited workers are folded into compacted.json (counters and histograms only).
+    # Outside development metrics are only collected and served when metrics_token is set;
+    # scrapers send it as a bearer token.
+    metrics_enabled: bool = True
+    metrics_multiprocess_dir: str = ""
+    metrics_write_interval_seconds: float = 5
+    metrics_token: str = ""
+
+    # Tracing: a tracing_sample_rate fraction of requests (plus any with a sampled traceparent header)
+    # is traced; spans are written as OTLP/JSON lines and/or POSTed to an OTLP/HTTP collector
+    tracing_enabled: bool = False
+    tracing_sample_rate: float = 0.01
+    tracing_export_path: str = "/tmp/gwa-traces.jsonl"
+    tracing_otlp_endpoint: str = ""
+    tracing_export_interval_seconds: float = 2
+
+    # Health: a background probe runs SELECT 1 on its own connection every interval; /health and
+    # /health/ready fail when it failed or is older than health_stale_after_seconds, and
+    # /health/ready also when the pool is this saturated
+    health_probe_interval_seconds: float = 5
+    health_probe_timeout_seconds: float = 2
+    health_stale_after_seconds: float = 15
+    health_pool_saturation: float = 1.0
+
+    # Slow queries: statements slower than the threshold are logged and aggregated by shape
+    # (see /api/admin/slow-queries); shapes slow slow_query_explain_after times get their plan captured
+    slow_query_enabled: bool = True
+    slow_query_threshold_seconds: float = 0.2
+    slow_query_explain_after: int = 3
+    slow_query_max_shapes: int = 500
+    slow_query_explain_interval_seconds: int = 30
+
+    # Profiling: admins can profile one request by sending an "X-Profile: 1" header (or ?_profile=1);
+    # the newest profiling_max_profiles profiles are kept in profiling_dir
+    profiling_enabled: bool = False
+    profiling_dir: str = "/tmp/gwa-profiles"
+    profiling_max_profiles: int = 50
+    profiling_interval_seconds: float = 0.001
+    profiling_max_seconds: float = 30
+
+    # Repeated like/comment notifications on one target within this window are merged into one row
+    notification_coalesce_window_seconds: int = 86400
+
+    # Outbox dispatcher: side effects recorded with domain writes and processed in the background
+    outbox_batch_size: int = 100
+    outbox_poll_interval_seconds: float = 1.0
+    outbox_max_attempts: int = 8
+    outbox_retry_base_seconds: float = 2.0
+
+    # Real-time push: "memory" (single worker), "socket" (workers on one host) or "postgres" (LISTEN/NOTIFY)
+    pubsub_backend: str = "memory"
+    pubsub_socket_dir: str = "/tmp/gwa-pubsub"
+
+
     @property
     def database_uri(self) -> str:
         """Get the appropriate database URL based on environment"""
@@ -58,6 +139,11 @@ class Settings(BaseSettings):
             return self.database_url_neon
         return self.database_url
     
+    @property
+    def metrics_served(self) -> bool:
+        """Whether /metrics is served: enabled, and token-protected unless in development"""
+        return self.metrics_enabled and (bool(self.metrics_token) or self.environment == "development")
+
     @property
     def sqlalchemy_database_uri(self) -> str:
         """Get SQLAlchemy compatible database URL"""
@@ -1,9 +1,12 @@
-from sqlalchemy import create_engine, MetaData
+from contextlib import contextmanager
+from typing import Iterator
+from sqlalchemy import create_engine, MetaData, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 from app.core.config import settings
 import logging
+import zlib
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -56,6 +59,38 @@ def get_db() -> Session:
     finally:
         db.close()
 
+def dialect_insert(db: Session):
+    """Return the dialect-specific `insert` construct (supports ON CONFLICT upserts)"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+@contextmanager
+def advisory_lock(name: str) -> Iterator[bool]:
+    """Try to take the database-wide lock `name` for the duration of the block.
+
+    Yields True when the lock was taken and False when another process
+    (another uvicorn worker, a CLI run) holds it. On PostgreSQL this is a
+    session-level pg_try_advisory_lock held on a dedicated connection, so
+    the caller's session may commit as often as it likes. Elsewhere (SQLite,
+    a single process) it is a no-op that always yields True.
+    """
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    key = zlib.crc32(name.encode())
+    with engine.connect() as connection:
+        acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar()
+        connection.commit()  # don't sit idle in a transaction while the caller works
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+                connection.commit()
+
 def init_db():
     """Initialize database tables"""
     try:
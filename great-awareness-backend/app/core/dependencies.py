@@ -4,19 +4,18 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.config import settings
 from app.models.user_model import User
+from app.services.activity_tracker import activity_tracker
 import jwt
 from datetime import datetime
+from typing import Optional
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current user from JWT token"""
+def authenticate_token(token: str, db: Session) -> User:
+    """Resolve the active user for a JWT access token"""
     try:
         # Decode JWT token
-        token = credentials.credentials
         payload = jwt.decode(
             token, 
             settings.secret_key, 
@@ -49,6 +48,9 @@ def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
+        # In-memory only; written to the database by the activity_flush job
+        activity_tracker.record(user.id)
+        
         return user
         
     except jwt.ExpiredSignatureError:
@@ -64,11 +66,20 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_optional_current_user(
+def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
+    """Get current user from JWT token"""
+    return authenticate_token(credentials.credentials, db)
+
+def get_optional_current_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+) -> Optional[User]:
     """Get current user from JWT token (optional)"""
+    if credentials is None:
+        return None
     try:
         return get_current_user(credentials, db)
     except HTTPException:
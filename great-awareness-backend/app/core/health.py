@@ -0,0 +1,157 @@
+"""Background database health probing for the health endpoints.
+
+``HealthProber`` runs ``SELECT 1`` every ``interval`` seconds on its own
+connection (outside the request pool, so probes never wait behind real
+traffic and never hold a pool slot) and caches the outcome. The health
+endpoints only read that cached state:
+
+- liveness: the process is up and its event loop is serving requests;
+- health: the latest probe succeeded and is recent;
+- readiness: healthy, and the request pool still has free connections.
+
+Pool saturation is a load-balancing signal (send traffic elsewhere for
+now), not a fault: platform health checks that restart or withhold
+deploys should use liveness or health, never readiness.
+
+A probe that does not finish within ``timeout`` counts as a failure;
+while it is still hanging, later probes are skipped and reported as
+failures too.
+"""
+from datetime import datetime
+from typing import Optional
+import asyncio
+import logging
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProber:
+    def __init__(self):
+        self.interval = 5.0
+        self.timeout = 2.0
+        self.stale_after = 15.0
+        self.pool_saturation = 1.0
+        self.started_at = time.monotonic()
+        self.last_probe_at: Optional[datetime] = None
+        self.last_probe_monotonic: Optional[float] = None
+        self.last_ok = False
+        self.last_latency_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.consecutive_failures = 0
+        self._engine: Optional[Engine] = None
+        self._pool_engine: Optional[Engine] = None
+        self._probing = False
+        self._task: Optional[asyncio.Task] = None
+
+    def configure(self, engine: Engine, interval: float, timeout: float, stale_after: float, pool_saturation: float):
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.pool_saturation = pool_saturation
+        self._pool_engine = engine
+        connect_args = {}
+        if engine.dialect.name == "postgresql":
+            timeout_ms = int(timeout * 1000)
+            connect_args = {"connect_timeout": max(int(timeout), 1), "options": f"-c statement_timeout={timeout_ms}"}
+        elif engine.dialect.name == "sqlite":
+            connect_args = {"check_same_thread": False, "timeout": timeout}
+        # A fresh connection per probe: no pool slot taken, and no stale pooled connection reused
+        self._engine = create_engine(engine.url, poolclass=NullPool, connect_args=connect_args)
+
+    def _probe(self):
+        with self._engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    def _record(self, ok: bool, latency: Optional[float], error: Optional[str]):
+        self.last_probe_at = datetime.utcnow()
+        self.last_probe_monotonic = time.monotonic()
+        self.last_ok = ok
+        self.last_latency_seconds = latency
+        self.last_error = error
+        self.consecutive_failures = 0 if ok else self.consecutive_failures + 1
+        if not ok:
+            logger.error(f"Database health probe failed: {error}")
+
+    async def probe_once(self):
+        if self._probing:
+            self._record(False, None, "Previous probe still running")
+            return
+        self._probing = True
+        started = time.perf_counter()
+        task = asyncio.ensure_future(asyncio.to_thread(self._probe))
+        # Clear the flag only once the thread is done, even after a timeout
+        task.add_done_callback(lambda _: setattr(self, "_probing", False))
+        try:
+            await asyncio.wait_for(asyncio.shield(task), self.timeout)
+            self._record(True, time.perf_counter() - started, None)
+        except asyncio.TimeoutError:
+            self._record(False, None, f"Probe timed out after {self.timeout}s")
+        except Exception as e:
+            self._record(False, time.perf_counter() - started, str(e))
+
+    def pool_status(self) -> dict:
+        pool = self._pool_engine.pool if self._pool_engine is not None else None
+        size = getattr(pool, "size", None)
+        checkedout = getattr(pool, "checkedout", None)
+        if size is None or checkedout is None:
+            return {"in_use": None, "capacity": None, "saturated": False}
+        capacity = size() + max(getattr(pool, "_max_overflow", 0), 0)
+        in_use = checkedout()
+        return {"in_use": in_use, "capacity": capacity, "saturated": capacity > 0 and in_use >= capacity * self.pool_saturation}
+
+    def liveness(self) -> dict:
+        return {"status": "alive", "uptime_seconds": round(time.monotonic() - self.started_at, 1)}
+
+    def readiness(self) -> dict:
+        """Cached readiness; `ready` is False until the first probe has succeeded"""
+        age = time.monotonic() - self.last_probe_monotonic if self.last_probe_monotonic is not None else None
+        pool = self.pool_status()
+        reasons = []
+        if age is None:
+            reasons.append("database not probed yet")
+        elif not self.last_ok:
+            reasons.append(f"database probe failed: {self.last_error}")
+        elif age > self.stale_after:
+            reasons.append(f"last database probe is {age:.0f}s old")
+        healthy = not reasons
+        if pool["saturated"]:
+            reasons.append("connection pool saturated")
+        return {
+            "ready": not reasons,
+            "healthy": healthy,
+            "reasons": reasons,
+            "database": {
+                "ok": self.last_ok,
+                "last_probe_at": self.last_probe_at.isoformat() + "Z" if self.last_probe_at else None,
+                "age_seconds": round(age, 1) if age is not None else None,
+                "latency_ms": round(self.last_latency_seconds * 1000, 2) if self.last_latency_seconds is not None else None,
+                "consecutive_failures": self.consecutive_failures,
+                "error": self.last_error,
+            },
+            "pool": pool,
+        }
+
+    async def start(self):
+        await self.probe_once()  # ready as soon as startup completes
+        self._task = asyncio.create_task(self._run(), name="health-prober")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._engine is not None:
+            self._engine.dispose()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.probe_once()
+
+
+prober = HealthProber()
@@ -0,0 +1,489 @@
+"""In-process metrics with Prometheus text exposition.
+
+Request counts, latency and DB time are recorded by ``MetricsMiddleware``
+and the engine hooks installed by ``instrument_engine``; point-in-time
+values (pool, caches, thread pool, jobs) are read by collectors when a
+snapshot is taken. Recording is a dict lookup and a few additions under a
+lock, a few microseconds per request.
+
+With several uvicorn workers, set ``metrics_multiprocess_dir`` to a
+directory shared by them: every worker writes its snapshot there
+periodically and ``/metrics`` merges all files, summing counters and
+histograms and labelling gauges with the worker pid. Files of workers
+that have exited (including an earlier process whose pid a new worker
+reuses) are folded into one ``compacted.json`` holding their counters and
+histograms, so totals survive restarts and the directory does not grow.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.cache import all_caches
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+COMPACTED_FILE = "compacted.json"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+
+class Counter(_Metric):
+    """Monotonic total per label set; summed across workers"""
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def set(self, labels: LabelValues, value: float):
+        """Mirror a total kept elsewhere (e.g. cache hit counts)"""
+        with self._lock:
+            self._values[labels] = value
+
+    def samples(self) -> list:
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Point-in-time value; per worker (pid label) when aggregated"""
+    type = "gauge"
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    """Bucketed observations per label set; summed across workers"""
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, labels: LabelValues, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> list:
+        with self._lock:
+            return [[list(labels), list(counts), total, count] for labels, (counts, total, count) in self._values.items()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """Register a function that updates gauges just before each snapshot"""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        return {
+            "pid": os.getpid(),
+            "metrics": {
+                metric.name: {
+                    "type": metric.type,
+                    "help": metric.help,
+                    "labelnames": list(metric.labelnames),
+                    "buckets": list(getattr(metric, "buckets", ())),
+                    "samples": metric.samples(),
+                }
+                for metric in self._metrics.values()
+            },
+        }
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")))
+http_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")))
+http_db_time = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL per HTTP request", ("method", "route"), DB_BUCKETS))
+db_statements = registry.register(Counter(
+    "db_statements_total", "SQL statements executed"))
+db_pool = registry.register(Gauge(
+    "db_pool_connections", "SQLAlchemy pool connections by state", ("state",)))
+cache_hits = registry.register(Counter(
+    "cache_hits_total", "In-process cache hits", ("cache",)))
+cache_misses = registry.register(Counter(
+    "cache_misses_total", "In-process cache misses", ("cache",)))
+cache_hit_ratio = registry.register(Gauge(
+    "cache_hit_ratio", "In-process cache hit ratio since start", ("cache",)))
+cache_entries = registry.register(Gauge(
+    "cache_entries", "In-process cache size", ("cache",)))
+threadpool_busy = registry.register(Gauge(
+    "threadpool_busy_threads", "Worker threads running sync endpoints and jobs"))
+threadpool_waiting = registry.register(Gauge(
+    "threadpool_waiting_tasks", "Tasks queued for a worker thread"))
+job_runs = registry.register(Counter(
+    "background_job_runs_total", "Successful background job runs", ("job",)))
+job_failing = registry.register(Gauge(
+    "background_job_failing", "1 when the job's last run failed", ("job",)))
+outbox_lag = registry.register(Gauge(
+    "outbox_lag_seconds", "Age of the oldest due outbox event at the last dispatch"))
+outbox_processed = registry.register(Counter(
+    "outbox_events_processed_total", "Outbox events handled by this worker's dispatcher", ("result",)))
+activity_pending = registry.register(Gauge(
+    "activity_pending_users", "Last-seen updates waiting for the next activity flush"))
+
+# [seconds, statements] for the request being handled, shared with the threads it uses
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+
+def instrument_engine(engine: Engine):
+    """Attribute SQL time to the current request"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["metrics_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        db_statements.inc()
+        current = _request_db.get()
+        if current is not None:
+            current[0] += time.perf_counter() - conn.info["metrics_started"]
+            current[1] += 1
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route counts, latency and DB time"""
+
+    def __init__(self, app):
+        self.app = app
+        self._routes: Optional[Dict[Callable, str]] = None
+
+    def _route_label(self, scope) -> str:
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if getattr(route, "endpoint", None) is not None
+            }
+        # Templates, not raw paths, so ids don't explode the label set
+        return self._routes.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        db_time = [0.0, 0]
+        token = _request_db.set(db_time)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_db.reset(token)
+            labels = (scope["method"], self._route_label(scope))
+            http_duration.observe(labels, time.perf_counter() - started)
+            http_db_time.observe(labels, db_time[0])
+            http_requests.inc(labels + (str(status_code),))
+
+
+def collect_core(engine: Engine):
+    """Collector for the pool, caches, thread pool and background jobs"""
+    from app.core import scheduler
+
+    def collect():
+        pool = engine.pool
+        db_pool.clear()
+        for state in ("size", "checkedin", "checkedout", "overflow"):
+            reader = getattr(pool, state, None)
+            if reader is not None:
+                db_pool.set((state,), reader())
+
+        for name, cache in all_caches().items():
+            stats = cache.stats()
+            cache_hits.set((name,), stats["hits"])
+            cache_misses.set((name,), stats["misses"])
+            cache_hit_ratio.set((name,), stats["hit_ratio"])
+            cache_entries.set((name,), stats["size"])
+
+        try:
+            from anyio import to_thread
+            limiter = to_thread.current_default_thread_limiter()
+            threadpool_busy.set((), limiter.borrowed_tokens)
+            threadpool_waiting.set((), limiter.statistics().tasks_waiting)
+        except RuntimeError:
+            pass  # not on the event loop thread; keep the last values
+
+        job_failing.clear()
+        for job in scheduler.get_job_status():
+            job_runs.set((job["name"],), job["runs"])
+            job_failing.set((job["name"],), 1 if job["last_error"] else 0)
+
+    return collect
+
+
+def collect_services():
+    """Collector for the outbox dispatcher and activity tracker"""
+    from app.services import outbox
+    from app.services.activity_tracker import activity_tracker
+
+    stats = outbox.dispatcher.stats()
+    outbox_lag.set((), stats["lag_seconds"])
+    outbox_processed.set(("done",), stats["processed"])
+    outbox_processed.set(("retried",), stats["retried"])
+    outbox_processed.set(("failed",), stats["failed"])
+    activity_pending.set((), activity_tracker.pending())
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def merge_snapshots(snapshots: List[dict], live_pids: Optional[set] = None, label_pid: bool = False) -> Dict[str, dict]:
+    """Combine worker snapshots; gauges of workers not in `live_pids` are dropped"""
+    merged: Dict[str, dict] = {}
+    for snapshot in snapshots:
+        pid = snapshot["pid"]
+        for name, metric in snapshot["metrics"].items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            values = target["values"]
+            if metric["type"] == "gauge":
+                if live_pids is not None and pid not in live_pids:
+                    continue
+                target["labelnames"] = metric["labelnames"] + (["pid"] if label_pid else [])
+                for labels, value in metric["samples"]:
+                    values[tuple(labels) + ((str(pid),) if label_pid else ())] = value
+            elif metric["type"] == "counter":
+                for labels, value in metric["samples"]:
+                    values[tuple(labels)] = values.get(tuple(labels), 0.0) + value
+            else:
+                for labels, counts, total, count in metric["samples"]:
+                    entry = values.setdefault(tuple(labels), [[0] * len(counts), 0.0, 0])
+                    entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                    entry[1] += total
+                    entry[2] += count
+    return merged
+
+
+def fold_snapshots(snapshots: List[dict]) -> dict:
+    """One snapshot holding the summed counters and histograms of `snapshots`; gauges are dropped"""
+    metrics = {}
+    for name, metric in merge_snapshots(snapshots, live_pids=set()).items():
+        if metric["type"] == "gauge":
+            continue
+        if metric["type"] == "counter":
+            samples = [[list(labels), value] for labels, value in metric["values"].items()]
+        else:
+            samples = [[list(labels), counts, total, count] for labels, (counts, total, count) in metric["values"].items()]
+        metrics[name] = {key: metric[key] for key in ("type", "help", "labelnames", "buckets")}
+        metrics[name]["samples"] = samples
+    return {"pid": 0, "metrics": metrics}
+
+
+def render(merged: Dict[str, dict]) -> str:
+    """Prometheus text exposition format"""
+    lines = []
+    for name, metric in merged.items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+        for labels, value in metric["values"].items():
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(list(metric["buckets"]) + [float("inf")], counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(list(labelnames) + ['le'], list(labels) + [le])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labelnames, labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MultiprocessWriter:
+    """Periodically writes this worker's snapshot to a shared directory"""
+
+    def __init__(self):
+        self.directory = ""
+        self.interval = 5.0
+        self._task: Optional[asyncio.Task] = None
+
+    def configure(self, directory: str, interval: float):
+        self.directory = directory
+        self.interval = interval
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _write_file(self, path: str, snapshot: dict):
+        temp = f"{path}.tmp"
+        with open(temp, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(temp, path)
+
+    def write(self):
+        """Atomically replace this worker's snapshot file"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._write_file(os.path.join(self.directory, f"{os.getpid()}.json"), registry.snapshot())
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        """Readers share the directory; compaction (replace, then delete) holds it alone"""
+        import fcntl  # POSIX only; imported here so the module still loads elsewhere
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _load(self, paths: List[str]) -> List[dict]:
+        snapshots = []
+        for path in paths:
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping metrics file {path}: {e}")
+        return snapshots
+
+    def read_all(self) -> List[dict]:
+        with self._locked(exclusive=False):
+            return self._load(glob.glob(os.path.join(self.directory, "*.json")))
+
+    def compact(self, starting: bool = False) -> int:
+        """Fold the files of exited workers into COMPACTED_FILE and delete them.
+
+        On `starting`, a file named after this process's pid was left by an
+        earlier process with the same pid, so it is folded before this
+        worker overwrites it. Returns the number of files folded.
+        """
+        pid = os.getpid()
+        with self._locked(exclusive=True):
+            dead = []
+            for path in glob.glob(os.path.join(self.directory, "*.json")):
+                name = os.path.basename(path)[:-len(".json")]
+                if not name.isdigit():
+                    continue
+                owner = int(name)
+                if (owner == pid and starting) or (owner != pid and not _pid_alive(owner)):
+                    dead.append(path)
+            if not dead:
+                return 0
+            compacted = os.path.join(self.directory, COMPACTED_FILE)
+            existing = [compacted] if os.path.exists(compacted) else []
+            self._write_file(compacted, fold_snapshots(self._load(existing + dead)))
+            for path in dead:
+                os.remove(path)
+        logger.info(f"Compacted metrics of {len(dead)} exited workers")
+        return len(dead)
+
+    async def start(self):
+        if self.enabled:
+            self.compact(starting=True)
+            self._task = asyncio.create_task(self._run(), name="metrics-writer")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            self.write()  # keep this worker's final counters
+
+    async def _run(self):
+        while True:
+            try:
+                self.write()
+            except Exception as e:
+                logger.error(f"Failed to write metrics snapshot: {e}")
+            await asyncio.sleep(self.interval)
+
+
+writer = MultiprocessWriter()
+
+
+def exposition() -> str:
+    """Metrics for this worker, or for all workers when a shared directory is configured"""
+    if not writer.enabled:
+        return render(merge_snapshots([registry.snapshot()]))
+    writer.compact()
+    writer.write()
+    snapshots = writer.read_all()
+    live = {snapshot["pid"] for snapshot in snapshots if _pid_alive(snapshot["pid"])}
+    return render(merge_snapshots(snapshots, live, label_pid=True))
@@ -0,0 +1,263 @@
+"""On-demand sampling profiler for single requests.
+
+An admin adds an ``X-Profile: 1`` header (or a ``_profile=1`` query
+parameter) to a request; ``ProfilingMiddleware`` then runs a sampler
+thread for as long as the request takes. Every ``interval`` it records
+the Python stack of each busy thread (the event loop and threadpool
+workers running sync endpoints and dependencies), so concurrent requests
+on the same worker show up too; idle waits are dropped. The response
+carries an ``X-Profile-Id`` header naming the stored profile.
+
+Profiles are kept as collapsed stacks in a bounded on-disk ring
+(``ProfileStore``) and can be downloaded as collapsed text (for
+flamegraph.pl / speedscope) or speedscope JSON from the admin API.
+
+The middleware is only installed when profiling is enabled; when it is,
+requests without the flag cost one header scan.
+"""
+from collections import Counter
+from typing import List, Optional
+from urllib.parse import parse_qs
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+from app.core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = "_profile"
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{13}-[0-9a-f]{8}$")
+
+# Leaf frames of threads waiting for work rather than doing it
+IDLE_FRAMES = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get")}
+
+
+def _stack(frame) -> Optional[str]:
+    """Root-first collapsed stack of `frame`, None when the thread is idle"""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+        return None
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Sampler(threading.Thread):
+    """Samples every other thread's stack each `interval` seconds until stopped"""
+
+    def __init__(self, interval: float, max_seconds: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        names = {}
+        deadline = time.perf_counter() + self.max_seconds
+        while not self._stopped.wait(self.interval) and time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = _stack(frame)
+                if stack is None:
+                    continue
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                self.stacks[f"{names.get(thread_id, thread_id)};{stack}"] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class ProfileStore:
+    """Profiles as JSON files in one directory, oldest removed beyond `max_profiles`"""
+
+    def __init__(self):
+        self.directory = "/tmp/gwa-profiles"
+        self.max_profiles = 50
+
+    def configure(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    @staticmethod
+    def new_id() -> str:
+        # Sorts by creation time, which is what the ring relies on
+        return f"{int(time.time() * 1000):013d}-{os.urandom(4).hex()}"
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def _ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.directory)
+                      if name.endswith(".json") and PROFILE_ID_PATTERN.match(name[:-5]))
+
+    def save(self, profile: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(profile["id"])
+        with open(path + ".tmp", "w") as f:
+            json.dump(profile, f)
+        os.replace(path + ".tmp", path)
+        ids = self._ids()
+        for old in ids[:max(len(ids) - self.max_profiles, 0)]:
+            try:
+                os.remove(self._path(old))
+            except FileNotFoundError:
+                pass  # pruned by another worker
+
+    def load(self, profile_id: str) -> Optional[dict]:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def list(self) -> List[dict]:
+        """Profile metadata, newest first"""
+        summaries = []
+        for profile_id in reversed(self._ids()):
+            profile = self.load(profile_id)
+            if profile is not None:
+                profile.pop("stacks", None)
+                summaries.append(profile)
+        return summaries
+
+
+store = ProfileStore()
+
+
+def to_collapsed(profile: dict) -> str:
+    """Brendan Gregg's collapsed format: one "frame;frame;frame count" line per stack"""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
+
+
+def to_speedscope(profile: dict) -> dict:
+    """A speedscope sampled profile, weights in milliseconds"""
+    frames, index, samples, weights = [], {}, [], []
+    interval_ms = profile["interval_ms"]
+    for stack, count in profile["stacks"].items():
+        sample = []
+        for name in stack.split(";"):
+            if name not in index:
+                index[name] = len(frames)
+                frames.append({"name": name})
+            sample.append(index[name])
+        samples.append(sample)
+        weights.append(count * interval_ms)
+    name = f"{profile['method']} {profile['path']}"
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "great-awareness-backend",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+def _is_admin(token: str) -> bool:
+    from app.core.dependencies import authenticate_token
+
+    db = SessionLocal()
+    try:
+        return authenticate_token(token, db).role == "admin"
+    except HTTPException:
+        return False
+    finally:
+        db.close()
+
+
+def _requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return value not in (b"", b"0")
+    query = scope.get("query_string", b"")
+    if PROFILE_QUERY.encode() in query:
+        return parse_qs(query.decode("latin-1")).get(PROFILE_QUERY, ["0"])[0] not in ("", "0")
+    return False
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling flagged requests from admins"""
+
+    def __init__(self, app, interval: float = 0.001, max_seconds: float = 30):
+        self.app = app
+        self.interval = interval
+        self.max_seconds = max_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+        token = authorization[7:] if authorization.lower().startswith("bearer ") else ""
+        if not token or not await asyncio.to_thread(_is_admin, token):
+            response = JSONResponse({"detail": "Admin access required"}, status_code=403)
+            await response(scope, receive, send)
+            return
+
+        profile_id = store.new_id()
+        status_code = 500
+
+        async def send_with_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        sampler = Sampler(self.interval, self.max_seconds)
+        started_at = time.time()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            sampler.stop()
+            duration = time.perf_counter() - started
+            profile = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status_code": status_code,
+                "started_at": started_at,
+                "duration_ms": duration * 1000,
+                # Measured rather than configured: each sample also costs time
+                "interval_ms": duration * 1000 / sampler.samples if sampler.samples else self.interval * 1000,
+                "samples": sampler.samples,
+                "stacks": dict(sampler.stacks),
+            }
+            try:
+                await asyncio.to_thread(store.save, profile)
+            except Exception as e:
+                logger.error(f"Failed to store profile {profile_id}: {e}")
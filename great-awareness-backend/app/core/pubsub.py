@@ -0,0 +1,279 @@
+"""In-process pub/sub hub for pushing events to connected users.
+
+Every worker keeps its own WebSocket/SSE subscribers. Events are
+published through a backend so they also reach users connected to other
+workers:
+
+- ``memory``: single process only, events are delivered directly.
+- ``socket``: workers on one host exchange datagrams over Unix sockets
+  in a shared directory.
+- ``postgres``: events travel over Postgres LISTEN/NOTIFY.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+import asyncio
+import json
+import logging
+import os
+import socket
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 100
+NOTIFY_CHANNEL = "gwa_events"
+MAX_DATAGRAM = 65536
+
+Deliver = Callable[[Dict[str, Any]], None]
+
+
+class MemoryBackend:
+    """Delivers published events straight back to this process"""
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        pass
+
+    def publish(self, message: Dict[str, Any]):
+        self._deliver(message)
+
+
+class LocalSocketBackend:
+    """Fans events out to every worker on the host via Unix datagram sockets.
+
+    Each worker binds ``<directory>/worker-<pid>.sock``; publishing sends
+    one datagram to every socket in the directory, including its own.
+    Sockets left behind by dead workers are removed on first refusal.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._path: Optional[str] = None
+        self._sock: Optional[socket.socket] = None
+        self._send_sock: Optional[socket.socket] = None
+
+    async def start(self, deliver: Deliver):
+        os.makedirs(self.directory, exist_ok=True)
+        self._path = os.path.join(self.directory, f"worker-{os.getpid()}.sock")
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self._path)
+        self._sock.setblocking(False)
+        self._send_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._send_sock.setblocking(False)
+
+        def on_readable():
+            while True:
+                try:
+                    data = self._sock.recv(MAX_DATAGRAM)
+                except (BlockingIOError, InterruptedError):
+                    return
+                try:
+                    deliver(json.loads(data))
+                except ValueError:
+                    logger.warning("Dropped malformed pub/sub datagram")
+
+        asyncio.get_running_loop().add_reader(self._sock.fileno(), on_readable)
+        logger.info(f"Pub/sub listening on {self._path}")
+
+    async def stop(self):
+        if self._sock is not None:
+            asyncio.get_running_loop().remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._send_sock.close()
+            self._sock = None
+        if self._path and os.path.exists(self._path):
+            os.unlink(self._path)
+
+    def publish(self, message: Dict[str, Any]):
+        data = json.dumps(message).encode()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".sock"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                self._send_sock.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                if path != self._path:
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+            except BlockingIOError:
+                logger.warning(f"Pub/sub receiver {name} is not keeping up; event dropped")
+
+
+class PostgresBackend:
+    """Carries events over Postgres LISTEN/NOTIFY so every worker on any host receives them"""
+
+    RECONNECT_SECONDS = 5
+
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._listen_conn = None
+        self._publish_conn = None
+        # A single thread owns the publishing connection and keeps NOTIFYs in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pubsub-notify")
+        self._deliver: Optional[Deliver] = None
+        self._stopped = False
+
+    def _connect(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        conn = psycopg2.connect(self.dsn)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        return conn
+
+    async def start(self, deliver: Deliver):
+        self._deliver = deliver
+        self._stopped = False
+        await self._listen()
+
+    async def _listen(self):
+        loop = asyncio.get_running_loop()
+        try:
+            conn = await asyncio.to_thread(self._connect)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        except Exception as e:
+            logger.error(f"Pub/sub LISTEN failed, retrying in {self.RECONNECT_SECONDS}s: {e}")
+            loop.call_later(self.RECONNECT_SECONDS, lambda: asyncio.ensure_future(self._listen()))
+            return
+        self._listen_conn = conn
+
+        def on_readable():
+            try:
+                conn.poll()
+            except Exception as e:
+                logger.error(f"Pub/sub listener connection lost: {e}")
+                loop.remove_reader(conn.fileno())
+                self._listen_conn = None
+                if not self._stopped:
+                    loop.call_later(self.RECONNECT_SECONDS, lambda: asyncio.ensure_future(self._listen()))
+                return
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    self._deliver(json.loads(notify.payload))
+                except ValueError:
+                    logger.warning("Dropped malformed pub/sub notification")
+
+        loop.add_reader(conn.fileno(), on_readable)
+        logger.info(f"Pub/sub listening on Postgres channel {NOTIFY_CHANNEL}")
+
+    async def stop(self):
+        self._stopped = True
+        if self._listen_conn is not None:
+            asyncio.get_running_loop().remove_reader(self._listen_conn.fileno())
+            self._listen_conn.close()
+            self._listen_conn = None
+        self._executor.shutdown(wait=True)
+        if self._publish_conn is not None:
+            self._publish_conn.close()
+            self._publish_conn = None
+
+    def _notify(self, payload: str):
+        for attempt in range(2):
+            try:
+                if self._publish_conn is None or self._publish_conn.closed:
+                    self._publish_conn = self._connect()
+                with self._publish_conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, payload))
+                return
+            except Exception as e:
+                self._publish_conn = None
+                if attempt:
+                    logger.error(f"Pub/sub NOTIFY failed: {e}")
+
+    def publish(self, message: Dict[str, Any]):
+        self._executor.submit(self._notify, json.dumps(message))
+
+
+def create_backend(name: str, socket_dir: str, dsn: str):
+    """Build the backend selected by settings"""
+    if name == "memory":
+        return MemoryBackend()
+    if name == "socket":
+        return LocalSocketBackend(socket_dir)
+    if name == "postgres":
+        return PostgresBackend(dsn)
+    raise ValueError(f"Unknown pub/sub backend: {name}")
+
+
+class PubSubHub:
+    """Per-process registry of subscriber queues keyed by user id"""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._backend = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    async def start(self, backend):
+        self._loop = asyncio.get_running_loop()
+        await backend.start(self._deliver)
+        self._backend = backend
+
+    async def stop(self):
+        backend, self._backend = self._backend, None
+        if backend is not None:
+            await backend.stop()
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: int, event: str, data: Dict[str, Any]):
+        """Publish an event to a user's connections on every worker (no-op when not started)"""
+        if self._backend is None:
+            return
+        try:
+            self._backend.publish({"user_id": user_id, "event": event, "data": data})
+            self.published += 1
+        except Exception as e:
+            logger.error(f"Failed to publish {event} for user {user_id}: {e}")
+
+    def _deliver(self, message: Dict[str, Any]):
+        # Backends may call this from other threads; queues must be fed on the loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._fan_out(message)
+        elif self._loop is not None:
+            self._loop.call_soon_threadsafe(self._fan_out, message)
+
+    def _fan_out(self, message: Dict[str, Any]):
+        for queue in tuple(self._subscribers.get(message.get("user_id"), ())):
+            try:
+                queue.put_nowait(message)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "users": len(self._subscribers),
+            "connections": sum(len(queues) for queues in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+hub = PubSubHub()
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, advisory_lock
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """A synchronous job run every `interval_seconds` in a worker thread"""
+
+    def __init__(
+        self,
+        name: str,
+        interval_seconds: float,
+        func: Callable[[], None],
+        run_on_start: bool = False,
+        exclusive: bool = False
+    ):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.run_on_start = run_on_start
+        self.exclusive = exclusive
+        self.last_error: Optional[str] = None
+        self.runs = 0
+        self.skipped = 0
+
+    def run_once(self) -> bool:
+        """Run the job; exclusive jobs are skipped while another worker is running them"""
+        if not self.exclusive:
+            self.func()
+            return True
+        with advisory_lock(f"job:{self.name}") as acquired:
+            if not acquired:
+                logger.debug(f"Background job '{self.name}' is running in another worker; skipped")
+                return False
+            self.func()
+            return True
+
+    async def run_forever(self):
+        if not self.run_on_start:
+            await asyncio.sleep(self.interval_seconds)
+        while True:
+            try:
+                if await asyncio.to_thread(self.run_once):
+                    self.runs += 1
+                else:
+                    self.skipped += 1
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Background job '{self.name}' failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+
+_jobs: Dict[str, PeriodicJob] = {}
+_tasks: List[asyncio.Task] = []
+
+
+def register_job(
+    name: str,
+    interval_seconds: float,
+    func: Callable[[], None],
+    run_on_start: bool = False,
+    exclusive: bool = False
+):
+    """Register a periodic job. Jobs with a non-positive interval are disabled.
+
+    Every uvicorn worker runs its own scheduler. Jobs that maintain this
+    worker's in-memory state run everywhere; jobs that write shared tables
+    should pass `exclusive=True` so each run happens in one worker only
+    (see `advisory_lock`).
+    """
+    if interval_seconds <= 0:
+        logger.info(f"Background job '{name}' disabled")
+        return
+    _jobs[name] = PeriodicJob(name, interval_seconds, func, run_on_start, exclusive)
+
+
+def with_session(func: Callable[[Session], None]) -> Callable[[], None]:
+    """Wrap a job so it runs with its own database session"""
+    def runner():
+        db = SessionLocal()
+        try:
+            func(db)
+        finally:
+            db.close()
+    return runner
+
+
+async def start_jobs():
+    """Start all registered jobs on the running event loop"""
+    for job in _jobs.values():
+        _tasks.append(asyncio.create_task(job.run_forever(), name=f"job:{job.name}"))
+        logger.info(f"Background job '{job.name}' scheduled every {job.interval_seconds}s")
+
+
+async def stop_jobs():
+    """Cancel all running jobs"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    _jobs.clear()
+
+
+def get_job_status() -> List[dict]:
+    """Snapshot of registered jobs, for diagnostics"""
+    return [
+        {
+            "name": job.name,
+            "interval_seconds": job.interval_seconds,
+            "exclusive": job.exclusive,
+            "runs": job.runs,
+            "skipped": job.skipped,
+            "last_error": job.last_error,
+        }
+        for job in _jobs.values()
+    ]
@@ -0,0 +1,226 @@
+"""Slow-query log with automatic EXPLAIN capture.
+
+``instrument_engine`` times every statement; ones slower than the
+threshold are logged and aggregated by normalised shape (literals
+replaced by ``?``, IN lists collapsed), together with the routes that
+issued them and how many parameters they were bound with. Once a shape
+has been slow ``explain_after`` times its plan is captured by the
+``slow_query_explain`` background job, outside the request, with the
+parameters of its latest slow execution: ``EXPLAIN (ANALYZE off)`` on
+PostgreSQL, ``EXPLAIN QUERY PLAN`` on SQLite. Neither runs the statement.
+
+Shapes are kept per worker process; the least recently slow ones are
+dropped beyond ``max_shapes``.
+"""
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from datetime import datetime
+from threading import Lock
+from typing import List, Optional
+import logging
+import re
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+MAX_LOGGED_LENGTH = 300
+MAX_ROUTES = 10
+EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"\?|%\([^)]+\)s|%s|\$\d+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(statement: str) -> str:
+    """Statement shape: literals and placeholders become ?, IN lists (?, ...), whitespace collapsed"""
+    shape = _STRING.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(?, ...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+def _param_count(parameters, executemany: bool) -> int:
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    return len(parameters) if parameters else 0
+
+
+class SlowQuery:
+    __slots__ = ("shape", "statement", "parameters", "count", "total_seconds", "max_seconds", "last_seconds",
+                 "last_seen", "routes", "param_count", "batch_size", "plan", "plan_captured_at", "explain_error")
+
+    def __init__(self, shape: str):
+        self.shape = shape
+        self.statement = ""
+        self.parameters = None  # latest slow execution's; never exposed
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+        self.last_seen: Optional[datetime] = None
+        self.routes: Counter = Counter()
+        self.param_count = 0
+        self.batch_size = 1
+        self.plan: Optional[str] = None
+        self.plan_captured_at: Optional[datetime] = None
+        self.explain_error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "shape": self.shape,
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "mean_seconds": self.total_seconds / self.count if self.count else 0.0,
+            "max_seconds": self.max_seconds,
+            "last_seconds": self.last_seconds,
+            "last_seen": self.last_seen,
+            "routes": dict(self.routes.most_common(MAX_ROUTES)),
+            "param_count": self.param_count,
+            "batch_size": self.batch_size,
+            "plan": self.plan,
+            "plan_captured_at": self.plan_captured_at,
+            "explain_error": self.explain_error,
+        }
+
+
+# Route template of the request being handled, set by SlowQueryMiddleware
+_route: ContextVar[Optional[dict]] = ContextVar("slow_query_route", default=None)
+
+
+def _current_route() -> str:
+    scope = _route.get()
+    if scope is None:
+        return "background"
+    endpoint = scope.get("endpoint")
+    for route in scope["app"].routes:
+        if getattr(route, "endpoint", None) is endpoint:
+            return f"{scope['method']} {route.path}"
+    return f"{scope['method']} unmatched"
+
+
+class SlowQueryLog:
+    """Slow statements aggregated by shape, with plans for repeat offenders"""
+
+    def __init__(self):
+        self.threshold_seconds = 0.2
+        self.explain_after = 3
+        self.max_shapes = 500
+        self._queries: "OrderedDict[str, SlowQuery]" = OrderedDict()
+        self._lock = Lock()
+
+    def configure(self, threshold_seconds: float, explain_after: int, max_shapes: int):
+        self.threshold_seconds = threshold_seconds
+        self.explain_after = explain_after
+        self.max_shapes = max_shapes
+
+    def record(self, statement: str, parameters, executemany: bool, seconds: float):
+        shape = normalize(statement)
+        route = _current_route()
+        with self._lock:
+            query = self._queries.get(shape)
+            if query is None:
+                query = self._queries[shape] = SlowQuery(shape)
+                if len(self._queries) > self.max_shapes:
+                    self._queries.popitem(last=False)
+            else:
+                self._queries.move_to_end(shape)
+            query.statement = statement
+            query.parameters = parameters[0] if executemany and parameters else parameters
+            query.count += 1
+            query.total_seconds += seconds
+            query.max_seconds = max(query.max_seconds, seconds)
+            query.last_seconds = seconds
+            query.last_seen = datetime.utcnow()
+            query.routes[route] += 1
+            query.param_count = _param_count(parameters, executemany)
+            query.batch_size = len(parameters) if executemany and parameters else 1
+        logger.warning(
+            f"Slow query ({seconds * 1000:.0f}ms, {route}, {query.param_count} params"
+            f"{f' x{query.batch_size}' if query.batch_size > 1 else ''}): {shape[:MAX_LOGGED_LENGTH]}"
+        )
+
+    def _due_for_explain(self) -> List[SlowQuery]:
+        with self._lock:
+            return [
+                q for q in self._queries.values()
+                if q.plan is None and q.explain_error is None and q.count >= self.explain_after
+            ]
+
+    def explain_pending(self, db: Session):
+        """Capture plans for shapes that have been slow `explain_after` times (background job)"""
+        for query in self._due_for_explain():
+            statement = query.statement
+            if not statement.lstrip().upper().startswith(EXPLAINABLE):
+                query.explain_error = "Statement type cannot be explained"
+                continue
+            dialect = db.get_bind().dialect.name
+            prefix = "EXPLAIN (ANALYZE off) " if dialect == "postgresql" else "EXPLAIN QUERY PLAN "
+            try:
+                rows = db.connection().exec_driver_sql(prefix + statement, query.parameters or ()).fetchall()
+                if dialect == "postgresql":
+                    query.plan = "\n".join(row[0] for row in rows)
+                else:
+                    query.plan = "\n".join(str(row[-1]) for row in rows)
+                query.plan_captured_at = datetime.utcnow()
+            except Exception as e:
+                query.explain_error = str(e)
+                logger.error(f"Failed to explain slow query: {e}")
+            finally:
+                db.rollback()
+
+    def list(self, sort: str = "total", route: Optional[str] = None, min_count: int = 1, limit: int = 50) -> List[dict]:
+        with self._lock:
+            queries = [q.to_dict() for q in self._queries.values()]
+        queries = [
+            q for q in queries
+            if q["count"] >= min_count and (route is None or any(route in r for r in q["routes"]))
+        ]
+        key = {"total": "total_seconds", "max": "max_seconds", "count": "count", "recent": "last_seen"}[sort]
+        return sorted(queries, key=lambda q: q[key], reverse=True)[:limit]
+
+    def clear(self) -> int:
+        with self._lock:
+            cleared = len(self._queries)
+            self._queries.clear()
+        return cleared
+
+
+slow_query_log = SlowQueryLog()
+
+
+def instrument_engine(engine: Engine):
+    """Time every statement; record the ones over the threshold"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["slow_query_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info.pop("slow_query_started", time.perf_counter())
+        if seconds >= slow_query_log.threshold_seconds and not statement.startswith("EXPLAIN"):
+            slow_query_log.record(statement, parameters, executemany, seconds)
+
+
+class SlowQueryMiddleware:
+    """ASGI middleware making the request's route available to the slow-query log"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _route.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _route.reset(token)
@@ -0,0 +1,372 @@
+"""Sampled request tracing with OpenTelemetry-compatible export.
+
+``TracingMiddleware`` opens a root span for a sampled request (a random
+``tracing_sample_rate`` fraction, or any request arriving with a sampled
+W3C ``traceparent`` header). Inside it, routes built by ``TracedRoute``
+add spans for dependency resolution, the endpoint itself and response
+serialisation; ``instrument_engine`` adds one span per SQL statement.
+Unsampled requests only pay for a context variable lookup.
+
+Finished traces are queued and written in batches by a background task
+as OTLP/JSON ``ExportTraceServiceRequest`` documents: one per line to
+``tracing_export_path`` and/or POSTed to ``tracing_otlp_endpoint``
+(e.g. an OpenTelemetry collector's ``/v1/traces``).
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import time
+import urllib.request
+
+from fastapi.dependencies.utils import is_coroutine_callable
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "great-awareness-backend"
+MAX_STATEMENT_LENGTH = 500
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], kind: int = SPAN_KIND_INTERNAL):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        self.trace.spans.append(self)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 0},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Trace:
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.spans: List[Span] = []  # finished spans; list.append is thread-safe
+
+
+def _attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+# Innermost open span of the sampled request, None when not tracing
+_current: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """Child span of the current span; a no-op outside sampled requests"""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, kind)
+    child.attributes.update(attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+class SpanExporter:
+    """Bounded queue of finished traces, written in batches by a background task"""
+
+    def __init__(self, max_queued_spans: int = 10000):
+        self.export_path = ""
+        self.otlp_endpoint = ""
+        self.interval = 2.0
+        self.max_queued_spans = max_queued_spans
+        self.exported = 0
+        self.dropped = 0
+        self._queue: deque = deque()
+        self._queued_spans = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def configure(self, export_path: str, otlp_endpoint: str, interval: float):
+        self.export_path = export_path
+        self.otlp_endpoint = otlp_endpoint
+        self.interval = interval
+
+    def submit(self, trace: Trace):
+        if self._queued_spans + len(trace.spans) > self.max_queued_spans:
+            self.dropped += len(trace.spans)
+            return
+        self._queue.append(trace)
+        self._queued_spans += len(trace.spans)
+
+    def _drain(self) -> List[Span]:
+        spans = []
+        while self._queue:
+            trace = self._queue.popleft()
+            self._queued_spans -= len(trace.spans)
+            spans.extend(trace.spans)
+        return spans
+
+    def flush(self):
+        """Export everything queued so far as one OTLP/JSON document"""
+        spans = self._drain()
+        if not spans:
+            return
+        document = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _attribute("service.name", SERVICE_NAME),
+                    _attribute("process.pid", os.getpid()),
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [s.to_otlp() for s in spans],
+                }],
+            }]
+        })
+        if self.export_path:
+            with open(self.export_path, "a") as f:
+                f.write(document + "\n")
+        if self.otlp_endpoint:
+            request = urllib.request.Request(
+                self.otlp_endpoint, data=document.encode(), headers={"Content-Type": "application/json"}, method="POST")
+            urllib.request.urlopen(request, timeout=5).close()
+        self.exported += len(spans)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run(), name="trace-exporter")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Failed to export spans: {e}")
+
+
+exporter = SpanExporter()
+
+
+def _parse_traceparent(header: Optional[str]):
+    # version-traceid-parentid-flags
+    parts = (header or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3][:2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2], flags & 1 == 1
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a root span for sampled HTTP requests"""
+
+    def __init__(self, app, sample_rate: float = 0.01):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                incoming = _parse_traceparent(value.decode("latin-1"))
+                break
+        if incoming is not None:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id, sampled = None, None, random.random() < self.sample_rate
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        root = Span(Trace(trace_id), f"{scope['method']} {scope['path']}", parent_id, SPAN_KIND_SERVER)
+        root.attributes.update({"http.method": scope["method"], "http.target": scope["path"]})
+        traceparent = f"00-{root.trace.trace_id}-{root.span_id}-01".encode()
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"traceparent", traceparent)]
+            await send(message)
+
+        token = _current.set(root)
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            route = scope.get("route_path")
+            if route:
+                root.attributes["http.route"] = route
+                root.name = f"{scope['method']} {route}"
+            root.end()
+            exporter.submit(root.trace)
+
+
+def instrument_engine(engine: Engine):
+    """One client span per SQL statement of a sampled request"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        parent = _current.get()
+        if parent is not None:
+            child = Span(parent.trace, "db.query", parent.span_id, SPAN_KIND_CLIENT)
+            child.attributes.update({
+                "db.system": conn.dialect.name,
+                "db.statement": statement[:MAX_STATEMENT_LENGTH],
+            })
+            conn.info["trace_span"] = child
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        child = conn.info.pop("trace_span", None)
+        if child is not None:
+            child.attributes["db.rows"] = max(cursor.rowcount, 0)
+            child.end()
+
+
+class _Phases:
+    """Spans of a sampled request before and after its endpoint runs"""
+    __slots__ = ("resolving", "serializing")
+
+    def __init__(self, resolving: Span):
+        self.resolving = resolving
+        self.serializing: Optional[Span] = None
+
+
+_phases: ContextVar[Optional[_Phases]] = ContextVar("trace_phases", default=None)
+
+
+def _traced_endpoint(endpoint, name: str):
+    """Wrap an endpoint in a span that also closes dependency resolution and opens serialisation"""
+    def started():
+        phases = _phases.get()
+        if phases is not None:
+            phases.resolving.end()
+        return phases
+
+    def finished(phases: Optional[_Phases]):
+        if phases is not None:
+            resolving = phases.resolving
+            phases.serializing = Span(resolving.trace, "serialize response", resolving.parent_id)
+
+    if is_coroutine_callable(endpoint):
+        @functools.wraps(endpoint)
+        async def traced(*args, **kwargs):
+            phases = started()
+            with span(name):
+                result = await endpoint(*args, **kwargs)
+            finished(phases)
+            return result
+    else:
+        # FastAPI runs it in the thread pool, which sees a copy of this context
+        @functools.wraps(endpoint)
+        def traced(*args, **kwargs):
+            phases = started()
+            with span(name):
+                result = endpoint(*args, **kwargs)
+            finished(phases)
+            return result
+    traced.__traced_endpoint__ = True
+    return traced
+
+
+class TracedRoute(APIRoute):
+    """Route class adding "resolve dependencies", "endpoint" and "serialize response" spans.
+
+    Routers opt in with ``APIRouter(route_class=TracedRoute)``. Only the
+    endpoint is wrapped; dependency callables are left as declared so
+    ``app.dependency_overrides`` keeps matching them, and dependencies get
+    one span for their resolution as a whole. Outside sampled requests
+    the cost is a context variable lookup.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # include_router rebuilds routes from an already wrapped endpoint
+        if not getattr(endpoint, "__traced_endpoint__", False):
+            endpoint = _traced_endpoint(endpoint, f"endpoint {kwargs.get('name') or endpoint.__name__}")
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        path = self.path
+
+        async def traced_handler(request):
+            parent = _current.get()
+            if parent is None:
+                return await handler(request)
+            request.scope["route_path"] = path
+            phases = _Phases(Span(parent.trace, "resolve dependencies", parent.span_id))
+            token = _phases.set(phases)
+            try:
+                return await handler(request)
+            finally:
+                _phases.reset(token)
+                if not phases.resolving.end_ns:
+                    phases.resolving.end()  # a dependency or validation failed before the endpoint
+                if phases.serializing is not None:
+                    phases.serializing.end()
+
+        return traced_handler
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, LargeBinary
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class DailyUserRollup(Base):
+    """Signups and active users per UTC day and county ('' when the county is unknown)"""
+    __tablename__ = "analytics_daily_users"
+
+    day = Column(Date, primary_key=True)
+    county = Column(String(100), primary_key=True)
+    signups = Column(Integer, default=0, nullable=False)
+    active_users = Column(Integer, default=0, nullable=False)  # distinct users who asked, commented or liked
+
+
+class DailyQuestionRollup(Base):
+    """Questions asked, comments and likes per UTC day and question category"""
+    __tablename__ = "analytics_daily_questions"
+
+    day = Column(Date, primary_key=True)
+    category = Column(String(100), primary_key=True)
+    questions = Column(Integer, default=0, nullable=False)
+    comments = Column(Integer, default=0, nullable=False)
+    likes = Column(Integer, default=0, nullable=False)
+
+
+class UserStatusRollup(Base):
+    """Current user counts per county and status, refreshed with the daily rollups"""
+    __tablename__ = "analytics_user_totals"
+
+    county = Column(String(100), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    users = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class ActivitySketch(Base):
+    """HyperLogLog registers of the users seen on one UTC day, merged across workers"""
+    __tablename__ = "activity_sketches"
+
+    day = Column(Date, primary_key=True)
+    registers = Column(LargeBinary, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class FacetCount(Base):
+    """Maintained count of published rows per facet value (question category, content topic)"""
+    __tablename__ = "facet_counts"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    facet = Column(String(50), nullable=False, index=True)  # question_category, content_topic
+    value = Column(String(100), nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (UniqueConstraint('facet', 'value', name='_facet_value_uc'),)
+
+    def to_dict(self):
+        return {
+            "facet": self.facet,
+            "value": self.value,
+            "count": self.count,
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -26,6 +26,11 @@ class Notification(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     is_read = Column(Boolean, default=False, nullable=False, index=True)
     
+    # Coalescing: repeated events on one target within a window share a row
+    group_key = Column(String(100), nullable=True)  # e.g. like:question:42:<window>
+    actor_count = Column(Integer, default=1, server_default="1", nullable=False)
+    latest_actors = Column(Text, nullable=True)  # newline-separated actor names, newest first
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -33,4 +38,78 @@ class Notification(Base):
     # Relationships
     user = relationship("User", back_populates="notifications")
     content = relationship("Content", back_populates="notifications")
-    question = relationship("Question", back_populates="notifications")
\ No newline at end of file
+    question = relationship("Question", back_populates="notifications")
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'group_key', name='_notification_user_group_uc'),
+        # Notifications page: one user's rows, newest first, without a sort step
+        Index('ix_notifications_user_created', 'user_id', 'created_at'),
+        # Retention batches: read rows, oldest first
+        Index(
+            'ix_notifications_retention', 'updated_at', 'id',
+            postgresql_where=(is_read == True), sqlite_where=(is_read == True)
+        ),
+    )
+
+    @property
+    def latest_actor_names(self):
+        return self.latest_actors.split("\n")[:3] if self.latest_actors else []
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "notification_type": self.notification_type,
+            "title": self.title,
+            "body": self.body,
+            "content_id": self.content_id,
+            "question_id": self.question_id,
+            "author_name": self.author_name,
+            "author_avatar": self.author_avatar,
+            "user_id": self.user_id,
+            "is_read": self.is_read,
+            "actor_count": self.actor_count,
+            "latest_actors": self.latest_actor_names,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+class NotificationCounter(Base):
+    """Maintained per-user unread notification count, so polling never has to count rows"""
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread_count = Column(Integer, default=0, nullable=False)
+    version = Column(BigInteger, default=0, nullable=False)  # bumped on every change to the user's notifications
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class NotificationActor(Base):
+    """Actors already counted in a coalesced notification, so repeats are not counted twice"""
+    __tablename__ = "notification_actors"
+
+    user_id = Column(Integer, primary_key=True)  # recipient
+    group_key = Column(String(100), primary_key=True)
+    actor_id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+
+class NotificationArchive(Base):
+    """Read notifications moved out of `notifications` by the retention job"""
+    __tablename__ = "notifications_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # original notification id
+    notification_type = Column(String(20), nullable=False)
+    title = Column(String(255), nullable=False)
+    body = Column(Text, nullable=False)
+    content_id = Column(Integer, nullable=True)
+    question_id = Column(Integer, nullable=True)
+    author_name = Column(String(100), nullable=False)
+    author_avatar = Column(String(500), nullable=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    is_read = Column(Boolean, nullable=False)
+    group_key = Column(String(100), nullable=True)
+    actor_count = Column(Integer, default=1, server_default="1", nullable=False)
+    latest_actors = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class OutboxEvent(Base):
+    """Side effect recorded in the same transaction as the domain write, run later by the dispatcher"""
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    event_type = Column(String(50), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON
+    status = Column(String(20), default="pending", nullable=False)  # pending, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    available_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # next attempt
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (Index("ix_outbox_events_status_available", "status", "available_at", "id"),)
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, LargeBinary, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship, backref
+from app.core.database import Base
+
+
+class QuestionSignature(Base):
+    """MinHash signature of a question's title and content, plus its near-duplicate cluster"""
+    __tablename__ = "question_signatures"
+
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)  # NUM_PERM little-endian uint32 values
+    cluster_id = Column(Integer, nullable=False, index=True)  # id of the first question seen in the cluster
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    question = relationship("Question", backref=backref("signature", uselist=False, cascade="all, delete-orphan"))
+
+
+class QuestionLSHBucket(Base):
+    """One LSH band bucket per (question, band); questions sharing a bucket are duplicate candidates"""
+    __tablename__ = "question_lsh_buckets"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False, index=True)
+    band = Column(SmallInteger, nullable=False)
+    bucket = Column(BigInteger, nullable=False)
+
+    question = relationship("Question", backref=backref("lsh_buckets", cascade="all, delete-orphan"))
+
+    __table_args__ = (Index("ix_question_lsh_buckets_band_bucket", "band", "bucket", "question_id"),)
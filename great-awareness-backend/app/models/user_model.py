@@ -43,6 +43,8 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     last_login = Column(DateTime(timezone=True), nullable=True)
+    last_seen_at = Column(DateTime(timezone=True), nullable=True)  # flushed periodically by the activity tracker
+    streak_started_at = Column(DateTime(timezone=True), nullable=True)  # start of the current wellness streak
     
     # Relationships - lazy loading to avoid circular imports
     created_contents = relationship("Content", back_populates="creator", lazy="select", foreign_keys="Content.created_by")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -29,3 +29,5 @@ class UserMilestone(Base):
 
     user = relationship("User", backref="milestones")
     milestone = relationship("Milestone", back_populates="user_milestones")
+
+    __table_args__ = (UniqueConstraint('user_id', 'milestone_id', name='_user_milestone_uc'),)
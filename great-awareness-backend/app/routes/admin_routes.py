@@ -1,17 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
 from typing import List, Optional
-from datetime import datetime, timedelta
 import logging
 
+from app.core import profiling
+from app.core.slow_queries import slow_query_log
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
+from app.core.tracing import TracedRoute
 from app.models.user_model import User
-from app.models.question_model import Question
-from app.schemas.admin_schema import UserResponse, TopQuestionResponse, AnalyticsResponse
+from app.schemas.admin_schema import UserResponse, TopQuestionResponse, RecurringQuestionResponse, AnalyticsResponse, AnalyticsDayResponse, OutboxStatsResponse, ActivityStatsResponse, ProfileSummaryResponse, SlowQueryResponse
+from app.services.question_clustering import get_recurring_questions
+from app.services.question_stats import get_top_question_categories
+from app.services.analytics_rollup import get_analytics_summary, get_daily_series
+from app.services import outbox
+from app.services.activity_tracker import activity_tracker, estimate_active_users
 
-router = APIRouter(prefix="/admin", tags=["admin"])
+router = APIRouter(prefix="/admin", tags=["admin"], route_class=TracedRoute)
 logger = logging.getLogger(__name__)
 
 @router.get("/users", response_model=List[UserResponse])
@@ -72,39 +78,7 @@ async def get_top_questions(
         )
     
     try:
-        # Get questions from the last N days and group by similar titles/categories
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Simple approach: get all questions and count similar ones
-        questions = db.query(Question).filter(
-            Question.created_at >= cutoff_date
-        ).order_by(desc(Question.created_at)).all()
-        
-        # Group by category and count
-        category_counts = {}
-        for question in questions:
-            category = question.category
-            if category in category_counts:
-                category_counts[category] += 1
-            else:
-                category_counts[category] = 1
-        
-        # Create top questions response
-        top_questions = []
-        for category, count in sorted(category_counts.items(), key=lambda x: x[1], reverse=True)[:limit]:
-            # Get a sample question from this category
-            sample_question = db.query(Question).filter(
-                Question.category == category
-            ).first()
-            
-            if sample_question:
-                top_questions.append({
-                    "question": sample_question.title,
-                    "count": count,
-                    "category": category
-                })
-        
-        return top_questions
+        return get_top_question_categories(db, limit, days)
     except Exception as e:
         logger.error(f"Error fetching top questions: {e}")
         raise HTTPException(
@@ -112,6 +86,29 @@ async def get_top_questions(
             detail="Failed to fetch top questions"
         )
 
+@router.get("/questions/recurring", response_model=List[RecurringQuestionResponse])
+async def get_recurring_question_clusters(
+    limit: int = 5,
+    days: int = 30,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the most frequently re-asked questions, grouped by near-duplicate cluster (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    try:
+        return get_recurring_questions(db, limit, days)
+    except Exception as e:
+        logger.error(f"Error fetching recurring questions: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch recurring questions"
+        )
+
 @router.get("/analytics", response_model=AnalyticsResponse)
 async def get_analytics(
     current_user: User = Depends(get_current_user),
@@ -125,34 +122,197 @@ async def get_analytics(
         )
     
     try:
-        # Get user statistics
-        total_users = db.query(User).count()
-        active_users = db.query(User).filter(User.is_active == True).count()
-        inactive_users = total_users - active_users
-        
-        # Get unique counties
-        counties_result = db.query(User.county).filter(User.county != None).distinct().count()
-        
-        # Get question statistics
-        total_questions = db.query(Question).count()
-        
-        # Get recent activity (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        recent_questions = db.query(Question).filter(
-            Question.created_at >= thirty_days_ago
-        ).count()
-        
-        return {
-            "total_users": total_users,
-            "active_users": active_users,
-            "inactive_users": inactive_users,
-            "counties": counties_result,
-            "total_questions": total_questions,
-            "recent_questions": recent_questions
-        }
+        # Totals come from the rollup tables, refreshed by the analytics_rollup job
+        return get_analytics_summary(db)
     except Exception as e:
         logger.error(f"Error fetching analytics: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to fetch analytics"
-        )
\ No newline at end of file
+        )
+
+@router.get("/analytics/daily", response_model=List[AnalyticsDayResponse])
+async def get_daily_analytics(
+    days: int = Query(30, ge=1, le=366, description="Number of days, ending today (UTC)"),
+    county: Optional[str] = Query(None, description="Limit signups and active users to a county"),
+    category: Optional[str] = Query(None, description="Limit questions, comments and likes to a category"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get daily signups, active users, questions, comments and likes (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    try:
+        return get_daily_series(db, days, county=county, category=category)
+    except Exception as e:
+        logger.error(f"Error fetching daily analytics: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch daily analytics"
+        )
+
+@router.get("/outbox", response_model=OutboxStatsResponse)
+async def get_outbox_stats(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get outbox backlog and this worker's dispatcher throughput and lag (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    try:
+        counts = outbox.get_outbox_counts(db)
+        stats = outbox.dispatcher.stats()
+        return {
+            "pending": counts.get("pending", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "running": stats["running"],
+            "processed": stats["processed"],
+            "retried": stats["retried"],
+            "failed_permanently": stats["failed"],
+            "batches": stats["batches"],
+            "events_per_second": stats["events_per_second"],
+            "lag_seconds": stats["lag_seconds"],
+            "last_batch_seconds": stats["last_batch_seconds"],
+            "last_error": stats["last_error"]
+        }
+    except Exception as e:
+        logger.error(f"Error fetching outbox stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch outbox stats"
+        )
+
+@router.get("/activity", response_model=ActivityStatsResponse)
+async def get_activity_stats(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get estimated daily, weekly and monthly active users (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    try:
+        # HyperLogLog estimates (~1% error) from the activity_sketches table plus this worker's unflushed activity
+        dau = estimate_active_users(db, 1)
+        mau = estimate_active_users(db, 30)
+        return {
+            "daily_active_users": dau,
+            "weekly_active_users": estimate_active_users(db, 7),
+            "monthly_active_users": mau,
+            "dau_mau_ratio": dau / mau if mau else 0.0,
+            "pending_last_seen": activity_tracker.pending()
+        }
+    except Exception as e:
+        logger.error(f"Error fetching activity stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch activity stats"
+        )
+
+@router.get("/profiles", response_model=List[ProfileSummaryResponse])
+async def list_profiles(
+    current_user: User = Depends(get_current_user)
+):
+    """List stored request profiles, newest first (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    try:
+        return profiling.store.list()
+    except Exception as e:
+        logger.error(f"Error listing profiles: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to list profiles"
+        )
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed)$", description="speedscope JSON or collapsed stacks"),
+    current_user: User = Depends(get_current_user)
+):
+    """Download a stored request profile (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    try:
+        profile = profiling.store.load(profile_id)
+        if profile is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Profile not found"
+            )
+        filename = f"profile-{profile_id}"
+        if format == "collapsed":
+            return PlainTextResponse(
+                profiling.to_collapsed(profile),
+                headers={"Content-Disposition": f'attachment; filename="{filename}.folded"'}
+            )
+        return JSONResponse(
+            profiling.to_speedscope(profile),
+            headers={"Content-Disposition": f'attachment; filename="{filename}.speedscope.json"'}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching profile {profile_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch profile"
+        )
+
+@router.get("/slow-queries", response_model=List[SlowQueryResponse])
+async def get_slow_queries(
+    sort: str = Query("total", pattern="^(total|max|count|recent)$", description="Order by total, max or recent time, or count"),
+    route: Optional[str] = Query(None, description="Only shapes issued by routes containing this"),
+    min_count: int = Query(1, ge=1, description="Only shapes slow at least this many times"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user)
+):
+    """List this worker's slow statements by shape, with captured plans (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    try:
+        return slow_query_log.list(sort=sort, route=route, min_count=min_count, limit=limit)
+    except Exception as e:
+        logger.error(f"Error fetching slow queries: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch slow queries"
+        )
+
+@router.delete("/slow-queries")
+async def clear_slow_queries(
+    current_user: User = Depends(get_current_user)
+):
+    """Forget this worker's recorded slow statements (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    return {"cleared": slow_query_log.clear()}
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
 import jwt
@@ -11,8 +12,10 @@ from app.schemas.user_schema import UserCreate, UserResponse, UserLogin, Token,
 from app.core.database import get_db
 from app.core.config import settings
 from app.core.dependencies import get_current_user
+from app.core.tracing import TracedRoute
+from app.services.activity_tracker import activity_tracker
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 # Use pbkdf2_sha256 to avoid bcrypt 72-byte limitation issues
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
@@ -115,6 +118,14 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
     db_user = db.query(User).filter(User.email == user.email).first()
     if not db_user or not verify_password(user.password, db_user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    # Core update: keep updated_at for profile changes; a login is not one
+    db.execute(
+        update(User.__table__)
+        .where(User.id == db_user.id)
+        .values(last_login=datetime.utcnow(), updated_at=User.updated_at)
+    )
+    db.commit()
+    activity_tracker.record(db_user.id)
     access_token = create_access_token({"sub": db_user.email})
     return {"access_token": access_token, "token_type": "bearer", "expires_in": settings.access_token_expire_minutes * 60}
 
@@ -3,15 +3,19 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
+from app.core.tracing import TracedRoute
 from app.models.user_model import User
 from app.models.content_model import Content
 from app.models.comment_model import Comment
 from app.models.notification_model import Notification
-from app.schemas.content_schema import ContentCreate, ContentUpdate, ContentResponse, ContentListResponse
+from app.schemas.content_schema import ContentCreate, ContentUpdate, ContentResponse, ContentListResponse, ContentTopicResponse
 from app.schemas.comment_schema import CommentCreate, CommentResponse, CommentListResponse
+from app.services.facet_service import CONTENT_TOPIC, adjust_facet, track_change, get_facet_counts
+from app.services import outbox
+from app.services.notification_service import delete_notifications, invalidate_unread, publish_unread_count
 from datetime import datetime
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 @router.post("/", response_model=ContentResponse, status_code=status.HTTP_201_CREATED)
 async def create_content(
@@ -44,30 +48,23 @@ async def create_content(
     )
     
     db.add(db_content)
+    if db_content.status == "published":
+        adjust_facet(db, CONTENT_TOPIC, db_content.topic, 1)
+    db.flush()
+    
+    # Notification is created by the outbox dispatcher, off the request path
+    outbox.enqueue(db, "content_published", {
+        "content_id": db_content.id,
+        "post_type": db_content.post_type,
+        "title": db_content.title,
+        "body": db_content.body,
+        "author_name": db_content.author_name or current_user.username,
+        "author_avatar": db_content.author_avatar or current_user.profile_image,
+        "user_id": current_user.id
+    })
     db.commit()
     db.refresh(db_content)
-    
-    # Create notification for the new content
-    try:
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        notification = Notification(
-            notification_type="content",
-            title=f"New {db_content.post_type} Content: {db_content.title}",
-            body=db_content.body[:200] + "..." if len(db_content.body) > 200 else db_content.body,
-            content_id=db_content.id,
-            author_name=db_content.author_name or current_user.username,
-            author_avatar=db_content.author_avatar or current_user.profile_image,
-            user_id=current_user.id,  # Notify the creator (or change to followers later)
-            is_read=False
-        )
-        db.add(notification)
-        db.commit()
-        logger.info(f"Notification created for content {db_content.id}")
-    except Exception as e:
-        logger.error(f"Failed to create notification for content {db_content.id}: {e}")
-        # Don't fail the content creation if notification fails
+    outbox.dispatcher.wake()
     
     return db_content.to_dict()
 
@@ -121,6 +118,15 @@ async def get_contents(
         has_prev=skip > 0
     )
 
+@router.get("/topics", response_model=List[ContentTopicResponse])
+async def get_content_topics(db: Session = Depends(get_db)):
+    """Get published content topics with counts"""
+    topic_counts = get_facet_counts(db, CONTENT_TOPIC)
+    return [
+        {"topic": topic, "count": count}
+        for topic, count in topic_counts
+    ]
+
 @router.get("/{content_id}", response_model=ContentResponse)
 async def get_content(
     content_id: int,
@@ -157,6 +163,9 @@ async def update_content(
             detail="You don't have permission to update this content"
         )
     
+    old_topic = content.topic
+    was_published = content.status == "published"
+    
     # Update fields
     update_data = content_update.dict(exclude_unset=True)
     
@@ -168,6 +177,11 @@ async def update_content(
         setattr(content, field, value)
     
     content.updated_at = datetime.utcnow()
+    track_change(
+        db, CONTENT_TOPIC,
+        old_topic, was_published,
+        content.topic, content.status == "published"
+    )
     db.commit()
     db.refresh(content)
     
@@ -194,8 +208,15 @@ async def delete_content(
             detail="You don't have permission to delete this content"
         )
     
+    if content.status == "published":
+        adjust_facet(db, CONTENT_TOPIC, content.topic, -1)
+    # Deleted here rather than by the ORM cascade so the recipients' unread counters follow
+    removed = delete_notifications(db, Notification.content_id == content_id)
     db.delete(content)
     db.commit()
+    for user_id in removed.unread_user_ids:
+        invalidate_unread(user_id)
+        publish_unread_count(db, user_id)
 
 @router.post("/{content_id}/like", response_model=ContentResponse)
 async def like_content(
@@ -1,18 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.core.database import get_db
-from app.core.dependencies import get_current_user
+from datetime import datetime, timedelta
+import asyncio
+import json
+from app.core.database import get_db, SessionLocal
+from app.core.dependencies import get_current_user, authenticate_token, optional_security
+from app.core.pubsub import hub
+from app.core.tracing import TracedRoute
 from app.models.user_model import User
 from app.models.notification_model import Notification
 from app.schemas.notification_schema import (
     NotificationCreate, 
     NotificationUpdate, 
     NotificationResponse, 
-    NotificationListResponse
+    NotificationListResponse,
+    NotificationSyncResponse,
+    UnreadCountResponse
 )
+from app.services.notification_service import (
+    adjust_unread,
+    delete_notifications,
+    get_sync_state,
+    get_unread_count,
+    invalidate_unread,
+    publish_notification,
+    publish_unread_count
+)
+
+router = APIRouter(route_class=TracedRoute)
+
+STREAM_KEEPALIVE_SECONDS = 15
+# Timestamps may only have one-second resolution (SQLite); re-sending a read id is harmless
+SYNC_OVERLAP = timedelta(seconds=1)
 
-router = APIRouter()
+
+def _authenticate_stream(token: Optional[str]) -> Optional[dict]:
+    """Resolve a streaming client's user and initial unread count without holding a pooled session"""
+    if not token:
+        return None
+    db = SessionLocal()
+    try:
+        user = authenticate_token(token, db)
+        return {"user_id": user.id, "unread_count": get_unread_count(db, user.id)}
+    except HTTPException:
+        return None
+    finally:
+        db.close()
 
 @router.post("/", response_model=NotificationResponse, status_code=status.HTTP_201_CREATED)
 async def create_notification(
@@ -35,8 +71,11 @@ async def create_notification(
     )
     
     db.add(db_notification)
+    adjust_unread(db, db_notification.user_id, 0 if db_notification.is_read else 1)
     db.commit()
     db.refresh(db_notification)
+    invalidate_unread(db_notification.user_id)
+    publish_notification(db, db_notification)
     
     return db_notification
 
@@ -66,11 +105,8 @@ async def get_notifications(
     # Get total count
     total = query.count()
     
-    # Get unread count
-    unread_count = db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.is_read == False
-    ).count()
+    # Get unread count from the maintained counter
+    unread_count = get_unread_count(db, current_user.id)
     
     # Apply pagination
     notifications = query.offset(skip).limit(limit).all()
@@ -81,6 +117,159 @@ async def get_notifications(
         unread_count=unread_count
     )
 
+@router.get("/unread-count", response_model=UnreadCountResponse)
+async def get_notification_unread_count(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the unread notification count for the current user"""
+    return UnreadCountResponse(unread_count=get_unread_count(db, current_user.id))
+
+@router.get("/sync", response_model=NotificationSyncResponse)
+async def sync_notifications(
+    since_id: int = Query(0, ge=0, description="`since_id` from the previous sync (0 on first sync)"),
+    since: Optional[datetime] = Query(None, description="`since` from the previous sync"),
+    version: Optional[int] = Query(None, description="`version` from the previous sync"),
+    wait: int = Query(0, ge=0, le=60, description="Seconds to wait for changes before returning"),
+    limit: int = Query(50, ge=1, le=100, description="Maximum new notifications to return"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get notification changes since the previous sync, optionally long-polling until there are some"""
+    # Read before parking: the rollback below expires current_user, and reloading it costs a query
+    user_id = current_user.id
+    # Subscribe before reading the cursor so a change landing in between still wakes us
+    queue = hub.subscribe(user_id) if wait else None
+    try:
+        state = get_sync_state(db, user_id)
+        if queue is not None and state.version == version:
+            # Release the pooled connection while parked
+            db.rollback()
+            try:
+                await asyncio.wait_for(queue.get(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            state = get_sync_state(db, user_id)
+    finally:
+        if queue is not None:
+            hub.unsubscribe(user_id, queue)
+
+    if state.version == version:
+        # Nothing changed: one primary-key read, empty body
+        return NotificationSyncResponse(
+            items=[], read_ids=[], unread_count=state.unread_count,
+            since_id=since_id, since=since, version=version
+        )
+
+    new_items = db.query(Notification).filter(
+        Notification.user_id == user_id,
+        Notification.id > since_id
+    ).order_by(Notification.id).limit(limit + 1).all()
+    has_more = len(new_items) > limit
+    new_items = new_items[:limit]
+
+    # Older rows touched since the last sync: marked read, or updated by coalescing
+    read_ids, updated_items = [], []
+    if since is not None and since_id:
+        for notification in db.query(Notification).filter(
+            Notification.user_id == user_id,
+            Notification.id <= since_id,
+            Notification.updated_at >= since - SYNC_OVERLAP
+        ):
+            if notification.is_read:
+                read_ids.append(notification.id)
+            else:
+                updated_items.append(notification)
+
+    return NotificationSyncResponse(
+        items=[n.to_dict() for n in new_items + updated_items],
+        read_ids=read_ids,
+        unread_count=state.unread_count,
+        since_id=new_items[-1].id if new_items else since_id,
+        since=state.changed_at,
+        # Withhold the version while pages remain so the next call fetches them
+        version=None if has_more else state.version,
+        has_more=has_more
+    )
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    token: Optional[str] = Query(None, description="Access token, for clients that cannot set headers"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """Stream notifications for the current user as server-sent events"""
+    session = _authenticate_stream(credentials.credentials if credentials else token)
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user_id = session["user_id"]
+
+    async def events():
+        queue = hub.subscribe(user_id)
+        try:
+            yield f"event: unread_count\ndata: {json.dumps({'unread_count': session['unread_count']})}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+        finally:
+            hub.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws")
+async def notifications_websocket(websocket: WebSocket, token: Optional[str] = Query(None)):
+    """Push notifications to the current user over a WebSocket"""
+    authorization = websocket.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    session = _authenticate_stream(token)
+    if session is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    user_id = session["user_id"]
+
+    await websocket.accept()
+    queue = hub.subscribe(user_id)
+
+    async def wait_for_disconnect():
+        # Clients only listen; reading is how a closed socket is noticed
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    receiver = asyncio.create_task(wait_for_disconnect())
+    try:
+        await websocket.send_json({"event": "unread_count", "data": {"unread_count": session["unread_count"]}})
+        while True:
+            getter = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+                break
+            message = getter.result()
+            await websocket.send_json({"event": message["event"], "data": message["data"]})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        hub.unsubscribe(user_id, queue)
+
 @router.get("/{notification_id}", response_model=NotificationResponse)
 async def get_notification(
     notification_id: int,
@@ -119,9 +308,18 @@ async def mark_notification_as_read(
             detail="Notification not found"
         )
     
-    notification.is_read = True
+    # Conditional update so concurrent requests decrement the counter only once
+    changed = db.query(Notification).filter(
+        Notification.id == notification.id,
+        Notification.is_read == False
+    ).update({"is_read": True}, synchronize_session=False)
+    if changed:
+        adjust_unread(db, current_user.id, -changed)
     db.commit()
     db.refresh(notification)
+    invalidate_unread(current_user.id)
+    if changed:
+        publish_unread_count(db, current_user.id)
     
     return notification
 
@@ -131,12 +329,17 @@ async def mark_all_notifications_as_read(
     current_user: User = Depends(get_current_user)
 ):
     """Mark all notifications as read for the current user"""
-    db.query(Notification).filter(
+    changed = db.query(Notification).filter(
         Notification.user_id == current_user.id,
         Notification.is_read == False
-    ).update({"is_read": True})
+    ).update({"is_read": True}, synchronize_session=False)
+    if changed:
+        adjust_unread(db, current_user.id, -changed)
     
     db.commit()
+    invalidate_unread(current_user.id)
+    if changed:
+        publish_unread_count(db, current_user.id)
     
     return {"message": "All notifications marked as read"}
 
@@ -147,18 +350,21 @@ async def delete_notification(
     current_user: User = Depends(get_current_user)
 ):
     """Delete a notification"""
-    notification = db.query(Notification).filter(
+    # Decrement by what was actually deleted, so a concurrent mark-read is not counted twice
+    result = delete_notifications(
+        db,
         Notification.id == notification_id,
         Notification.user_id == current_user.id
-    ).first()
-    
-    if not notification:
+    )
+    if not result.deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Notification not found"
         )
     
-    db.delete(notification)
     db.commit()
+    invalidate_unread(current_user.id)
+    if result.unread_user_ids:
+        publish_unread_count(db, current_user.id)
     
     return {"message": "Notification deleted successfully"}
\ No newline at end of file
@@ -4,16 +4,26 @@ from typing import List, Optional
 import logging
 
 from app.core.database import get_db
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, get_optional_current_user
+from app.core.tracing import TracedRoute
 from app.models.user_model import User
 from app.models.question_model import Question, QuestionComment, QuestionLike, QuestionSave
+from app.models.notification_model import Notification
 from app.schemas.question_schema import (
     QuestionCreate, QuestionUpdate, QuestionResponse, QuestionListResponse,
     QuestionCommentCreate, QuestionCommentResponse, QuestionCommentListResponse,
-    QuestionCategoryResponse, QuestionStatsResponse
+    QuestionCategoryResponse, QuestionStatsResponse, RelatedQuestionResponse
 )
+from app.services.facet_service import QUESTION_CATEGORY, adjust_facet, track_change, get_facet_counts
+from app.services.question_state import get_viewer_state, invalidate_viewer_state
+from app.services.notification_service import (
+    delete_notifications, notify_coalesced, publish_coalesced, publish_unread_count, invalidate_unread
+)
+from app.services.question_stats import question_stats_snapshot
+from app.services.question_clustering import index_question
+from app.services import related_questions
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 logger = logging.getLogger(__name__)
 
 # Categories from the frontend
@@ -51,8 +61,13 @@ async def create_question(
         )
         
         db.add(new_question)
+        adjust_facet(db, QUESTION_CATEGORY, new_question.category, 1)
+        db.flush()
+        index_question(db, new_question)
         db.commit()
         db.refresh(new_question)
+        question_stats_snapshot.mark_dirty()
+        related_questions.index_question(new_question)
         
         logger.info(f"Question created by user {current_user.id}: {new_question.id}")
         return new_question.to_dict()
@@ -74,9 +89,14 @@ async def get_questions(
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(10, ge=1, le=100, description="Items per page"),
     search: Optional[str] = Query(None, description="Search in title and content"),
+    current_user: Optional[User] = Depends(get_optional_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get questions with pagination and filtering"""
+    """Get questions with pagination and filtering.
+
+    When called with a valid token, each question carries the viewer's
+    is_liked/is_saved state, resolved for the whole page at once.
+    """
     try:
         query = db.query(Question).filter(Question.status == "published")
         
@@ -106,6 +126,12 @@ async def get_questions(
         # Convert to dict format
         questions_data = [question.to_dict() for question in questions]
         
+        # Attach the viewer's like/save state
+        if current_user:
+            viewer_state = get_viewer_state(db, current_user.id, [q["id"] for q in questions_data])
+            for question_data in questions_data:
+                question_data["is_liked"], question_data["is_saved"] = viewer_state[question_data["id"]]
+        
         total_pages = (total + per_page - 1) // per_page
         
         return {
@@ -130,13 +156,8 @@ async def get_questions(
 async def get_question_categories(db: Session = Depends(get_db)):
     """Get question categories with counts"""
     try:
-        from sqlalchemy import func
-        
-        # Get category counts
-        category_counts = db.query(
-            Question.category,
-            func.count(Question.id).label('count')
-        ).filter(Question.status == "published").group_by(Question.category).all()
+        # Read the maintained counters instead of grouping the questions table
+        category_counts = get_facet_counts(db, QUESTION_CATEGORY)
         
         # Convert to response format
         categories = [
@@ -154,6 +175,20 @@ async def get_question_categories(db: Session = Depends(get_db)):
         )
 
 
+@router.get("/questions/stats", response_model=QuestionStatsResponse)
+async def get_question_stats(db: Session = Depends(get_db)):
+    """Get Q&A statistics (served from a cached snapshot)"""
+    try:
+        return question_stats_snapshot.get(db)
+        
+    except Exception as e:
+        logger.error(f"Error fetching question stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch statistics"
+        )
+
+
 @router.get("/questions/{question_id}", response_model=QuestionResponse)
 async def get_question(
     question_id: int,
@@ -184,6 +219,58 @@ async def get_question(
         )
 
 
+@router.get("/questions/{question_id}/related", response_model=List[RelatedQuestionResponse])
+def get_related_questions(
+    question_id: int,
+    limit: int = Query(5, ge=1, le=20, description="Number of related questions"),
+    db: Session = Depends(get_db)
+):
+    """Get published questions most similar to this one (sync: the similarity scan runs in the thread pool)"""
+    try:
+        question = db.query(Question).filter(
+            Question.id == question_id,
+            Question.status == "published"
+        ).first()
+        
+        if not question:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Question not found"
+            )
+        
+        matches = related_questions.find_related(question, limit)
+        if not matches:
+            return []
+        
+        # One query for the matched rows, returned in similarity order
+        rows = {
+            q.id: q for q in db.query(Question).filter(
+                Question.id.in_([qid for qid, _ in matches]),
+                Question.status == "published"
+            )
+        }
+        return [
+            {
+                "id": qid,
+                "title": rows[qid].title,
+                "category": rows[qid].category,
+                "likes_count": rows[qid].likes_count,
+                "comments_count": rows[qid].comments_count,
+                "score": round(score, 4)
+            }
+            for qid, score in matches if qid in rows
+        ]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching related questions for {question_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch related questions"
+        )
+
+
 @router.put("/questions/{question_id}", response_model=QuestionResponse)
 async def update_question(
     question_id: int,
@@ -204,6 +291,10 @@ async def update_question(
                 detail="Question not found or you don't have permission to edit it"
             )
         
+        old_category = question.category
+        was_published = question.status == "published"
+        old_text = (question.title, question.content)
+        
         # Update fields if provided
         if question_data.title is not None:
             question.title = question_data.title
@@ -223,8 +314,17 @@ async def update_question(
         if question_data.status is not None:
             question.status = question_data.status
         
+        track_change(
+            db, QUESTION_CATEGORY,
+            old_category, was_published,
+            question.category, question.status == "published"
+        )
+        if (question.title, question.content) != old_text:
+            index_question(db, question)
         db.commit()
         db.refresh(question)
+        question_stats_snapshot.mark_dirty()
+        related_questions.index_question(question)
         
         logger.info(f"Question updated by user {current_user.id}: {question_id}")
         return question.to_dict()
@@ -263,8 +363,17 @@ async def delete_question(
                 detail="You don't have permission to delete this question"
             )
         
+        if question.status == "published":
+            adjust_facet(db, QUESTION_CATEGORY, question.category, -1)
+        # Deleted here rather than by the ORM cascade so the recipients' unread counters follow
+        removed = delete_notifications(db, Notification.question_id == question_id)
         db.delete(question)
         db.commit()
+        for user_id in removed.unread_user_ids:
+            invalidate_unread(user_id)
+            publish_unread_count(db, user_id)
+        question_stats_snapshot.mark_dirty()
+        related_questions.remove_question(question_id)
         
         logger.info(f"Question deleted by user {current_user.id}: {question_id}")
         return {"message": "Question deleted successfully"}
@@ -317,7 +426,27 @@ async def toggle_question_like(
             question.likes_count += 1
             action = "liked"
         
+        group_key = None
+        if action == "liked" and question.user_id != current_user.id:
+            group_key = notify_coalesced(
+                db,
+                user_id=question.user_id,
+                notification_type="like",
+                target=f"question:{question.id}",
+                action="liked your question",
+                actor_id=current_user.id,
+                actor_name=current_user.username,
+                actor_avatar=current_user.profile_image,
+                body=question.title,
+                question_id=question.id
+            )
+        
         db.commit()
+        invalidate_viewer_state(current_user.id)
+        question_stats_snapshot.mark_dirty()
+        if group_key:
+            invalidate_unread(question.user_id)
+            publish_coalesced(db, question.user_id, group_key)
         
         logger.info(f"Question {action} by user {current_user.id}: {question_id}")
         return {
@@ -375,6 +504,7 @@ async def toggle_question_save(
             action = "saved"
         
         db.commit()
+        invalidate_viewer_state(current_user.id)
         
         logger.info(f"Question {action} by user {current_user.id}: {question_id}")
         return {
@@ -420,8 +550,28 @@ async def create_question_comment(
         
         db.add(new_comment)
         question.comments_count += 1
+        
+        group_key = None
+        if question.user_id != current_user.id:
+            group_key = notify_coalesced(
+                db,
+                user_id=question.user_id,
+                notification_type="comment",
+                target=f"question:{question.id}",
+                action="commented on your question",
+                actor_id=current_user.id,
+                actor_name="Someone" if comment_data.is_anonymous else current_user.username,
+                actor_avatar=None if comment_data.is_anonymous else current_user.profile_image,
+                body=comment_data.text[:200],
+                question_id=question.id
+            )
+        
         db.commit()
         db.refresh(new_comment)
+        question_stats_snapshot.mark_dirty()
+        if group_key:
+            invalidate_unread(question.user_id)
+            publish_coalesced(db, question.user_id, group_key)
         
         logger.info(f"Comment created on question {question_id} by user {current_user.id}")
         return new_comment.to_dict()
@@ -477,74 +627,4 @@ async def get_question_comments(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to fetch comments"
-        )
-
-
-@router.get("/questions/categories", response_model=List[QuestionCategoryResponse])
-async def get_question_categories(db: Session = Depends(get_db)):
-    """Get question categories with counts"""
-    try:
-        from sqlalchemy import func
-        
-        # Get category counts
-        category_counts = db.query(
-            Question.category,
-            func.count(Question.id).label('count')
-        ).filter(Question.status == "published").group_by(Question.category).all()
-        
-        # Convert to response format
-        categories = [
-            {"category": cat, "count": count}
-            for cat, count in category_counts
-        ]
-        
-        return categories
-        
-    except Exception as e:
-        logger.error(f"Error fetching question categories: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to fetch categories"
-        )
-
-
-@router.get("/questions/stats", response_model=QuestionStatsResponse)
-async def get_question_stats(db: Session = Depends(get_db)):
-    """Get Q&A statistics"""
-    try:
-        from sqlalchemy import func
-        
-        # Total questions
-        total_questions = db.query(Question).filter(Question.status == "published").count()
-        
-        # Total categories
-        total_categories = db.query(Question.category).filter(Question.status == "published").distinct().count()
-        
-        # Most popular category
-        most_popular = db.query(
-            Question.category,
-            func.count(Question.id).label('count')
-        ).filter(Question.status == "published").group_by(Question.category).order_by(func.count(Question.id).desc()).first()
-        
-        most_popular_category = most_popular[0] if most_popular else "None"
-        
-        # Total comments
-        total_comments = db.query(QuestionComment).join(Question).filter(Question.status == "published").count()
-        
-        # Total likes
-        total_likes = db.query(QuestionLike).join(Question).filter(Question.status == "published").count()
-        
-        return {
-            "total_questions": total_questions,
-            "total_categories": total_categories,
-            "most_popular_category": most_popular_category,
-            "total_comments": total_comments,
-            "total_likes": total_likes
-        }
-        
-    except Exception as e:
-        logger.error(f"Error fetching question stats: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to fetch statistics"
         )
\ No newline at end of file
@@ -1,17 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List
-from datetime import datetime
+from datetime import datetime, timezone
 
-from app.core.database import get_db
+from app.core.database import get_db, dialect_insert
 from app.core.dependencies import get_current_user
+from app.core.tracing import TracedRoute
 from app.models.wellness_model import Milestone, UserMilestone
 from app.models.user_model import User
-from app.schemas.wellness_schema import MilestoneResponse, MilestoneWithStatus, UserMilestoneResponse
+from app.schemas.wellness_schema import MilestoneResponse, MilestoneWithStatus, UserMilestoneResponse, StreakResponse
+from app.services import milestone_catalog
 
 router = APIRouter(
     prefix="/wellness",
-    tags=["wellness"]
+    tags=["wellness"],
+    route_class=TracedRoute
 )
 
 DEFAULT_MILESTONES = [
@@ -58,47 +62,46 @@ def initialize_milestones(db: Session = Depends(get_db)):
     Seeds the database with the default milestones. 
     Idempotent: updates existing ones if they exist (based on duration).
     """
-    results = []
-    for m_data in DEFAULT_MILESTONES:
-        existing = db.query(Milestone).filter(Milestone.duration_seconds == m_data["duration_seconds"]).first()
-        if existing:
-            # Update fields
-            existing.label = m_data["label"]
-            existing.icon_code = m_data["icon_code"]
-            existing.color_hex = m_data["color_hex"]
-            existing.description = m_data["description"]
-            results.append(existing)
-        else:
-            new_milestone = Milestone(**m_data)
-            db.add(new_milestone)
-            results.append(new_milestone)
-    
+    insert = dialect_insert(db)
+    stmt = insert(Milestone.__table__).values(DEFAULT_MILESTONES)
+    # One upsert keyed on the unique duration instead of a lookup per milestone
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["duration_seconds"],
+        set_={
+            "label": stmt.excluded.label,
+            "icon_code": stmt.excluded.icon_code,
+            "color_hex": stmt.excluded.color_hex,
+            "description": stmt.excluded.description,
+            "updated_at": func.now()
+        }
+    ))
     db.commit()
-    for r in results:
-        db.refresh(r)
-    return results
+    milestone_catalog.invalidate_catalog()
+
+    durations = [m_data["duration_seconds"] for m_data in DEFAULT_MILESTONES]
+    return db.query(Milestone).filter(Milestone.duration_seconds.in_(durations)).order_by(Milestone.duration_seconds).all()
 
 @router.get("/milestones", response_model=List[MilestoneWithStatus])
 def get_milestones(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Get all milestones and status for the current user.
+    Supports If-None-Match revalidation against the returned ETag.
     """
-    milestones = db.query(Milestone).filter(Milestone.is_active == True).order_by(Milestone.duration_seconds).all()
-    
-    # Get user's unlocked milestones
-    user_milestones = db.query(UserMilestone).filter(UserMilestone.user_id == current_user.id).all()
-    unlocked_ids = {um.milestone_id for um in user_milestones}
-    
-    response = []
-    for m in milestones:
-        m_resp = MilestoneWithStatus.from_orm(m)
-        m_resp.is_unlocked = m.id in unlocked_ids
-        response.append(m_resp)
-        
-    return response
+    catalog = milestone_catalog.get_catalog(db)
+    unlocked_ids = milestone_catalog.get_unlocked_ids(db, current_user.id)
+
+    etag = milestone_catalog.milestones_etag(catalog, unlocked_ids)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+    return [{**m, "is_unlocked": m["id"] in unlocked_ids} for m in catalog.milestones]
 
 @router.post("/unlock/{milestone_id}", response_model=UserMilestoneResponse)
 def unlock_milestone(
@@ -108,7 +111,7 @@ def unlock_milestone(
 ):
     """
     Manually unlock a milestone for testing purposes.
-    In production, this would be triggered by a background worker or event.
+    In production, milestones are unlocked by the milestone_unlock job from the user's streak.
     """
     milestone = db.query(Milestone).filter(Milestone.id == milestone_id).first()
     if not milestone:
@@ -126,4 +129,35 @@ def unlock_milestone(
     db.add(new_unlock)
     db.commit()
     db.refresh(new_unlock)
+    milestone_catalog.invalidate_unlocked(current_user.id)
     return new_unlock
+
+def _streak_response(user: User) -> dict:
+    started = user.streak_started_at
+    if started is None:
+        return {"streak_started_at": None, "streak_seconds": 0}
+    # Aware values (PostgreSQL, in the session's time zone) are converted; naive ones are already UTC
+    started_utc = started.astimezone(timezone.utc).replace(tzinfo=None) if started.tzinfo else started
+    elapsed = datetime.utcnow() - started_utc
+    return {"streak_started_at": started, "streak_seconds": max(int(elapsed.total_seconds()), 0)}
+
+@router.get("/streak", response_model=StreakResponse)
+def get_streak(current_user: User = Depends(get_current_user)):
+    """
+    Get the start and length of the current user's wellness streak.
+    """
+    return _streak_response(current_user)
+
+@router.post("/streak/start", response_model=StreakResponse)
+def start_streak(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Start (or restart) the current user's wellness streak now.
+    Milestones already unlocked are kept.
+    """
+    current_user.streak_started_at = datetime.utcnow()
+    db.commit()
+    db.refresh(current_user)
+    return _streak_response(current_user)
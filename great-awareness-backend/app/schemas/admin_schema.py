@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from typing import Dict, Optional
+from datetime import date, datetime
 
 class UserResponse(BaseModel):
     id: int
@@ -25,6 +25,12 @@ class TopQuestionResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class RecurringQuestionResponse(BaseModel):
+    cluster_id: int
+    question: str
+    count: int
+    category: str
+
 class AnalyticsResponse(BaseModel):
     total_users: int
     active_users: int
@@ -34,4 +40,58 @@ class AnalyticsResponse(BaseModel):
     recent_questions: int
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class OutboxStatsResponse(BaseModel):
+    pending: int
+    done: int
+    failed: int
+    running: bool
+    processed: int
+    retried: int
+    failed_permanently: int
+    batches: int
+    events_per_second: float
+    lag_seconds: float
+    last_batch_seconds: float
+    last_error: Optional[str] = None
+
+class AnalyticsDayResponse(BaseModel):
+    day: date
+    signups: int
+    active_users: int
+    questions: int
+    comments: int
+    likes: int
+
+class ActivityStatsResponse(BaseModel):
+    daily_active_users: int
+    weekly_active_users: int
+    monthly_active_users: int
+    dau_mau_ratio: float
+    pending_last_seen: int
+
+class ProfileSummaryResponse(BaseModel):
+    id: str
+    method: str
+    path: str
+    status_code: int
+    started_at: float
+    duration_ms: float
+    interval_ms: float
+    samples: int
+
+class SlowQueryResponse(BaseModel):
+    shape: str
+    count: int
+    total_seconds: float
+    mean_seconds: float
+    max_seconds: float
+    last_seconds: float
+    last_seen: Optional[datetime] = None
+    routes: Dict[str, int]
+    param_count: int
+    batch_size: int
+    plan: Optional[str] = None
+    plan_captured_at: Optional[datetime] = None
+    explain_error: Optional[str] = None
@@ -71,4 +71,8 @@ class ContentListResponse(BaseModel):
     page: int
     size: int
     has_next: bool
-    has_prev: bool
\ No newline at end of file
+    has_prev: bool
+
+class ContentTopicResponse(BaseModel):
+    topic: str
+    count: int
\ No newline at end of file
@@ -29,14 +29,35 @@ class NotificationResponse(NotificationBase):
     id: int
     user_id: int
     is_read: bool
+    actor_count: int = 1
+    latest_actors: list[str] = []
     created_at: datetime
     updated_at: datetime
     
     model_config = {"from_attributes": True}
+    
+    @validator('latest_actors', pre=True)
+    def split_latest_actors(cls, v):
+        # ORM rows store the names newline-separated, newest first
+        if isinstance(v, str):
+            return v.split("\n")[:3]
+        return v or []
 
 class NotificationListResponse(BaseModel):
     items: list[NotificationResponse]
     total: int
     unread_count: int
     
-    model_config = {"from_attributes": True}
\ No newline at end of file
+    model_config = {"from_attributes": True}
+
+class UnreadCountResponse(BaseModel):
+    unread_count: int
+
+class NotificationSyncResponse(BaseModel):
+    items: list[NotificationResponse]  # new notifications, then unread ones updated by coalescing
+    read_ids: list[int]  # older notifications marked read since the previous sync
+    unread_count: int
+    since_id: int
+    since: Optional[datetime] = None
+    version: Optional[int] = None
+    has_more: bool = False
\ No newline at end of file
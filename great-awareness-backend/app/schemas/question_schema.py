@@ -42,6 +42,8 @@ class QuestionResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     user: Optional[dict]
+    is_liked: Optional[bool] = None  # Only set for authenticated list requests
+    is_saved: Optional[bool] = None
     
     class Config:
         from_attributes = True
@@ -56,6 +58,16 @@ class QuestionListResponse(BaseModel):
     total_pages: int
 
 
+class RelatedQuestionResponse(BaseModel):
+    """Schema for a related question with its similarity score"""
+    id: int
+    title: str
+    category: str
+    likes_count: int
+    comments_count: int
+    score: float
+
+
 class QuestionCommentCreate(BaseModel):
     """Schema for creating a question comment"""
     text: str = Field(..., min_length=1, max_length=1000, description="Comment text")
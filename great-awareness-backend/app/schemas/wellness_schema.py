@@ -33,3 +33,7 @@ class UserMilestoneResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+class StreakResponse(BaseModel):
+    streak_started_at: Optional[datetime]
+    streak_seconds: int
@@ -0,0 +1,206 @@
+"""Daily analytics rollups.
+
+A scheduled job folds the raw users/questions/comments/likes tables into
+small per-day summary tables; admin analytics read only those, so their
+cost depends on the number of days requested, not on table sizes.
+
+Each run recomputes from the day before the latest rolled-up day (so
+late writes around midnight are picked up) and backfills everything on
+the first run. Older days are frozen; deletes after that are not
+reflected.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+import logging
+
+from sqlalchemy import case, func, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.analytics_model import DailyUserRollup, DailyQuestionRollup, UserStatusRollup
+from app.models.question_model import Question, QuestionComment, QuestionLike
+from app.models.user_model import User
+
+logger = logging.getLogger(__name__)
+
+
+def _day(column):
+    # date() exists in both Postgres and SQLite; days are UTC
+    return func.date(column)
+
+
+def _rollup_start(db: Session) -> Optional[date]:
+    latest = db.query(func.max(DailyQuestionRollup.day)).scalar()
+    if latest is None:
+        return None
+    return latest - timedelta(days=1)
+
+
+def _earliest_activity(db: Session) -> date:
+    firsts = [
+        db.query(func.min(User.created_at)).scalar(),
+        db.query(func.min(Question.created_at)).scalar(),
+    ]
+    firsts = [value for value in firsts if value is not None]
+    return min(firsts).date() if firsts else datetime.utcnow().date()
+
+
+def _rebuild_question_days(db: Session, start: date, since: datetime):
+    day_question = _day(Question.created_at)
+    day_comment = _day(QuestionComment.created_at)
+    day_like = _day(QuestionLike.created_at)
+    events = union_all(
+        select(day_question.label("day"), Question.category.label("category"),
+               func.count(Question.id).label("questions"), literal(0).label("comments"), literal(0).label("likes"))
+        .where(Question.created_at >= since)
+        .group_by(day_question, Question.category),
+        select(day_comment, Question.category, literal(0), func.count(QuestionComment.id), literal(0))
+        .join(Question, Question.id == QuestionComment.question_id)
+        .where(QuestionComment.created_at >= since)
+        .group_by(day_comment, Question.category),
+        select(day_like, Question.category, literal(0), literal(0), func.count(QuestionLike.id))
+        .join(Question, Question.id == QuestionLike.question_id)
+        .where(QuestionLike.created_at >= since)
+        .group_by(day_like, Question.category),
+    ).subquery()
+
+    db.query(DailyQuestionRollup).filter(DailyQuestionRollup.day >= start).delete(synchronize_session=False)
+    db.execute(insert(DailyQuestionRollup.__table__).from_select(
+        ["day", "category", "questions", "comments", "likes"],
+        select(
+            events.c.day, events.c.category,
+            func.sum(events.c.questions), func.sum(events.c.comments), func.sum(events.c.likes)
+        ).where(events.c.day >= start).group_by(events.c.day, events.c.category)
+    ))
+
+
+def _rebuild_user_days(db: Session, start: date, since: datetime):
+    actors = union_all(
+        select(_day(Question.created_at).label("day"), Question.user_id.label("user_id"))
+        .where(Question.created_at >= since),
+        select(_day(QuestionComment.created_at), QuestionComment.user_id)
+        .where(QuestionComment.created_at >= since),
+        select(_day(QuestionLike.created_at), QuestionLike.user_id)
+        .where(QuestionLike.created_at >= since),
+    ).subquery()
+    county = func.coalesce(User.county, "")
+    day_signup = _day(User.created_at)
+    rows = union_all(
+        select(day_signup.label("day"), county.label("county"),
+               func.count(User.id).label("signups"), literal(0).label("active_users"))
+        .where(User.created_at >= since)
+        .group_by(day_signup, county),
+        select(actors.c.day, county, literal(0), func.count(func.distinct(actors.c.user_id)))
+        .join(User, User.id == actors.c.user_id)
+        .group_by(actors.c.day, county),
+    ).subquery()
+
+    db.query(DailyUserRollup).filter(DailyUserRollup.day >= start).delete(synchronize_session=False)
+    db.execute(insert(DailyUserRollup.__table__).from_select(
+        ["day", "county", "signups", "active_users"],
+        select(rows.c.day, rows.c.county, func.sum(rows.c.signups), func.sum(rows.c.active_users))
+        .where(rows.c.day >= start)
+        .group_by(rows.c.day, rows.c.county)
+    ))
+
+
+def _rebuild_user_totals(db: Session):
+    county = func.coalesce(User.county, "")
+    db.query(UserStatusRollup).delete(synchronize_session=False)
+    db.execute(insert(UserStatusRollup.__table__).from_select(
+        ["county", "status", "users"],
+        select(county, User.status, func.count(User.id)).group_by(county, User.status)
+    ))
+
+
+def refresh_analytics_rollups(db: Session) -> date:
+    """Scheduled job: recompute the rollups for recent days (all days on first run).
+
+    Each table is rebuilt by a delete and re-insert, so two overlapping runs
+    would collide on the same keys: register the job with exclusive=True
+    (or hold its advisory_lock) so only one worker rebuilds at a time.
+
+    Returns the first day that was recomputed.
+    """
+    start = _rollup_start(db) or _earliest_activity(db)
+    # Slack of a second so rows stamped exactly at midnight are not lost to
+    # timestamp formatting differences; the day filter drops anything earlier.
+    since = datetime.combine(start, time.min) - timedelta(seconds=1)
+
+    _rebuild_question_days(db, start, since)
+    _rebuild_user_days(db, start, since)
+    _rebuild_user_totals(db)
+    db.commit()
+    logger.info(f"Analytics rollups refreshed from {start.isoformat()}")
+    return start
+
+
+def get_analytics_summary(db: Session, recent_days: int = 30) -> dict:
+    """Admin analytics totals, read from the rollup tables only"""
+    totals = db.query(UserStatusRollup.county, UserStatusRollup.status, UserStatusRollup.users).all()
+    total_users = sum(users for _, _, users in totals)
+    active_users = sum(users for _, status, users in totals if status == "active")
+    counties = len({county for county, _, _ in totals if county})
+
+    recent_start = datetime.utcnow().date() - timedelta(days=recent_days)
+    total_questions, recent_questions = db.query(
+        func.coalesce(func.sum(DailyQuestionRollup.questions), 0),
+        func.coalesce(func.sum(case((DailyQuestionRollup.day >= recent_start, DailyQuestionRollup.questions), else_=0)), 0)
+    ).one()
+
+    return {
+        "total_users": total_users,
+        "active_users": active_users,
+        "inactive_users": total_users - active_users,
+        "counties": counties,
+        "total_questions": total_questions,
+        "recent_questions": recent_questions,
+    }
+
+
+def get_daily_series(
+    db: Session,
+    days: int,
+    county: Optional[str] = None,
+    category: Optional[str] = None
+) -> List[dict]:
+    """Per-day signups, active users, questions, comments and likes for the last `days` days.
+
+    `county` narrows the user metrics and `category` the question metrics.
+    Days without activity are included with zeros.
+    """
+    today = datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+
+    user_query = db.query(
+        DailyUserRollup.day,
+        func.sum(DailyUserRollup.signups),
+        func.sum(DailyUserRollup.active_users)
+    ).filter(DailyUserRollup.day >= start)
+    if county is not None:
+        user_query = user_query.filter(DailyUserRollup.county == county)
+    question_query = db.query(
+        DailyQuestionRollup.day,
+        func.sum(DailyQuestionRollup.questions),
+        func.sum(DailyQuestionRollup.comments),
+        func.sum(DailyQuestionRollup.likes)
+    ).filter(DailyQuestionRollup.day >= start)
+    if category is not None:
+        question_query = question_query.filter(DailyQuestionRollup.category == category)
+
+    users_by_day = {day: row for day, *row in user_query.group_by(DailyUserRollup.day)}
+    questions_by_day = {day: row for day, *row in question_query.group_by(DailyQuestionRollup.day)}
+
+    series = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        signups, active_users = users_by_day.get(day, (0, 0))
+        questions, comments, likes = questions_by_day.get(day, (0, 0, 0))
+        series.append({
+            "day": day,
+            "signups": signups,
+            "active_users": active_users,
+            "questions": questions,
+            "comments": comments,
+            "likes": likes,
+        })
+    return series
@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_, exists, func, literal, select, update
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+import logging
+
+from app.core.database import dialect_insert
+from app.models.facet_model import FacetCount
+from app.models.content_model import Content
+from app.models.question_model import Question
+
+logger = logging.getLogger(__name__)
+
+QUESTION_CATEGORY = "question_category"
+CONTENT_TOPIC = "content_topic"
+
+# Counters changed more recently than this are not corrected by reconcile_facets
+RECONCILE_GRACE_SECONDS = 60
+
+# Facet -> (model, grouped column). Only published rows are counted.
+FACET_SOURCES = {
+    QUESTION_CATEGORY: (Question, Question.category),
+    CONTENT_TOPIC: (Content, Content.topic),
+}
+
+
+def adjust_facet(db: Session, facet: str, value: Optional[str], delta: int):
+    """Atomically add `delta` to a facet counter inside the caller's transaction"""
+    if not value or delta == 0:
+        return
+    table = FacetCount.__table__
+    insert = dialect_insert(db)
+    stmt = insert(table).values(facet=facet, value=value, count=max(delta, 0))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["facet", "value"],
+        set_={"count": table.c["count"] + delta, "updated_at": func.now()}
+    )
+    db.execute(stmt)
+
+
+def track_change(
+    db: Session,
+    facet: str,
+    old_value: Optional[str],
+    old_counted: bool,
+    new_value: Optional[str],
+    new_counted: bool
+):
+    """Apply the counter deltas for a row moving between facet values or in/out of published"""
+    if old_counted and new_counted and old_value == new_value:
+        return
+    if old_counted:
+        adjust_facet(db, facet, old_value, -1)
+    if new_counted:
+        adjust_facet(db, facet, new_value, 1)
+
+
+def get_facet_counts(db: Session, facet: str) -> List[Tuple[str, int]]:
+    """Read the maintained counts for a facet, largest first"""
+    return db.query(FacetCount.value, FacetCount.count).filter(
+        FacetCount.facet == facet,
+        FacetCount.count > 0
+    ).order_by(FacetCount.count.desc(), FacetCount.value).all()
+
+
+def reconcile_facets(db: Session) -> int:
+    """Recompute every facet from the source tables and correct any drifted counters.
+
+    Corrections are set-based statements run in the database, so no counts
+    are loaded into memory. Counters touched in the last
+    RECONCILE_GRACE_SECONDS are left alone: an adjust_facet committed while
+    the counts were being computed must not be overwritten with a stale
+    count. Those counters are checked again on the next run.
+
+    Returns the number of counters that were corrected.
+    """
+    table = FacetCount.__table__
+    insert = dialect_insert(db)
+    settled = datetime.utcnow() - timedelta(seconds=RECONCILE_GRACE_SECONDS)
+    corrected = 0
+
+    for facet, (model, column) in FACET_SOURCES.items():
+        published = model.status == "published"
+        actual = (
+            select(column.label("value"), func.count(model.id).label("count"))
+            .where(published, column.isnot(None), column != "")
+            .group_by(column)
+            .subquery()
+        )
+        stale = and_(table.c.facet == facet, table.c.updated_at < settled)
+
+        # Values that still have rows but a wrong count
+        drifted = db.execute(
+            update(table)
+            .where(stale, table.c.value == actual.c.value, table.c["count"] != actual.c["count"])
+            .values(count=actual.c["count"], updated_at=func.now())
+        ).rowcount
+        # Values that no longer have any rows
+        emptied = db.execute(
+            update(table)
+            .where(stale, table.c["count"] != 0, ~exists().where(published, column == table.c.value))
+            .values(count=0, updated_at=func.now())
+        ).rowcount
+        # Values that have rows but no counter yet; the WHERE is required by SQLite's upsert syntax
+        missing = db.execute(
+            insert(table)
+            .from_select(
+                ["facet", "value", "count"],
+                select(literal(facet), actual.c.value, actual.c["count"]).where(actual.c["count"] > 0)
+            )
+            .on_conflict_do_nothing(index_elements=["facet", "value"])
+        ).rowcount
+
+        if drifted or emptied or missing:
+            logger.warning(f"Facet drift in {facet}: {drifted} wrong, {emptied} emptied, {missing} missing counters")
+        corrected += drifted + emptied + missing
+
+    db.commit()
+    if corrected:
+        logger.info(f"Facet reconciliation corrected {corrected} counters")
+    return corrected
@@ -0,0 +1,65 @@
+"""In-process cache of the wellness milestone catalog and users' unlocks.
+
+The catalog only changes when ``/wellness/init`` runs, which invalidates
+this worker's copy; other workers pick the change up when their entry
+expires. Each catalog version gets an ETag derived from its content so
+clients can revalidate the milestone screen with ``If-None-Match``.
+"""
+from typing import FrozenSet, List, NamedTuple, Optional
+import hashlib
+import json
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.models.wellness_model import Milestone, UserMilestone
+from app.schemas.wellness_schema import MilestoneResponse
+
+_CATALOG_KEY = "active"
+
+
+class MilestoneCatalog(NamedTuple):
+    milestones: List[dict]  # MilestoneResponse fields, ordered by duration
+    etag: str
+
+
+_catalog_cache = TTLCache("wellness_milestone_catalog", ttl_seconds=300, max_entries=1)
+# user_id -> frozenset of unlocked milestone ids
+_unlocked_cache = TTLCache("wellness_unlocked_milestones", ttl_seconds=60, max_entries=10000)
+
+
+def _load_catalog(db: Session) -> MilestoneCatalog:
+    rows = db.query(Milestone).filter(Milestone.is_active == True).order_by(Milestone.duration_seconds).all()
+    milestones = [MilestoneResponse.from_orm(m).dict() for m in rows]
+    digest = hashlib.sha1(json.dumps(milestones, default=str, sort_keys=True).encode()).hexdigest()
+    return MilestoneCatalog(milestones, digest[:16])
+
+
+def get_catalog(db: Session) -> MilestoneCatalog:
+    """Active milestones and their ETag, from cache when possible"""
+    return _catalog_cache.get_or_set(_CATALOG_KEY, lambda: _load_catalog(db))
+
+
+def invalidate_catalog():
+    _catalog_cache.invalidate()
+
+
+def get_unlocked_ids(db: Session, user_id: int) -> FrozenSet[int]:
+    """Milestone ids the user has unlocked, from cache or one query on user_milestones"""
+    return _unlocked_cache.get_or_set(user_id, lambda: frozenset(
+        milestone_id for (milestone_id,) in db.query(UserMilestone.milestone_id).filter(UserMilestone.user_id == user_id)
+    ))
+
+
+def invalidate_unlocked(user_id: Optional[int] = None):
+    """Drop one user's cached unlocks, or everyone's when no user is given"""
+    if user_id is None:
+        _unlocked_cache.invalidate()
+    else:
+        _unlocked_cache.invalidate(user_id)
+
+
+def milestones_etag(catalog: MilestoneCatalog, unlocked_ids: FrozenSet[int]) -> str:
+    """ETag of one user's milestone screen: catalog version plus their unlocks"""
+    unlocked = ",".join(str(milestone_id) for milestone_id in sorted(unlocked_ids))
+    return f'W/"{catalog.etag}-{hashlib.sha1(unlocked.encode()).hexdigest()[:8]}"'
@@ -0,0 +1,79 @@
+"""Automatic wellness milestone unlocking.
+
+A scheduled job compares every active user's ``streak_started_at`` with
+each active milestone's ``duration_seconds`` and inserts the missing
+``user_milestones`` rows with one ``INSERT ... SELECT`` per milestone and
+user-id range. No per-user queries are issued, each range commits on its
+own so transactions stay short, and the (user_id, milestone_id) unique
+constraint plus ``ON CONFLICT DO NOTHING`` make reruns and concurrent
+workers harmless.
+"""
+from datetime import datetime, timedelta
+from typing import NamedTuple
+import logging
+import time
+
+from sqlalchemy import and_, exists, func, literal, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.models.user_model import User
+from app.models.wellness_model import Milestone, UserMilestone
+from app.services import milestone_catalog
+
+logger = logging.getLogger(__name__)
+
+
+class UnlockResult(NamedTuple):
+    unlocked: int
+    batches: int
+    seconds: float
+
+
+def unlock_due_milestones(db: Session, batch_size: int = 50000) -> UnlockResult:
+    """Unlock every milestone whose duration each user's current streak has reached.
+
+    Users are processed in primary-key ranges of `batch_size` ids.
+    """
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    milestones = db.query(Milestone.id, Milestone.duration_seconds).filter(Milestone.is_active == True).all()
+    max_id = db.query(func.max(User.id)).filter(User.streak_started_at.isnot(None)).scalar()
+    if not milestones or max_id is None:
+        return UnlockResult(0, 0, time.perf_counter() - started)
+
+    insert = dialect_insert(db)
+    table = UserMilestone.__table__
+    unlocked = 0
+    batches = 0
+    for low in range(0, max_id + 1, batch_size):
+        high = low + batch_size
+        for milestone_id, duration_seconds in milestones:
+            already = exists().where(and_(UserMilestone.user_id == User.id, UserMilestone.milestone_id == milestone_id))
+            due = select(User.id, literal(milestone_id), literal(now)).where(
+                User.id >= low,
+                User.id < high,
+                User.status == settings.user_status_active,
+                User.streak_started_at <= now - timedelta(seconds=duration_seconds),
+                ~already
+            )
+            result = db.execute(
+                insert(table)
+                .from_select(["user_id", "milestone_id", "unlocked_at"], due)
+                .on_conflict_do_nothing(index_elements=["user_id", "milestone_id"])
+            )
+            unlocked += max(result.rowcount or 0, 0)
+        db.commit()
+        batches += 1
+
+    if unlocked:
+        # Other workers see the new unlocks when their cached sets expire
+        milestone_catalog.invalidate_unlocked()
+        logger.info(f"Unlocked {unlocked} milestones")
+    return UnlockResult(unlocked, batches, time.perf_counter() - started)
+
+
+def run_milestone_unlocks(db: Session) -> UnlockResult:
+    """Scheduled job entry point, configured from settings"""
+    return unlock_due_milestones(db, batch_size=settings.milestone_unlock_batch_size)
@@ -0,0 +1,104 @@
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+import time
+
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.models.notification_model import Notification, NotificationArchive
+from app.services.notification_service import purge_notification_actors
+
+logger = logging.getLogger(__name__)
+
+RetentionResult = namedtuple("RetentionResult", ["processed", "batches", "seconds"])
+
+_ARCHIVED_COLUMNS = [
+    "id", "notification_type", "title", "body", "content_id", "question_id",
+    "author_name", "author_avatar", "user_id", "is_read",
+    "group_key", "actor_count", "latest_actors", "created_at", "updated_at",
+]
+
+
+def compact_notifications(
+    db: Session,
+    older_than_days: int,
+    archive: bool = False,
+    batch_size: int = 1000,
+    pause_seconds: float = 0.1,
+    max_seconds: Optional[float] = None
+) -> RetentionResult:
+    """Delete (or archive) read notifications untouched for `older_than_days`.
+
+    Works in batches of `batch_size` (oldest first, read from the
+    ix_notifications_retention partial index), each in its own short
+    transaction, sleeping `pause_seconds` between batches so foreground
+    queries are not starved. Stops early once `max_seconds` have elapsed;
+    the next run carries on where this one left off.
+
+    Runs must not overlap; the scheduled job and purge_notifications.py
+    serialise on an advisory lock. Rows are re-checked when deleted, so a
+    notification brought back as unread by coalescing meanwhile is kept,
+    and archiving skips ids that are already archived.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archive_table = NotificationArchive.__table__
+    source_columns = [Notification.__table__.c[name] for name in _ARCHIVED_COLUMNS]
+    insert = dialect_insert(db)
+    started = time.perf_counter()
+    processed = batches = 0
+
+    while True:
+        ids = [
+            notification_id for (notification_id,) in db.query(Notification.id).filter(
+                Notification.is_read == True,
+                Notification.updated_at < cutoff
+            ).order_by(Notification.updated_at, Notification.id).limit(batch_size)
+        ]
+        if not ids:
+            break
+
+        expired = (Notification.id.in_(ids), Notification.is_read == True, Notification.updated_at < cutoff)
+        if archive:
+            db.execute(
+                insert(archive_table).from_select(
+                    _ARCHIVED_COLUMNS,
+                    select(*source_columns).where(*expired)
+                ).on_conflict_do_nothing(index_elements=["id"])
+            )
+        removed = db.query(Notification).filter(*expired).delete(synchronize_session=False)
+        db.commit()
+
+        processed += removed
+        batches += 1
+        if len(ids) < batch_size or not removed:
+            break
+        if max_seconds is not None and time.perf_counter() - started >= max_seconds:
+            logger.info(f"Notification retention stopped after {max_seconds}s budget; resuming next run")
+            break
+        time.sleep(pause_seconds)
+
+    return RetentionResult(processed, batches, time.perf_counter() - started)
+
+
+def run_notification_retention(db: Session) -> RetentionResult:
+    """Scheduled job entry point, configured from settings"""
+    purge_notification_actors(db)
+    result = compact_notifications(
+        db,
+        older_than_days=settings.notification_retention_days,
+        archive=settings.notification_retention_archive,
+        batch_size=settings.notification_retention_batch_size,
+        pause_seconds=settings.notification_retention_pause_seconds,
+        max_seconds=settings.notification_retention_max_seconds
+    )
+    if result.processed:
+        rate = result.processed / result.seconds if result.seconds else 0
+        action = "archived" if settings.notification_retention_archive else "deleted"
+        logger.info(
+            f"Notification retention {action} {result.processed} rows in {result.batches} batches "
+            f"({result.seconds:.1f}s, {rate:,.0f} rows/s)"
+        )
+    return result
@@ -0,0 +1,334 @@
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy import String, and_, case, cast, delete, exists, func, literal, select, update
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+import time
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.core.pubsub import hub
+from app.models.notification_model import Notification, NotificationActor, NotificationCounter
+from app.models.user_model import User
+from app.services import outbox
+
+logger = logging.getLogger(__name__)
+
+# user_id -> unread count. Short TTL bounds staleness for writes made by other workers.
+_unread_cache = TTLCache("notification_unread", ttl_seconds=5, max_entries=10000)
+
+SyncState = namedtuple("SyncState", ["unread_count", "version", "changed_at"])
+# Rows removed by delete_notifications, and the users whose unread count went down
+DeletedNotifications = namedtuple("DeletedNotifications", ["deleted", "unread_user_ids"])
+
+# Counters changed more recently than this are not corrected by reconcile_unread_counts
+RECONCILE_GRACE_SECONDS = 60
+
+# Long enough to hold three 100-character actor names, newest first
+_LATEST_ACTORS_LENGTH = 400
+
+
+def adjust_unread(db: Session, user_id: int, delta: int):
+    """Atomically add `delta` to a user's unread counter inside the caller's transaction.
+
+    Every call also bumps the user's sync version, so pass 0 for changes
+    that do not affect the unread count.
+    """
+    table = NotificationCounter.__table__
+    insert = dialect_insert(db)
+    stmt = insert(table).values(user_id=user_id, unread_count=max(delta, 0), version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={
+            "unread_count": table.c.unread_count + delta,
+            "version": table.c.version + 1,
+            "updated_at": func.now()
+        }
+    )
+    db.execute(stmt)
+
+
+def get_unread_count(db: Session, user_id: int) -> int:
+    """Unread count from the cache, or a single primary-key read of the counter"""
+    count = _unread_cache.get(user_id)
+    if count is None:
+        count = db.query(NotificationCounter.unread_count).filter(
+            NotificationCounter.user_id == user_id
+        ).scalar() or 0
+        count = max(count, 0)
+        _unread_cache.set(user_id, count)
+    return count
+
+
+def get_sync_state(db: Session, user_id: int) -> SyncState:
+    """Uncached primary-key read of the counter row, used as the delta-sync cursor"""
+    row = db.query(
+        NotificationCounter.unread_count,
+        NotificationCounter.version,
+        NotificationCounter.updated_at
+    ).filter(NotificationCounter.user_id == user_id).first()
+    if row is None:
+        return SyncState(0, 0, None)
+    return SyncState(max(row.unread_count, 0), row.version, row.updated_at)
+
+
+def delete_notifications(db: Session, *criteria) -> DeletedNotifications:
+    """Delete the notifications matching `criteria` inside the caller's transaction.
+
+    Unread rows are deleted first, returning their recipients, so each
+    counter goes down by exactly the unread rows removed even while some
+    are being marked read concurrently. After committing, call
+    invalidate_unread (and publish_unread_count) for `unread_user_ids`.
+    """
+    table = Notification.__table__
+    unread_owners = Counter(db.execute(
+        delete(table).where(*criteria, table.c.is_read == False).returning(table.c.user_id)
+    ).scalars())
+    deleted = sum(unread_owners.values()) + db.execute(delete(table).where(*criteria)).rowcount
+    # Fixed order, so concurrent deletes lock the counter rows in the same sequence
+    for user_id in sorted(unread_owners):
+        adjust_unread(db, user_id, -unread_owners[user_id])
+    return DeletedNotifications(deleted, sorted(unread_owners))
+
+
+def invalidate_unread(user_id: int):
+    """Forget a cached unread count once a change to it has been committed"""
+    _unread_cache.invalidate(user_id)
+
+
+def notify_coalesced(
+    db: Session,
+    user_id: int,
+    notification_type: str,
+    target: str,
+    action: str,
+    actor_id: int,
+    actor_name: str,
+    body: str,
+    actor_avatar: Optional[str] = None,
+    question_id: Optional[int] = None,
+    content_id: Optional[int] = None
+) -> Optional[str]:
+    """Record an event inside the caller's transaction, merged with earlier ones on the same target.
+
+    Events of one type on one target (e.g. "question:42") within the
+    coalescing window share a single row keyed by (user_id, group_key),
+    so a popular question yields one "Bob and 11 others liked your
+    question" row rather than twelve. Each actor is counted once per
+    group: a repeat (like, unlike, like again) changes nothing and returns
+    None. Otherwise returns the group key, for publish_coalesced.
+    """
+    window = max(settings.notification_coalesce_window_seconds, 1)
+    group_key = f"{notification_type}:{target}:{int(time.time() // window)}"
+    insert = dialect_insert(db)
+
+    first_time = db.execute(
+        insert(NotificationActor.__table__)
+        .values(user_id=user_id, group_key=group_key, actor_id=actor_id)
+        .on_conflict_do_nothing()
+    ).rowcount
+    if not first_time:
+        return None
+
+    table = Notification.__table__
+    merged = {
+        "actor_count": table.c.actor_count + 1,
+        "latest_actors": func.substr(
+            literal(actor_name + "\n") + func.coalesce(table.c.latest_actors, ""), 1, _LATEST_ACTORS_LENGTH
+        ),
+        "title": literal(actor_name) + case(
+            (table.c.actor_count == 1, literal(" and 1 other ")),
+            else_=literal(" and ") + cast(table.c.actor_count, String) + " others "
+        ) + action,
+        "body": body,
+        "author_name": actor_name,
+        "author_avatar": actor_avatar,
+        # Fresh activity moves the group back to the top of the list
+        "created_at": func.now(),
+        "updated_at": func.now(),
+    }
+    # Inserts a new row, or brings a read one back as unread; either way one more unread.
+    # A row that is already unread is left to the merge below.
+    upsert = insert(table).values(
+        notification_type=notification_type,
+        title=f"{actor_name} {action}",
+        body=body,
+        content_id=content_id,
+        question_id=question_id,
+        author_name=actor_name,
+        author_avatar=actor_avatar,
+        user_id=user_id,
+        is_read=False,
+        group_key=group_key,
+        actor_count=1,
+        latest_actors=actor_name
+    ).on_conflict_do_update(
+        index_elements=["user_id", "group_key"],
+        set_=dict(merged, is_read=False),
+        where=(table.c.is_read == True)
+    ).returning(table.c.id)
+
+    # Merging into an unread row leaves the unread count unchanged. If there is none, the
+    # upsert adds one unless a concurrent event created it first; then merge into that.
+    unread_delta = 0
+    while not db.query(Notification).filter(
+        Notification.user_id == user_id,
+        Notification.group_key == group_key,
+        Notification.is_read == False
+    ).update(merged, synchronize_session=False):
+        if db.execute(upsert).first() is not None:
+            unread_delta = 1
+            break
+
+    adjust_unread(db, user_id, unread_delta)
+    return group_key
+
+
+def purge_notification_actors(db: Session) -> int:
+    """Forget the actors of groups whose coalescing window has closed"""
+    window = max(settings.notification_coalesce_window_seconds, 1)
+    cutoff = datetime.utcnow() - timedelta(seconds=window)
+    purged = db.query(NotificationActor).filter(
+        NotificationActor.created_at < cutoff
+    ).delete(synchronize_session=False)
+    db.commit()
+    return purged
+
+
+def publish_coalesced(db: Session, user_id: int, group_key: str):
+    """Push the committed state of a coalesced notification"""
+    notification = db.query(Notification).filter(
+        Notification.user_id == user_id,
+        Notification.group_key == group_key
+    ).first()
+    if notification is not None:
+        publish_notification(db, notification)
+
+
+def notification_event(notification: Notification) -> dict:
+    """Compact push payload for a notification (kept well under the NOTIFY size limit)"""
+    body = notification.body or ""
+    return {
+        "id": notification.id,
+        "notification_type": notification.notification_type,
+        "title": notification.title,
+        "body": body[:200] + "..." if len(body) > 200 else body,
+        "content_id": notification.content_id,
+        "question_id": notification.question_id,
+        "author_name": notification.author_name,
+        "author_avatar": notification.author_avatar,
+        "is_read": notification.is_read,
+        "actor_count": notification.actor_count,
+        "latest_actors": notification.latest_actor_names,
+        "created_at": notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+
+def publish_notification(db: Session, notification: Notification):
+    """Push a committed notification and the recipient's new unread count to their connections"""
+    hub.publish(notification.user_id, "notification", {
+        "notification": notification_event(notification),
+        "unread_count": get_unread_count(db, notification.user_id),
+    })
+
+
+def publish_unread_count(db: Session, user_id: int):
+    """Push a user's unread count after read state changes, so other devices stay in sync"""
+    hub.publish(user_id, "unread_count", {"unread_count": get_unread_count(db, user_id)})
+
+
+@outbox.handler("content_published")
+def notify_content_published(db: Session, payload: dict):
+    """Outbox handler: notify about newly published content"""
+    body = payload["body"]
+    notification = Notification(
+        notification_type="content",
+        title=f"New {payload['post_type']} Content: {payload['title']}",
+        body=body[:200] + "..." if len(body) > 200 else body,
+        content_id=payload["content_id"],
+        author_name=payload["author_name"],
+        author_avatar=payload.get("author_avatar"),
+        user_id=payload["user_id"],  # Notify the creator (or change to followers later)
+        is_read=False
+    )
+    db.add(notification)
+    adjust_unread(db, notification.user_id, 1)
+    db.flush()
+    db.refresh(notification)
+    user_id = notification.user_id
+    data = {
+        "notification": notification_event(notification),
+        "unread_count": get_sync_state(db, user_id).unread_count,
+    }
+
+    def after_commit():
+        invalidate_unread(user_id)
+        hub.publish(user_id, "notification", data)
+    return after_commit
+
+
+def reconcile_unread_counts(db: Session, batch_size: int = 10000) -> int:
+    """Recompute unread counts from the notifications table and correct any drifted counters.
+
+    Users are processed in primary-key ranges of `batch_size`, one commit
+    per range, each with set-based statements run in the database.
+    Counters touched in the last RECONCILE_GRACE_SECONDS are skipped, so an
+    adjust_unread committed while the rows were being counted is never
+    overwritten; they are checked again on the next run. Cached counts
+    catch up within their TTL.
+
+    Returns the number of counters that were corrected.
+    """
+    table = NotificationCounter.__table__
+    insert = dialect_insert(db)
+    settled = datetime.utcnow() - timedelta(seconds=RECONCILE_GRACE_SECONDS)
+    unread = Notification.is_read == False
+    max_user_id = db.query(func.max(User.id)).scalar() or 0
+    corrected = 0
+
+    for low in range(0, max_user_id + 1, batch_size):
+        high = low + batch_size
+        actual = (
+            select(Notification.user_id.label("user_id"), func.count(Notification.id).label("unread_count"))
+            .where(unread, Notification.user_id >= low, Notification.user_id < high)
+            .group_by(Notification.user_id)
+            .subquery()
+        )
+        stale = and_(table.c.user_id >= low, table.c.user_id < high, table.c.updated_at < settled)
+        bumped = {"version": table.c.version + 1, "updated_at": func.now()}
+
+        # Users with unread rows but a wrong count
+        drifted = db.execute(
+            update(table)
+            .where(stale, table.c.user_id == actual.c.user_id, table.c.unread_count != actual.c.unread_count)
+            .values(unread_count=actual.c.unread_count, **bumped)
+        ).rowcount
+        # Users with no unread rows left
+        emptied = db.execute(
+            update(table)
+            .where(stale, table.c.unread_count != 0, ~exists().where(unread, Notification.user_id == table.c.user_id))
+            .values(unread_count=0, **bumped)
+        ).rowcount
+        # Users with unread rows but no counter yet; the WHERE is required by SQLite's upsert syntax
+        missing = db.execute(
+            insert(table)
+            .from_select(
+                ["user_id", "unread_count", "version"],
+                select(actual.c.user_id, actual.c.unread_count, literal(1)).where(actual.c.unread_count > 0)
+            )
+            .on_conflict_do_nothing(index_elements=["user_id"])
+        ).rowcount
+        db.commit()
+
+        if drifted or emptied or missing:
+            logger.warning(
+                f"Unread counter drift for users {low}-{high - 1}: "
+                f"{drifted} wrong, {emptied} emptied, {missing} missing counters"
+            )
+        corrected += drifted + emptied + missing
+
+    if corrected:
+        logger.info(f"Unread counter reconciliation corrected {corrected} counters")
+    return corrected
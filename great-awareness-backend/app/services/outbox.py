@@ -0,0 +1,236 @@
+"""Transactional outbox.
+
+Request handlers call ``enqueue()`` inside their own transaction, so a
+side effect is recorded if and only if the domain write commits. The
+``OutboxDispatcher`` running in every worker claims due events in
+batches (``FOR UPDATE SKIP LOCKED`` on Postgres, so workers never share
+an event), runs the registered handler for each inside a savepoint, and
+retries failures with exponential backoff until ``max_attempts``.
+"""
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import json
+import logging
+import random
+import time
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal
+from app.models.outbox_model import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+# A handler applies one event inside the dispatcher's transaction and may
+# return a callback to run once that transaction has committed.
+Handler = Callable[[Session, Dict[str, Any]], Optional[Callable[[], None]]]
+
+_handlers: Dict[str, Handler] = {}
+
+
+def handler(event_type: str):
+    """Register the function that processes `event_type` events"""
+    def register(func: Handler) -> Handler:
+        _handlers[event_type] = func
+        return func
+    return register
+
+
+def enqueue(db: Session, event_type: str, payload: Dict[str, Any]):
+    """Record a side effect in the caller's transaction; call `dispatcher.wake()` after commit"""
+    now = datetime.utcnow()
+    db.add(OutboxEvent(
+        event_type=event_type,
+        payload=json.dumps(payload),
+        created_at=now,
+        available_at=now
+    ))
+
+
+class OutboxDispatcher:
+    """Background loop that drains the outbox in batches"""
+
+    THROUGHPUT_WINDOW_SECONDS = 60
+
+    def __init__(self):
+        self.batch_size = 100
+        self.poll_interval = 1.0
+        self.max_attempts = 8
+        self.retry_base_seconds = 2.0
+        self.retry_max_seconds = 3600.0
+        self.processed = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_seconds = 0.0
+        self.lag_seconds = 0.0
+        self.last_error: Optional[str] = None
+        self._recent = deque()  # (monotonic time, events processed) per batch
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def configure(self, batch_size: int, poll_interval: float, max_attempts: int, retry_base_seconds: float):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="outbox-dispatcher")
+        logger.info("Outbox dispatcher started")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def wake(self):
+        """Ask the dispatcher to run now instead of at its next poll (safe from any thread)"""
+        if self._loop is None or self._wakeup is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while True:
+            try:
+                handled = await asyncio.to_thread(self.dispatch_batch)
+            except Exception as e:
+                handled = 0
+                self.last_error = str(e)
+                logger.error(f"Outbox dispatch failed: {e}")
+            if handled >= self.batch_size:
+                continue  # more is probably waiting
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def dispatch_batch(self) -> int:
+        """Claim and process one batch of due events; returns how many were handled"""
+        db = SessionLocal()
+        after_commit = []
+        started = time.perf_counter()
+        try:
+            now = datetime.utcnow()
+            events = db.query(OutboxEvent).filter(
+                OutboxEvent.status == "pending",
+                OutboxEvent.available_at <= now
+            ).order_by(OutboxEvent.id).limit(self.batch_size).with_for_update(skip_locked=True).all()
+            if not events:
+                self.lag_seconds = 0.0
+                db.rollback()
+                return 0
+            oldest = events[0].created_at
+            if oldest.tzinfo is not None:
+                oldest = oldest.astimezone(timezone.utc).replace(tzinfo=None)
+            self.lag_seconds = max((now - oldest).total_seconds(), 0.0)
+
+            for event in events:
+                process = _handlers.get(event.event_type)
+                try:
+                    if process is None:
+                        raise LookupError(f"No outbox handler for '{event.event_type}'")
+                    with db.begin_nested():
+                        callback = process(db, json.loads(event.payload))
+                    if callback is not None:
+                        after_commit.append(callback)
+                    event.status = "done"
+                    event.processed_at = now
+                    self.processed += 1
+                except Exception as e:
+                    event.attempts += 1
+                    event.last_error = str(e)[:1000]
+                    if event.attempts >= self.max_attempts:
+                        event.status = "failed"
+                        self.failed += 1
+                        logger.error(f"Outbox event {event.id} ({event.event_type}) failed permanently: {e}")
+                    else:
+                        event.available_at = now + self._backoff(event.attempts)
+                        self.retried += 1
+                        logger.warning(f"Outbox event {event.id} ({event.event_type}) failed, attempt {event.attempts}: {e}")
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        for callback in after_commit:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Outbox after-commit callback failed: {e}")
+
+        self.batches += 1
+        self.last_batch_seconds = time.perf_counter() - started
+        self._record(len(events))
+        return len(events)
+
+    def _record(self, count: int):
+        now = time.monotonic()
+        self._recent.append((now, count))
+        while self._recent and now - self._recent[0][0] > self.THROUGHPUT_WINDOW_SECONDS:
+            self._recent.popleft()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        recent = sum(count for at, count in self._recent if now - at <= self.THROUGHPUT_WINDOW_SECONDS)
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "processed": self.processed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "batches": self.batches,
+            "events_per_second": recent / self.THROUGHPUT_WINDOW_SECONDS,
+            "lag_seconds": self.lag_seconds,
+            "last_batch_seconds": self.last_batch_seconds,
+            "last_error": self.last_error,
+        }
+
+
+def get_outbox_counts(db: Session) -> Dict[str, int]:
+    """Event counts by status"""
+    return dict(db.query(OutboxEvent.status, func.count(OutboxEvent.id)).group_by(OutboxEvent.status).all())
+
+
+def purge_processed_events(db: Session, older_than_hours: int = 24, batch_size: int = 1000) -> int:
+    """Scheduled job: delete processed events older than `older_than_hours`, in batches"""
+    cutoff = datetime.utcnow() - timedelta(hours=older_than_hours)
+    purged = 0
+    while True:
+        ids = [
+            event_id for (event_id,) in db.query(OutboxEvent.id).filter(
+                OutboxEvent.status == "done",
+                OutboxEvent.processed_at < cutoff
+            ).order_by(OutboxEvent.id).limit(batch_size)
+        ]
+        if not ids:
+            break
+        db.query(OutboxEvent).filter(OutboxEvent.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        purged += len(ids)
+    if purged:
+        logger.info(f"Purged {purged} processed outbox events")
+    return purged
+
+
+dispatcher = OutboxDispatcher()
@@ -0,0 +1,223 @@
+"""Near-duplicate detection for questions with MinHash signatures and LSH banding.
+
+Each question's title and content are reduced to word shingles, hashed
+into a NUM_PERM-value MinHash signature and split into BANDS bands.
+Questions that share any band bucket are candidates. A candidate whose
+estimated Jaccard similarity reaches SIMILARITY_THRESHOLD joins that
+question's cluster; otherwise the question starts a new cluster. With
+16 bands of 4 rows the LSH curve crosses 50% at a similarity of ~0.5.
+
+Candidate sets are capped (MAX_BUCKET_MEMBERS in memory, MAX_CANDIDATES
+in SQL) so a very popular question does not make inserts quadratic: any
+recent member of a hot bucket is as good a match as all of them.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from sqlalchemy import func, desc, tuple_
+from sqlalchemy.orm import Session, aliased
+
+from app.models.question_model import Question
+from app.models.question_cluster_model import QuestionSignature, QuestionLSHBucket
+from app.services.text_features import tokenize, word_ngrams, hash_feature
+
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = 0.5
+MAX_BUCKET_MEMBERS = 8
+MAX_CANDIDATES = 64
+
+_PRIME = (1 << 31) - 1
+_BAND_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+class MinHasher:
+    """Deterministic MinHash over 31-bit shingle hashes (same parameters in every process)"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+    @staticmethod
+    def shingles(text: str) -> Set[int]:
+        """Hashed word unigrams and bigrams, ignoring case and stopwords"""
+        return {hash_feature(gram) % _PRIME for gram in set(word_ngrams(tokenize(text)))}
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text)
+        if not hashes:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint32)
+        x = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        return ((self._a * x + self._b) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """One non-negative 63-bit bucket key per band (multiplicative hash, wraps mod 2**64)"""
+    rows = signature.astype(np.uint64).reshape(BANDS, ROWS_PER_BAND)
+    keys = np.zeros(BANDS, dtype=np.uint64)
+    for column in range(ROWS_PER_BAND):
+        keys = keys * _BAND_MULTIPLIER + rows[:, column]
+    return (keys >> np.uint64(1)).tolist()
+
+
+def question_text(title: str, content: str) -> str:
+    return f"{title}\n{content or ''}"
+
+
+_hasher = MinHasher()
+
+
+def compute_signature(title: str, content: str) -> np.ndarray:
+    return _hasher.signature(question_text(title, content))
+
+
+class LSHIndex:
+    """In-memory LSH index used for bulk rebuilds and benchmarks"""
+
+    def __init__(self):
+        self.buckets: Dict[tuple, List[int]] = {}
+        self.clusters: Dict[int, int] = {}
+        self._rows: Dict[int, int] = {}
+        self._matrix = np.empty((1024, NUM_PERM), dtype=np.uint32)
+
+    def add(self, item_id: int, signature: np.ndarray) -> int:
+        """Index a signature and return the cluster it was assigned to"""
+        keys = list(enumerate(band_buckets(signature)))
+        candidates = list({cid for key in keys for cid in self.buckets.get(key, ())})
+        best = _best_match(signature, candidates, self._matrix[[self._rows[cid] for cid in candidates]])
+        cluster_id = self.clusters[best] if best is not None else item_id
+
+        row = len(self._rows)
+        if row == len(self._matrix):
+            self._matrix = np.concatenate([self._matrix, np.empty_like(self._matrix)])
+        self._matrix[row] = signature
+        self._rows[item_id] = row
+        for key in keys:
+            members = self.buckets.setdefault(key, [])
+            if len(members) < MAX_BUCKET_MEMBERS:
+                members.append(item_id)
+        self.clusters[item_id] = cluster_id
+        return cluster_id
+
+
+def _best_match(signature: np.ndarray, ids: List[int], matrix: np.ndarray) -> Optional[int]:
+    """Id of the candidate signature (row of `matrix`) most similar to `signature`, if similar enough"""
+    if not ids:
+        return None
+    scores = np.count_nonzero(matrix == signature, axis=1)
+    best = int(np.argmax(scores))
+    return ids[best] if scores[best] >= SIMILARITY_THRESHOLD * len(signature) else None
+
+
+def index_question(db: Session, question: Question):
+    """Compute and store a question's signature, buckets and cluster.
+
+    Runs inside the caller's transaction; the question must have been flushed.
+    """
+    signature = compute_signature(question.title, question.content)
+    buckets = band_buckets(signature)
+
+    db.query(QuestionLSHBucket).filter(QuestionLSHBucket.question_id == question.id).delete(synchronize_session=False)
+
+    candidate_ids = {
+        qid for (qid,) in db.query(QuestionLSHBucket.question_id).filter(
+            tuple_(QuestionLSHBucket.band, QuestionLSHBucket.bucket).in_(list(enumerate(buckets))),
+            QuestionLSHBucket.question_id != question.id
+        ).order_by(QuestionLSHBucket.question_id.desc()).limit(MAX_CANDIDATES)
+    }
+
+    cluster_id = None
+    if candidate_ids:
+        rows = db.query(QuestionSignature).filter(QuestionSignature.question_id.in_(candidate_ids)).all()
+        matrix = np.frombuffer(b"".join(row.signature for row in rows), dtype="<u4").reshape(-1, NUM_PERM)
+        best = _best_match(signature, [row.question_id for row in rows], matrix)
+        if best is not None:
+            cluster_id = next(row.cluster_id for row in rows if row.question_id == best)
+
+    record = db.query(QuestionSignature).filter(QuestionSignature.question_id == question.id).first()
+    if record is None:
+        record = QuestionSignature(question_id=question.id)
+        db.add(record)
+    record.signature = signature.astype("<u4").tobytes()
+    record.cluster_id = cluster_id if cluster_id is not None else question.id
+
+    db.add_all([
+        QuestionLSHBucket(question_id=question.id, band=band, bucket=bucket)
+        for band, bucket in enumerate(buckets)
+    ])
+
+
+def rebuild_index(db: Session, batch_size: int = 1000) -> int:
+    """Recompute every signature and cluster from scratch in id order. Returns questions indexed."""
+    db.query(QuestionLSHBucket).delete(synchronize_session=False)
+    db.query(QuestionSignature).delete(synchronize_session=False)
+    db.commit()
+
+    index = LSHIndex()
+    last_id, total = 0, 0
+    while True:
+        batch = db.query(Question.id, Question.title, Question.content).filter(
+            Question.id > last_id
+        ).order_by(Question.id).limit(batch_size).all()
+        if not batch:
+            break
+
+        signatures, buckets = [], []
+        for qid, title, content in batch:
+            signature = compute_signature(title, content)
+            cluster_id = index.add(qid, signature)
+            signatures.append({
+                "question_id": qid,
+                "signature": signature.astype("<u4").tobytes(),
+                "cluster_id": cluster_id,
+            })
+            buckets.extend(
+                {"question_id": qid, "band": band, "bucket": bucket}
+                for band, bucket in enumerate(band_buckets(signature))
+            )
+
+        db.execute(QuestionSignature.__table__.insert(), signatures)
+        db.execute(QuestionLSHBucket.__table__.insert(), buckets)
+        db.commit()
+
+        last_id = batch[-1][0]
+        total += len(batch)
+    return total
+
+
+def get_recurring_questions(db: Session, limit: int, days: int) -> List[dict]:
+    """Largest near-duplicate clusters among questions created in the last `days` days"""
+    cutoff_date = datetime.utcnow() - timedelta(days=days)
+    cluster_size = func.count(Question.id).label("cluster_size")
+
+    clusters = db.query(
+        QuestionSignature.cluster_id.label("cluster_id"),
+        cluster_size,
+        func.max(Question.title).label("sample_title"),
+        func.max(Question.category).label("sample_category"),
+    ).join(
+        Question, Question.id == QuestionSignature.question_id
+    ).filter(
+        Question.created_at >= cutoff_date
+    ).group_by(
+        QuestionSignature.cluster_id
+    ).order_by(desc(cluster_size)).limit(limit).subquery()
+
+    root = aliased(Question)
+    rows = db.query(clusters, root.title, root.category).outerjoin(
+        root, root.id == clusters.c.cluster_id
+    ).order_by(desc(clusters.c.cluster_size)).all()
+
+    return [
+        {
+            "cluster_id": row.cluster_id,
+            "question": row.title or row.sample_title,
+            "count": row.cluster_size,
+            "category": row.category or row.sample_category,
+        }
+        for row in rows
+    ]
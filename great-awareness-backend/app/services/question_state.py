@@ -0,0 +1,54 @@
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Tuple
+import time
+
+from app.core.cache import TTLCache
+from app.models.question_model import QuestionLike, QuestionSave
+
+VIEWER_STATE_TTL_SECONDS = 60
+# Past this many question ids a user's entry is started afresh rather than extended
+MAX_QUESTIONS_PER_USER = 500
+
+# user_id -> (created_at, {question_id: (is_liked, is_saved)}) for questions the user has recently seen
+_viewer_state_cache = TTLCache("question_viewer_state", ttl_seconds=VIEWER_STATE_TTL_SECONDS, max_entries=10000)
+
+
+def get_viewer_state(db: Session, user_id: int, question_ids: Iterable[int]) -> Dict[int, Tuple[bool, bool]]:
+    """Resolve like/save state for a page of questions.
+
+    Ids not already cached for the user are resolved with one `IN (...)`
+    query per table, served by the (question_id, user_id) unique indexes.
+    Ids added to a user's entry keep its original expiry, so nothing is
+    served older than the TTL however long the user keeps paging.
+    """
+    question_ids = list(question_ids)
+    created_at, known = _viewer_state_cache.get(user_id) or (time.monotonic(), {})
+    missing = [qid for qid in question_ids if qid not in known]
+    if missing and len(known) + len(missing) > MAX_QUESTIONS_PER_USER:
+        created_at, known, missing = time.monotonic(), {}, question_ids
+
+    if missing:
+        liked_ids = {
+            qid for (qid,) in db.query(QuestionLike.question_id).filter(
+                QuestionLike.user_id == user_id,
+                QuestionLike.question_id.in_(missing)
+            )
+        }
+        saved_ids = {
+            qid for (qid,) in db.query(QuestionSave.question_id).filter(
+                QuestionSave.user_id == user_id,
+                QuestionSave.question_id.in_(missing)
+            )
+        }
+        known = dict(known)
+        for qid in missing:
+            known[qid] = (qid in liked_ids, qid in saved_ids)
+        remaining = created_at + VIEWER_STATE_TTL_SECONDS - time.monotonic()
+        _viewer_state_cache.set(user_id, (created_at, known), ttl_seconds=remaining)
+
+    return {qid: known[qid] for qid in question_ids}
+
+
+def invalidate_viewer_state(user_id: int):
+    """Forget cached like/save state for a user after they toggle one"""
+    _viewer_state_cache.invalidate(user_id)
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from threading import Lock
+from typing import List, Optional
+import logging
+import time
+
+from app.core.cache import TTLCache
+from app.models.question_model import Question
+
+logger = logging.getLogger(__name__)
+
+# Reads never recompute more often than this, however many writes mark the snapshot dirty
+MIN_REFRESH_SECONDS = 5
+
+
+def compute_question_stats(db: Session) -> dict:
+    """Compute Q&A statistics in a single aggregate statement.
+
+    Comment and like totals come from the denormalised counters on each
+    question rather than joins over question_comments/question_likes.
+    """
+    published = Question.status == "published"
+    most_popular = (
+        select(Question.category)
+        .where(published)
+        .group_by(Question.category)
+        .order_by(func.count(Question.id).desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    row = db.execute(
+        select(
+            func.count(Question.id),
+            func.count(func.distinct(Question.category)),
+            most_popular,
+            func.coalesce(func.sum(Question.comments_count), 0),
+            func.coalesce(func.sum(Question.likes_count), 0),
+        ).where(published)
+    ).one()
+
+    return {
+        "total_questions": row[0],
+        "total_categories": row[1],
+        "most_popular_category": row[2] or "None",
+        "total_comments": row[3],
+        "total_likes": row[4],
+    }
+
+
+class QuestionStatsSnapshot:
+    """Process-wide cached stats, refreshed by a timer job or lazily after writes"""
+
+    def __init__(self):
+        self._stats: Optional[dict] = None
+        self._computed_at = 0.0
+        self._dirty = False
+        self._lock = Lock()
+
+    def get(self, db: Session) -> dict:
+        stats = self._stats
+        if stats is None or (self._dirty and time.monotonic() - self._computed_at >= MIN_REFRESH_SECONDS):
+            stats = self.refresh(db)
+        return stats
+
+    def refresh(self, db: Session) -> dict:
+        with self._lock:
+            self._dirty = False
+            stats = compute_question_stats(db)
+            self._stats = stats
+            self._computed_at = time.monotonic()
+        return stats
+
+    def mark_dirty(self):
+        """Called on question, comment and like writes"""
+        self._dirty = True
+
+
+question_stats_snapshot = QuestionStatsSnapshot()
+
+
+def refresh_question_stats(db: Session):
+    """Scheduled job entry point"""
+    question_stats_snapshot.refresh(db)
+
+
+_top_categories_cache = TTLCache("admin_top_questions", ttl_seconds=60, max_entries=256)
+
+
+def get_top_question_categories(db: Session, limit: int, days: int) -> List[dict]:
+    """Busiest question categories over the last `days`, each with a representative title.
+
+    One statement: window functions count each category and rank its
+    questions (most liked, then newest) so only `limit` rows leave the
+    database. Results are cached per (limit, days) for a minute.
+    """
+    key = (limit, days)
+    cached = _top_categories_cache.get(key)
+    if cached is not None:
+        return cached
+
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    ranked = (
+        select(
+            Question.category,
+            Question.title,
+            func.count(Question.id).over(partition_by=Question.category).label("question_count"),
+            func.row_number().over(
+                partition_by=Question.category,
+                order_by=(Question.likes_count.desc(), Question.created_at.desc(), Question.id.desc())
+            ).label("rank")
+        )
+        .where(Question.created_at >= cutoff)
+        .subquery()
+    )
+    rows = db.execute(
+        select(ranked.c.category, ranked.c.title, ranked.c.question_count)
+        .where(ranked.c.rank == 1)
+        .order_by(ranked.c.question_count.desc(), ranked.c.category)
+        .limit(limit)
+    ).all()
+
+    result = [
+        {"question": title, "count": question_count, "category": category}
+        for category, title, question_count in rows
+    ]
+    _top_categories_cache.set(key, result)
+    return result
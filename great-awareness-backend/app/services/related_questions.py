@@ -0,0 +1,238 @@
+"""In-memory vector index for "related questions".
+
+Each published question is embedded as a hashed bag of word unigrams and
+bigrams (title counted twice, sublinear term weights). Every feature is
+spread over HASHES_PER_FEATURE signed positions of a DIMENSIONS-wide
+float32 vector, which is L2-normalised, so cosine similarity is a plain
+dot product against one contiguous matrix.
+
+Each worker process keeps its own index: writes handled by the worker
+are applied immediately after commit, and a periodic sync picks up
+questions written by other workers. The index costs DIMENSIONS * 4 bytes
+per published question in every worker (about 1 GiB at 1M questions);
+see related_index_full_rebuild_max_questions for the periodic rebuild.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+import logging
+import time
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.question_model import Question
+from app.services.text_features import tokenize, word_ngrams, hash_feature
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = 256
+HASHES_PER_FEATURE = 4
+TITLE_WEIGHT = 2
+FULL_REBUILD_SECONDS = 3600
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# Odd 64-bit multipliers; each derives one (position, sign) pair from a feature hash
+_MULTIPLIERS = np.array(
+    [0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93],
+    dtype=np.uint64
+)[:HASHES_PER_FEATURE].reshape(-1, 1)
+
+
+def vectorize(title: str, content: str) -> np.ndarray:
+    """L2-normalised float32 embedding of a question"""
+    counts = Counter()
+    for gram in word_ngrams(tokenize(title or "")):
+        counts[hash_feature(gram)] += TITLE_WEIGHT
+    for gram in word_ngrams(tokenize(content or "")):
+        counts[hash_feature(gram)] += 1
+
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    if not counts:
+        return vector
+
+    hashes = np.fromiter(counts.keys(), dtype=np.uint64, count=len(counts))
+    weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    mixed = hashes * _MULTIPLIERS  # wraps mod 2**64
+    positions = (mixed >> np.uint64(32)) % np.uint64(DIMENSIONS)
+    signs = np.where((mixed >> np.uint64(63)) == 1, -1.0, 1.0)
+    vector += np.bincount(
+        positions.ravel().astype(np.intp),
+        weights=(signs * weights).ravel(),
+        minlength=DIMENSIONS
+    ).astype(np.float32)
+
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+class RelatedQuestionIndex:
+    """Growable float32 matrix of question vectors with vectorised cosine top-k"""
+
+    def __init__(self, dimensions: int = DIMENSIONS, initial_capacity: int = 1024):
+        self._matrix = np.zeros((initial_capacity, dimensions), dtype=np.float32)
+        self._ids = np.zeros(initial_capacity, dtype=np.int64)
+        self._row_of: Dict[int, int] = {}
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._row_of)
+
+    @property
+    def nbytes(self) -> int:
+        return self._matrix.nbytes + self._ids.nbytes
+
+    def upsert(self, question_id: int, vector: np.ndarray):
+        with self._lock:
+            row = self._row_of.get(question_id)
+            if row is None:
+                row = len(self._row_of)
+                if row == len(self._ids):
+                    self._grow()
+                self._row_of[question_id] = row
+                self._ids[row] = question_id
+            self._matrix[row] = vector
+
+    def remove(self, question_id: int):
+        """Delete by moving the last row into the freed slot"""
+        with self._lock:
+            row = self._row_of.pop(question_id, None)
+            if row is None:
+                return
+            last = len(self._row_of)
+            if row != last:
+                moved_id = int(self._ids[last])
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = moved_id
+                self._row_of[moved_id] = row
+            self._matrix[last] = 0
+
+    def ids(self) -> np.ndarray:
+        with self._lock:
+            return self._ids[:len(self._row_of)].copy()
+
+    def get_vector(self, question_id: int) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._row_of.get(question_id)
+            return None if row is None else self._matrix[row].copy()
+
+    def top_k(self, vector: np.ndarray, k: int, exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Ids and cosine scores of the k most similar questions"""
+        with self._lock:
+            size = len(self._row_of)
+            if size == 0:
+                return []
+            scores = self._matrix[:size] @ vector
+            ids = self._ids[:size]
+            wanted = min(k + 1, size)
+            top = np.argpartition(-scores, wanted - 1)[:wanted]
+            top = top[np.argsort(-scores[top])]
+            results = [(int(ids[i]), float(scores[i])) for i in top if ids[i] != exclude_id]
+        return [(qid, score) for qid, score in results[:k] if score > 0]
+
+    def _grow(self):
+        capacity = len(self._ids) * 2
+        matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+        matrix[:len(self._ids)] = self._matrix
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:len(self._ids)] = self._ids
+        self._matrix, self._ids = matrix, ids
+
+
+_index = RelatedQuestionIndex()
+_synced_until: Optional[datetime] = None
+_last_full_load = 0.0
+
+
+def index_question(question: Question):
+    """Apply a committed question write to this worker's index.
+
+    Never raises: the write is already committed, so a failure here is only
+    logged and the next sync picks the question up.
+    """
+    try:
+        if question.status == "published":
+            _index.upsert(question.id, vectorize(question.title, question.content))
+        else:
+            _index.remove(question.id)
+    except Exception as e:
+        logger.error(f"Failed to index question {question.id} for related questions: {e}")
+
+
+def remove_question(question_id: int):
+    """Drop a deleted question from this worker's index; never raises, like index_question"""
+    try:
+        _index.remove(question_id)
+    except Exception as e:
+        logger.error(f"Failed to remove question {question_id} from related questions: {e}")
+
+
+def find_related(question: Question, limit: int) -> List[Tuple[int, float]]:
+    vector = _index.get_vector(question.id)
+    if vector is None:
+        vector = vectorize(question.title, question.content)
+    return _index.top_k(vector, limit, exclude_id=question.id)
+
+
+def _load(index: RelatedQuestionIndex, query, batch_size: int) -> int:
+    last_id, loaded = 0, 0
+    while True:
+        batch = query.filter(Question.id > last_id).order_by(Question.id).limit(batch_size).all()
+        if not batch:
+            return loaded
+        for qid, title, content, status in batch:
+            if status == "published":
+                index.upsert(qid, vectorize(title, content))
+            else:
+                index.remove(qid)
+        last_id = batch[-1][0]
+        loaded += len(batch)
+
+
+def _prune(index: RelatedQuestionIndex, db: Session) -> int:
+    """Drop indexed questions that are no longer published, reading ids only"""
+    published = np.fromiter(
+        (qid for (qid,) in db.query(Question.id).filter(Question.status == "published").yield_per(50000)),
+        dtype=np.int64
+    )
+    ids = index.ids()
+    stale = ids[~np.isin(ids, published)]
+    for qid in stale:
+        index.remove(int(qid))
+    return len(stale)
+
+
+def sync_related_index(db: Session, batch_size: int = 5000):
+    """Scheduled job: rebuild the index periodically, and apply other workers' writes in between.
+
+    Incremental syncs re-read questions whose updated_at moved since the
+    last sync (with an overlap margin). Deletions leave no trail, so they
+    are only dropped periodically: by a full rebuild swapped in atomically,
+    or, above related_index_full_rebuild_max_questions, by pruning the live
+    index so a second copy of the matrix is never built.
+    """
+    global _index, _synced_until, _last_full_load
+    started_at = datetime.utcnow() - SYNC_OVERLAP
+    query = db.query(Question.id, Question.title, Question.content, Question.status)
+    periodic = time.monotonic() - _last_full_load >= FULL_REBUILD_SECONDS
+
+    if _synced_until is None or (periodic and len(_index) <= settings.related_index_full_rebuild_max_questions):
+        index = RelatedQuestionIndex()
+        loaded = _load(index, query.filter(Question.status == "published"), batch_size)
+        _index = index
+        _last_full_load = time.monotonic()
+        logger.info(f"Related-question index rebuilt with {loaded} questions ({index.nbytes / 1024 / 1024:.1f} MiB)")
+    else:
+        changed = _load(_index, query.filter(Question.updated_at >= _synced_until), batch_size)
+        if changed:
+            logger.info(f"Related-question index applied {changed} changes ({len(_index)} indexed)")
+        if periodic:
+            pruned = _prune(_index, db)
+            _last_full_load = time.monotonic()
+            logger.info(f"Related-question index pruned {pruned} questions ({len(_index)} indexed)")
+
+    _synced_until = started_at
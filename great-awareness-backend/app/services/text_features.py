@@ -0,0 +1,32 @@
+from typing import List
+import re
+import zlib
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how i if in is it my me of on or so "
+    "that the this to was what when where which who why will with you your "
+    "please help anyone advice any just really thanks thank".split()
+)
+
+
+def _stem(token: str) -> str:
+    """Fold simple plurals so 'weekends' and 'weekend' share a feature"""
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, plural-folded word tokens with stopwords removed"""
+    return [_stem(t) for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def word_ngrams(tokens: List[str]) -> List[str]:
+    """Word unigrams followed by bigrams (repeats kept, for term counting)"""
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def hash_feature(gram: str) -> int:
+    """Stable 32-bit hash of an n-gram (identical across processes, unlike hash())"""
+    return zlib.crc32(gram.encode())
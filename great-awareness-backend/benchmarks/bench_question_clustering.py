@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark MinHash/LSH question clustering on synthetic questions.
+
+Generates paraphrased questions around a fixed number of underlying
+topics, indexes them with the same engine the API uses and reports
+signature/index throughput, peak memory, top-cluster latency and how
+well clusters line up with the generating topics.
+
+Usage:
+    python benchmarks/bench_question_clustering.py --count 100000
+    python benchmarks/bench_question_clustering.py --count 100000 --db   # also time the SQL path on SQLite
+"""
+
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SUBJECTS = ["anxiety", "panic attacks", "my drinking", "gambling", "my marriage", "grief", "insomnia",
+            "social media", "pornography", "anger", "my childhood trauma", "loneliness", "burnout",
+            "self harm thoughts", "my breakup", "smoking", "overeating", "my parents", "work stress", "jealousy"]
+VERBS = ["stop", "deal with", "cope with", "overcome", "handle", "get over", "manage", "beat"]
+CONTEXTS = ["at night", "after work", "since university", "every weekend", "when I am alone",
+            "during exams", "after my divorce", "since last year", "in the morning", "at family events"]
+FILLERS = ["honestly", "really", "please help", "any advice", "I am struggling", "it is getting worse",
+           "nobody understands", "I feel stuck", "I have tried everything", "thank you"]
+CATEGORIES = ["Addiction", "Trauma", "Relationships", "Anxiety", "Depression"]
+
+
+def make_topics(n_topics: int, rng: random.Random):
+    return [
+        (rng.choice(VERBS), rng.choice(SUBJECTS), rng.choice(CONTEXTS), rng.choice(CATEGORIES))
+        for _ in range(n_topics)
+    ]
+
+
+def make_question(topic, rng: random.Random):
+    verb, subject, context, category = topic
+    title = rng.choice([
+        f"How do I {verb} {subject} {context}?",
+        f"How can I {verb} {subject} {context}",
+        f"Best way to {verb} {subject} {context}?",
+        f"What helps to {verb} {subject} {context}?",
+    ])
+    content = (
+        f"I want to {verb} {subject} {context}. "
+        + " ".join(rng.sample(FILLERS, 3))
+        + f". It started {rng.choice(CONTEXTS)}."
+    )
+    return title, content, category
+
+
+def run_in_memory(questions, topics_of):
+    from app.services.question_clustering import LSHIndex, compute_signature
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    index = LSHIndex()
+
+    started = time.perf_counter()
+    signatures = [compute_signature(title, content) for title, content, _ in questions]
+    signature_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for item_id, signature in enumerate(signatures):
+        index.add(item_id, signature)
+    index_time = time.perf_counter() - started
+
+    # ru_maxrss is in KiB on Linux
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    started = time.perf_counter()
+    top = Counter(index.clusters.values()).most_common(10)
+    top_time = time.perf_counter() - started
+
+    # Purity: share of questions whose cluster is dominated by their own (verb, subject, context)
+    members = {}
+    for item_id, cluster_id in index.clusters.items():
+        members.setdefault(cluster_id, Counter())[topics_of[item_id]] += 1
+    pure = sum(counts.most_common(1)[0][1] for counts in members.values())
+
+    n = len(questions)
+    print(f"questions:            {n}")
+    print(f"signatures:           {signature_time:.2f}s ({n / signature_time:,.0f}/s)")
+    print(f"LSH index inserts:    {index_time:.2f}s ({n / index_time:,.0f}/s)")
+    print(f"peak RSS growth:      {rss_growth / 1024:.1f} MiB (signatures + index)")
+    print(f"clusters:             {len(members)} (purity {pure / n:.1%})")
+    print(f"top-10 clusters:      {top_time * 1000:.1f} ms")
+    for cluster_id, size in top[:5]:
+        print(f"  {size:6d}  {questions[cluster_id][0]}")
+
+
+def run_database(questions, db_path):
+    from app.core.database import SessionLocal, engine, init_db
+    from app.models.user_model import User
+    from app.models.content_model import Content
+    from app.models.comment_model import Comment
+    from app.models.question_model import Question
+    from app.models.notification_model import Notification
+    from app.models.question_cluster_model import QuestionSignature, QuestionLSHBucket
+    from app.services.question_clustering import rebuild_index, get_recurring_questions
+
+    init_db()
+    db = SessionLocal()
+    db.add(User(email="bench@example.com", username="bench", password_hash="x"))
+    db.commit()
+    db.execute(Question.__table__.insert(), [
+        {"title": title, "content": content, "category": category, "author_name": "bench", "user_id": 1,
+         "status": "published", "has_image": False, "is_anonymous": False, "is_featured": False,
+         "likes_count": 0, "comments_count": 0, "saves_count": 0}
+        for title, content, category in questions
+    ])
+    db.commit()
+
+    started = time.perf_counter()
+    rebuild_index(db)
+    rebuild_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    get_recurring_questions(db, limit=10, days=30)
+    query_time = time.perf_counter() - started
+
+    db.close()
+    engine.dispose()
+    print(f"SQLite rebuild:       {rebuild_time:.2f}s")
+    print(f"recurring query:      {query_time * 1000:.1f} ms")
+    print(f"database size:        {os.path.getsize(db_path) / 1024 / 1024:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark question clustering")
+    parser.add_argument("--count", type=int, default=100000, help="Number of synthetic questions")
+    parser.add_argument("--topics", type=int, default=None, help="Distinct underlying topics (default count/25)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", action="store_true", help="Also time the SQL rebuild and query on SQLite")
+    args = parser.parse_args()
+
+    if args.db:
+        # Must be set before the app settings are first imported
+        db_path = os.path.join(tempfile.mkdtemp(), "bench_clustering.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        os.environ["DEBUG"] = "false"
+
+    rng = random.Random(args.seed)
+    topics = make_topics(args.topics or max(1, args.count // 25), rng)
+    # Zipf-like skew: a few topics are asked far more often than the rest
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(topics))]
+    topic_indexes = rng.choices(range(len(topics)), weights=weights, k=args.count)
+    questions = [make_question(topics[topic_index], rng) for topic_index in topic_indexes]
+    topics_of = [topics[topic_index][:3] for topic_index in topic_indexes]
+
+    run_in_memory(questions, topics_of)
+    if args.db:
+        run_database(questions, db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark the in-memory related-questions index.
+
+Builds the float32 vector index over synthetic questions at each
+requested size and reports vectorisation and insert throughput, index
+size, cosine top-k latency percentiles and how often the top results
+share the query's generating topic.
+
+Usage:
+    python benchmarks/bench_related_questions.py --sizes 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_question_clustering import make_topics, make_question
+
+
+def percentile(values, pct):
+    return float(np.percentile(np.asarray(values), pct))
+
+
+def run(size: int, queries: int, k: int, rng: random.Random):
+    from app.services.related_questions import RelatedQuestionIndex, vectorize
+
+    topics = make_topics(max(1, size // 25), rng)
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(topics))]
+    topic_indexes = rng.choices(range(len(topics)), weights=weights, k=size)
+    labels = [topics[t][:3] for t in topic_indexes]
+
+    started = time.perf_counter()
+    vectors = np.empty((size, 256), dtype=np.float32)
+    for row, topic_index in enumerate(topic_indexes):
+        title, content, _ = make_question(topics[topic_index], rng)
+        vectors[row] = vectorize(title, content)
+    vectorize_time = time.perf_counter() - started
+
+    index = RelatedQuestionIndex()
+    started = time.perf_counter()
+    for question_id in range(size):
+        index.upsert(question_id, vectors[question_id])
+    insert_time = time.perf_counter() - started
+
+    latencies, hits = [], 0
+    for question_id in rng.sample(range(size), min(queries, size)):
+        started = time.perf_counter()
+        results = index.top_k(vectors[question_id], k, exclude_id=question_id)
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += sum(1 for rid, _ in results if labels[rid] == labels[question_id])
+
+    print(f"questions:          {size:,}")
+    print(f"vectorize:          {vectorize_time:.1f}s ({size / vectorize_time:,.0f}/s)")
+    print(f"index inserts:      {insert_time:.2f}s ({size / insert_time:,.0f}/s)")
+    print(f"index size:         {index.nbytes / 1024 / 1024:.1f} MiB (capacity incl. growth headroom)")
+    print(f"top-{k} latency:     p50 {percentile(latencies, 50):.2f} ms, "
+          f"p95 {percentile(latencies, 95):.2f} ms, p99 {percentile(latencies, 99):.2f} ms")
+    print(f"same-topic @{k}:     {hits / (len(latencies) * k):.1%}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the related-questions index")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.queries, args.k, random.Random(args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Regression checks for the unread notification counters and coalescing.
+
+Drives the API in-process through the sequences that move
+notification_counters.unread_count and checks every user's counter
+against count(*) of their unread notifications after each step:
+
+- like / unlike / like again by the same user (counted once),
+- likes and comments from several users coalescing into one row,
+- concurrent first likes racing to create the same row,
+- a read group brought back as unread by a new actor,
+- mark one read, mark all read,
+- delete a notification (unread and read), delete a question and a
+  content item whose notifications are unread,
+- reconcile_unread_counts finding nothing to correct.
+
+Coalesced rows are also checked: actor_count must equal the number of
+distinct actors. The script exits with status 1 on the first mismatch.
+By default it runs against a fresh SQLite database; the concurrent step
+only really races on PostgreSQL, so point --database-url at a disposable
+one (the script creates and deletes rows) to exercise it.
+
+Usage:
+    python benchmarks/check_notification_counters.py
+    python benchmarks/check_notification_counters.py --database-url postgresql://.../gwa_check --yes
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CONCURRENT_LIKERS = 8
+
+
+class Checker:
+    def __init__(self, client, SessionLocal):
+        self.client = client
+        self.SessionLocal = SessionLocal
+        self.failures = []
+        self.users = {}
+
+    def user(self, name: str, role: str = "user") -> dict:
+        from app.models.user_model import User
+        from app.routes.auth_routes import create_access_token
+
+        email = f"{name}@counters.example.com"
+        db = self.SessionLocal()
+        try:
+            user = User(username=name, email=email, password_hash="-", role=role, status="active")
+            db.add(user)
+            db.commit()
+            self.users[name] = user.id
+        finally:
+            db.close()
+        return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+    def call(self, method: str, path: str, headers: dict, json: dict = None):
+        response = self.client.request(method, path, headers=headers, json=json)
+        if response.status_code >= 300:
+            self.failures.append(f"{method} {path} returned {response.status_code}: {response.text[:200]}")
+            raise SystemExit(self.report())
+        return response.json() if response.content else None
+
+    def check(self, step: str):
+        """Every counter equals its user's unread rows; every group counts distinct actors"""
+        from sqlalchemy import func
+        from app.models.notification_model import Notification, NotificationActor, NotificationCounter
+
+        db = self.SessionLocal()
+        try:
+            actual = dict(
+                db.query(Notification.user_id, func.count(Notification.id))
+                .filter(Notification.is_read == False)
+                .group_by(Notification.user_id)
+            )
+            stored = dict(db.query(NotificationCounter.user_id, NotificationCounter.unread_count))
+            problems = [
+                f"user {user_id}: counter {stored.get(user_id, 0)}, unread rows {actual.get(user_id, 0)}"
+                for user_id in sorted(set(actual) | set(stored))
+                if stored.get(user_id, 0) != actual.get(user_id, 0)
+            ]
+            actors = dict(
+                db.query(NotificationActor.group_key, func.count(NotificationActor.actor_id))
+                .group_by(NotificationActor.group_key)
+            )
+            for group_key, actor_count in db.query(Notification.group_key, Notification.actor_count).filter(
+                Notification.group_key.isnot(None)
+            ):
+                if actors.get(group_key) != actor_count:
+                    problems.append(f"{group_key}: actor_count {actor_count}, distinct actors {actors.get(group_key)}")
+        finally:
+            db.close()
+
+        print(f"  {'ok  ' if not problems else 'FAIL'} {step}")
+        for problem in problems:
+            print(f"       {problem}")
+        if problems:
+            self.failures.append(step)
+            raise SystemExit(self.report())
+
+    def unread_ids(self, name: str) -> list:
+        from app.models.notification_model import Notification
+
+        db = self.SessionLocal()
+        try:
+            return [notification_id for (notification_id,) in db.query(Notification.id).filter(
+                Notification.user_id == self.users[name], Notification.is_read == False
+            ).order_by(Notification.id)]
+        finally:
+            db.close()
+
+    def report(self) -> int:
+        if self.failures:
+            print(f"{len(self.failures)} failed: {', '.join(self.failures)}")
+            return 1
+        print("All counters match")
+        return 0
+
+
+def run(checker: Checker):
+    from app.services.notification_service import reconcile_unread_counts
+
+    call, check = checker.call, checker.check
+    question_body = {"title": "How do you cope with worry?", "category": "Anxiety", "content": "Looking for advice"}
+
+    alice = checker.user("alice")
+    bob = checker.user("bob")
+    carol = checker.user("carol")
+    admin = checker.user("admin", role="admin")
+
+    question_id = call("POST", "/api/qa/questions", alice, question_body)["id"]
+    like = f"/api/qa/questions/{question_id}/like"
+
+    call("POST", like, bob)
+    call("POST", like, bob)
+    call("POST", like, bob)
+    check("like / unlike / like by one user")
+
+    call("POST", like, carol)
+    call("POST", f"/api/qa/questions/{question_id}/comments", bob, {"text": "Breathing exercises help me"})
+    call("POST", f"/api/qa/questions/{question_id}/comments", bob, {"text": "So does walking"})
+    check("likes and comments from several users")
+
+    racers = [checker.user(f"racer{i}") for i in range(CONCURRENT_LIKERS)]
+    racer_question_id = call("POST", "/api/qa/questions", alice, question_body)["id"]
+    with ThreadPoolExecutor(CONCURRENT_LIKERS) as pool:
+        list(pool.map(lambda headers: call("POST", f"/api/qa/questions/{racer_question_id}/like", headers), racers))
+    check(f"{CONCURRENT_LIKERS} concurrent first likes")
+
+    call("PATCH", f"/api/notifications/{checker.unread_ids('alice')[0]}/read", alice)
+    check("mark one read")
+
+    call("POST", like, bob)
+    call("POST", like, bob)
+    check("repeat actor on a read group")
+    call("POST", like, checker.user("dave"))
+    check("new actor on a read group")
+
+    call("PATCH", "/api/notifications/mark-all-read", alice)
+    check("mark all read")
+
+    call("POST", f"/api/qa/questions/{racer_question_id}/like", checker.user("erin"))
+    unread_id = checker.unread_ids("alice")[0]
+    call("DELETE", f"/api/notifications/{unread_id}", alice)
+    check("delete an unread notification")
+    call("POST", "/api/notifications/", admin, {
+        "notification_type": "system", "title": "Welcome", "body": "Hello", "author_name": "admin",
+        "user_id": checker.users["alice"], "is_read": True
+    })
+    read_id = call("GET", "/api/notifications/sync", alice)["items"][-1]["id"]
+    call("DELETE", f"/api/notifications/{read_id}", alice)
+    check("delete a read notification")
+
+    call("POST", like, checker.user("frank"))
+    call("POST", f"/api/qa/questions/{question_id}/comments", carol, {"text": "Talking to friends"})
+    call("DELETE", f"/api/qa/questions/{question_id}", alice)
+    check("delete a question with unread notifications")
+
+    content = call("POST", "/api/content/", admin, {
+        "title": "Grounding techniques", "body": "Five things you can see...", "topic": "Anxiety",
+        "post_type": "text", "is_text_only": True, "author_name": "admin", "status": "published"
+    })
+    call("POST", "/api/notifications/", admin, {
+        "notification_type": "post", "title": "New content", "body": "Grounding techniques",
+        "author_name": "admin", "content_id": content["id"], "user_id": checker.users["bob"]
+    })
+    call("DELETE", f"/api/content/{content['id']}", admin)
+    check("delete content with unread notifications")
+
+    db = checker.SessionLocal()
+    try:
+        corrected = reconcile_unread_counts(db)
+    finally:
+        db.close()
+    if corrected:
+        checker.failures.append(f"reconcile_unread_counts corrected {corrected} counters")
+    check("reconciliation finds no drift")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check unread notification counters against the notifications table")
+    parser.add_argument("--database-url", default=None, help="Disposable database to use instead of a temporary SQLite file")
+    parser.add_argument("--yes", action="store_true", help="Allow running against a non-SQLite database")
+    args = parser.parse_args()
+
+    # Must be set before the app settings are first imported
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'counters.db')}"
+    os.environ["DEBUG"] = "false"
+    os.environ["SLOW_QUERY_ENABLED"] = "false"
+    os.environ["TRACING_ENABLED"] = "false"
+
+    from fastapi.testclient import TestClient
+
+    import main as app_main
+    from app.core.database import SessionLocal, engine, init_db
+
+    if engine.dialect.name != "sqlite" and not args.yes:
+        print(f"Refusing to run against {engine.url.render_as_string(hide_password=True)} without --yes")
+        sys.exit(1)
+
+    init_db()
+    checker = Checker(TestClient(app_main.app, raise_server_exceptions=False), SessionLocal)
+    print(f"Unread counters ({engine.dialect.name}):")
+    run(checker)
+    sys.exit(checker.report())
+
+
+if __name__ == "__main__":
+    main()
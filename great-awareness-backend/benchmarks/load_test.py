@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Load-test the API with realistic user scenarios.
+
+Virtual users run a weighted mix of scenarios (browse the question feed
+and content feed, open a question, like, comment, poll notifications and
+log in) for a fixed duration. The report gives per-scenario
+p50/p95/p99 latency, error counts and overall throughput.
+
+By default the app runs in-process (ASGI transport, startup/shutdown
+hooks included) on a fresh SQLite database, so runs are reproducible
+without a server; use --url to target a running server instead (its
+database is seeded through the API only, and content is whatever exists).
+
+Results can be saved as a baseline and later runs compared against it:
+the script exits with status 1 when a scenario's p95 grows, or overall
+throughput drops, by more than --threshold.
+
+Requires httpx (pip install httpx).
+
+Usage:
+    python benchmarks/load_test.py --duration 30 --concurrency 10
+    python benchmarks/load_test.py --save-baseline
+    python benchmarks/load_test.py --url http://localhost:8000 --baseline benchmarks/baselines/load_test_pg.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import numpy as np
+
+from bench_question_clustering import make_topics, make_question
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "load_test.json")
+PASSWORD = "LoadTest123"
+
+# Relative frequency of each scenario in the mix
+SCENARIOS = {
+    "browse_feed": 30,
+    "browse_content": 10,
+    "open_question": 25,
+    "like": 10,
+    "comment": 5,
+    "poll_notifications": 15,
+    "login": 5,
+}
+
+
+class LoadState:
+    def __init__(self, users, question_ids, rng: random.Random):
+        self.users = users  # [(email, headers)]
+        self.question_ids = question_ids
+        self.rng = rng
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def question_id(self) -> int:
+        # Engagement is skewed towards a few popular questions
+        return self.question_ids[min(int(self.rng.paretovariate(1.2)) - 1, len(self.question_ids) - 1)]
+
+
+async def scenario_request(client: httpx.AsyncClient, state: LoadState, name: str):
+    email, headers = state.rng.choice(state.users)
+    if name == "browse_feed":
+        return await client.get("/api/qa/questions", params={"page": state.rng.randint(1, 5), "per_page": 20}, headers=headers)
+    if name == "browse_content":
+        return await client.get("/api/content/", params={"limit": 10})
+    if name == "open_question":
+        return await client.get(f"/api/qa/questions/{state.question_id()}", headers=headers)
+    if name == "like":
+        return await client.post(f"/api/qa/questions/{state.question_id()}/like", headers=headers)
+    if name == "comment":
+        return await client.post(
+            f"/api/qa/questions/{state.question_id()}/comments",
+            json={"text": "Thank you for sharing, this helped me too.", "is_anonymous": state.rng.random() < 0.3},
+            headers=headers
+        )
+    if name == "poll_notifications":
+        return await client.get("/api/notifications/sync", headers=headers)
+    if name == "login":
+        return await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+    raise ValueError(f"Unknown scenario {name}")
+
+
+async def virtual_user(client: httpx.AsyncClient, state: LoadState, deadline: float):
+    names = list(SCENARIOS)
+    weights = list(SCENARIOS.values())
+    while time.perf_counter() < deadline:
+        name = state.rng.choices(names, weights=weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await scenario_request(client, state, name)
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        state.latencies[name].append((time.perf_counter() - started) * 1000)
+        if failed:
+            state.errors[name] += 1
+
+
+async def seed(client: httpx.AsyncClient, n_users: int, n_questions: int, run_id: str, rng: random.Random):
+    users = []
+    for i in range(n_users):
+        email = f"load{run_id}_{i}@example.com"
+        response = await client.post("/api/auth/register", json={
+            "email": email, "username": f"load{run_id}_{i}", "password": PASSWORD
+        })
+        if response.status_code >= 400:
+            raise RuntimeError(f"Registering {email} failed: {response.status_code} {response.text}")
+        token = (await client.post("/api/auth/login", json={"email": email, "password": PASSWORD})).json()["access_token"]
+        users.append((email, {"Authorization": f"Bearer {token}"}))
+
+    topics = make_topics(max(1, n_questions // 10), rng)
+    question_ids = []
+    for _ in range(n_questions):
+        title, content, category = make_question(rng.choice(topics), rng)
+        response = await client.post("/api/qa/questions", json={
+            "title": title, "category": category, "content": content
+        }, headers=rng.choice(users)[1])
+        if response.status_code >= 400:
+            raise RuntimeError(f"Creating a question failed: {response.status_code} {response.text}")
+        question_ids.append(response.json()["id"])
+    return users, question_ids
+
+
+def seed_contents(n_contents: int, rng: random.Random):
+    # In-process only: content creation needs an admin, so insert directly
+    from app.core.database import SessionLocal
+    from app.models.content_model import Content
+
+    db = SessionLocal()
+    try:
+        db.add_all([
+            Content(
+                title=f"Wellness article {i}",
+                body=" ".join(rng.choice(["Breathe.", "Rest well.", "Talk to someone.", "Take a walk."]) for _ in range(40)),
+                topic=rng.choice(["Addictions", "Relationships", "Anxiety", "Depression"]),
+                author_name="Load Test",
+                status="published"
+            )
+            for i in range(n_contents)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def summarize(state: LoadState, elapsed: float) -> dict:
+    scenarios = {}
+    total = 0
+    for name in SCENARIOS:
+        values = np.asarray(state.latencies.get(name, []))
+        total += len(values)
+        if not len(values):
+            continue
+        scenarios[name] = {
+            "requests": int(len(values)),
+            "errors": state.errors.get(name, 0),
+            "p50_ms": round(float(np.percentile(values, 50)), 2),
+            "p95_ms": round(float(np.percentile(values, 95)), 2),
+            "p99_ms": round(float(np.percentile(values, 99)), 2),
+        }
+    return {"requests": total, "seconds": round(elapsed, 2), "throughput_rps": round(total / elapsed, 1), "scenarios": scenarios}
+
+
+def print_report(summary: dict):
+    print(f"{'scenario':<20}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in summary["scenarios"].items():
+        print(f"{name:<20}{stats['requests']:>10}{stats['errors']:>8}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    print(f"total: {summary['requests']:,} requests in {summary['seconds']}s ({summary['throughput_rps']} req/s)")
+
+
+def compare(summary: dict, baseline: dict, threshold: float) -> list:
+    """Regressions of p95 latency or throughput beyond `threshold` (a fraction)"""
+    regressions = []
+    for name, base in baseline["scenarios"].items():
+        current = summary["scenarios"].get(name)
+        if current and current["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms vs baseline {base['p95_ms']}ms")
+    if summary["throughput_rps"] < baseline["throughput_rps"] * (1 - threshold):
+        regressions.append(f"throughput {summary['throughput_rps']} req/s vs baseline {baseline['throughput_rps']} req/s")
+    return regressions
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    run_id = f"{int(time.time()) % 100000}"
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30)
+        app = None
+    else:
+        import main
+        app = main.app
+        await app.router.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=30)
+        seed_contents(args.contents, rng)
+
+    try:
+        print(f"Seeding {args.users} users and {args.questions} questions...")
+        users, question_ids = await seed(client, args.users, args.questions, run_id, rng)
+        state = LoadState(users, question_ids, rng)
+
+        print(f"Running {args.concurrency} virtual users for {args.duration}s...")
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(virtual_user(client, state, deadline) for _ in range(args.concurrency)))
+        return summarize(state, time.perf_counter() - started)
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API with realistic scenarios")
+    parser.add_argument("--url", default=None, help="Target a running server instead of the in-process app")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load after seeding")
+    # Async endpoints check out pool connections on the event loop thread, so more virtual
+    # users than pool connections (15 on SQLite) can stall the loop until the pool times out
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--users", type=int, default=50, help="Accounts to register")
+    parser.add_argument("--questions", type=int, default=200, help="Questions to create")
+    parser.add_argument("--contents", type=int, default=100, help="Content items to insert (in-process only)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare with or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression as a fraction (0.2 = 20%%)")
+    parser.add_argument("--json", default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if not args.url:
+        # Must be set before the app settings are first imported
+        db_path = os.path.join(tempfile.mkdtemp(), "load_test.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        os.environ["DEBUG"] = "false"
+
+    summary = asyncio.run(run(args))
+    summary["config"] = {
+        "target": args.url or "in-process sqlite",
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "questions": args.questions,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+    print_report(summary)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config", {}).get("target") != summary["config"]["target"]:
+            print("Warning: baseline was recorded against a different target")
+        regressions = compare(summary, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions beyond {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
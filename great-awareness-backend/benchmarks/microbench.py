@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for hot in-process code paths.
+
+Times the CPU-bound pieces of a request on their own: JWT encode/decode
+as done by create_access_token and get_current_user, password hashing and
+verification, Content/Question.to_dict, pydantic validation of the list
+responses and the ContentCreate validators.
+
+Each benchmark is calibrated so one sample runs for at least --min-time
+seconds, then sampled --repeat times with the garbage collector off
+(timeit). The report gives the median and minimum time per call and the
+spread (median absolute deviation) across samples. Results are written
+as JSON; --compare prints the change against an earlier results file and
+flags differences larger than the measured noise.
+
+Usage:
+    python benchmarks/microbench.py
+    python benchmarks/microbench.py --filter jwt --repeat 21
+    python benchmarks/microbench.py --output /tmp/after.json --compare benchmarks/results/microbench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app settings are read on import; keep benchmarks off any real database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("DEBUG", "false")
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "microbench.json")
+PAGE_SIZE = 20
+
+
+def _validate(model, data):
+    # pydantic 2 in requirements.txt, 1.x in requirements-render.txt
+    if hasattr(model, "model_validate"):
+        return model.model_validate(data)
+    return model.parse_obj(data)
+
+
+def build_benchmarks():
+    """Name -> zero-argument callable, with fixtures prepared up front"""
+    import jwt
+
+    import main  # noqa: F401  imports every model so relationships resolve
+    from app.core.config import settings
+    from app.models.content_model import Content
+    from app.models.question_model import Question
+    from app.models.user_model import User
+    from app.routes.auth_routes import create_access_token, pwd_context
+    from app.schemas.content_schema import ContentCreate, ContentListResponse
+    from app.schemas.question_schema import QuestionListResponse
+
+    now = datetime.utcnow()
+    token = create_access_token({"sub": "bench@example.com"})
+    password_hash = pwd_context.hash("Benchmark123")
+
+    author = User(id=1, username="bench", email="bench@example.com", profile_image=None)
+    contents = [
+        Content(
+            id=i, title=f"Finding calm after a hard week {i}", body="Breathing exercises that help. " * 20,
+            topic="Anxiety", post_type="text", image_path=None, is_text_only=True, author_name="Admin",
+            author_avatar=None, likes_count=i * 3, comments_count=i, status="published", is_featured=False,
+            created_at=now, updated_at=now, published_at=now, created_by=1
+        )
+        for i in range(PAGE_SIZE)
+    ]
+    questions = [
+        Question(
+            id=i, title=f"How do I cope with panic attacks at night {i}?", category="Anxiety",
+            content="It started after my exams and it is getting worse. " * 5, has_image=False, image_path=None,
+            author_name="bench", is_anonymous=False, likes_count=i * 2, comments_count=i, saves_count=0,
+            status="active", is_featured=False, user_id=1, created_at=now, updated_at=now, user=author
+        )
+        for i in range(PAGE_SIZE)
+    ]
+    content_page = {
+        "items": [c.to_dict() for c in contents], "total": 500, "page": 1, "size": PAGE_SIZE,
+        "has_next": True, "has_prev": False,
+    }
+    question_page = {
+        "questions": [q.to_dict() for q in questions], "total": 500, "page": 1, "per_page": PAGE_SIZE,
+        "total_pages": 25,
+    }
+    content_create = {
+        "title": "  Finding calm after a hard week  ", "body": "  Breathing exercises that help. " * 10,
+        "topic": "Anxiety", "post_type": "text", "status": "published",
+    }
+
+    return {
+        "jwt_encode": lambda: create_access_token({"sub": "bench@example.com"}),
+        "jwt_decode": lambda: jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm]),
+        "password_hash": lambda: pwd_context.hash("Benchmark123"),
+        "password_verify": lambda: pwd_context.verify("Benchmark123", password_hash),
+        "content_to_dict": lambda: contents[0].to_dict(),
+        "question_to_dict": lambda: questions[0].to_dict(),
+        f"content_list_validate_{PAGE_SIZE}": lambda: _validate(ContentListResponse, content_page),
+        f"question_list_validate_{PAGE_SIZE}": lambda: _validate(QuestionListResponse, question_page),
+        "content_create_validate": lambda: ContentCreate(**content_create),
+    }
+
+
+def measure(func, repeat: int, min_time: float) -> dict:
+    timer = timeit.Timer(func)
+    func()  # warm up caches and lazy imports
+    loops, _ = timer.autorange()
+    # autorange stops at 0.2s; scale to the requested sample length
+    sample_time = timer.timeit(loops)
+    if sample_time < min_time:
+        loops = max(loops, int(loops * min_time / max(sample_time, 1e-9)))
+    per_call = [t / loops for t in timer.repeat(repeat=repeat, number=loops)]
+    median = statistics.median(per_call)
+    mad = statistics.median(abs(t - median) for t in per_call)
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "median_us": median * 1e6,
+        "min_us": min(per_call) * 1e6,
+        "mad_us": mad * 1e6,
+    }
+
+
+def format_time(us: float) -> str:
+    if us >= 1000:
+        return f"{us / 1000:.2f} ms"
+    return f"{us:.2f} us"
+
+
+def compare(results: dict, previous: dict):
+    print(f"\n{'benchmark':<30}{'before':>12}{'after':>12}{'change':>10}")
+    for name, current in results["benchmarks"].items():
+        before = previous["benchmarks"].get(name)
+        if before is None:
+            continue
+        change = current["median_us"] / before["median_us"] - 1
+        # Differences within a few MADs of either run (or under 3%) are noise
+        noise = max(3 * (current["mad_us"] + before["mad_us"]) / before["median_us"], 0.03)
+        verdict = "" if abs(change) <= noise else ("slower" if change > 0 else "faster")
+        print(f"{name:<30}{format_time(before['median_us']):>12}{format_time(current['median_us']):>12}"
+              f"{change:>+9.1%} {verdict}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark hot in-process code paths")
+    parser.add_argument("--filter", default=None, help="Only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=11, help="Samples per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per sample")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    benchmarks = build_benchmarks()
+    results = {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "benchmarks": {},
+    }
+    print(f"{'benchmark':<30}{'median':>12}{'min':>12}{'mad':>10}{'loops':>10}")
+    for name, func in benchmarks.items():
+        if args.filter and args.filter not in name:
+            continue
+        stats = measure(func, args.repeat, args.min_time)
+        results["benchmarks"][name] = stats
+        print(f"{name:<30}{format_time(stats['median_us']):>12}{format_time(stats['min_us']):>12}"
+              f"{stats['mad_us'] / stats['median_us']:>9.1%}{stats['loops']:>10}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
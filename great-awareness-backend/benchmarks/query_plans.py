@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression checks for the hot statements.
+
+Runs the hot requests (question feed, notifications page, comments page,
+login, like toggle) in-process against a seeded database, captures the
+SQL each one issues and EXPLAINs it (EXPLAIN (COSTS off) on PostgreSQL,
+EXPLAIN QUERY PLAN on SQLite). Two things are checked:
+
+- EXPECTATIONS: plan properties per scenario, such as "uses index X",
+  "no full scan of table T" or "no sort step". A failing property means an
+  index change or ORM refactor changed how a hot statement is executed.
+- Snapshots: the plans are compared with the stored snapshot for the
+  dialect (benchmarks/baselines/query_plans_<dialect>.json) and any change
+  is printed as a diff. Accept intended changes with --update. Plans
+  depend on table sizes, so the snapshots are recorded at the default
+  seed scale.
+
+The script exits with status 1 when a scenario returns an unexpected
+status (non-2xx unless listed in EXPECTED_STATUS), a property fails or a
+plan differs. A run with an unexpected status never updates the snapshot:
+the statements of a failed request are not the plans to keep.
+By default it seeds a fresh SQLite database with benchmarks/seed_data.py;
+with --database-url, point it at a disposable database (the like toggle
+writes), seeded already (--skip-seed) or empty.
+
+Usage:
+    python benchmarks/query_plans.py
+    python benchmarks/query_plans.py --update
+    python benchmarks/query_plans.py --database-url postgresql://.../gwa_plans --yes
+"""
+
+import argparse
+import difflib
+import json
+import os
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+CAPTURED = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+# name -> (method, path, authenticated); paths are filled in from the seeded fixtures
+SCENARIOS = {
+    "feed_listing": ("GET", "/api/qa/questions?page=2&per_page=20", True),
+    "notifications_page": ("GET", "/api/notifications/?skip=0&limit=20", True),
+    "comments_page": ("GET", "/api/qa/questions/{question_id}/comments?page=1&per_page=20", False),
+    "login_lookup": ("POST", "/api/auth/login", False),
+    "like_toggle": ("POST", "/api/qa/questions/{question_id}/like", True),
+}
+
+# name -> status, for scenarios that are meant to fail; any other non-2xx response fails the run
+EXPECTED_STATUS = {}
+
+
+def uses_index(name: str, sqlite_name: str = None):
+    """SQLite names the indexes behind UNIQUE constraints itself; pass that name as sqlite_name"""
+    def predicate(plans, dialect):
+        index = sqlite_name if dialect == "sqlite" and sqlite_name else name
+        return any(
+            re.search(rf"\bUSING (COVERING )?INDEX {index}\b|\bIndex (Only )?Scan (Backward )?using {index}\b"
+                      rf"|\bBitmap Index Scan on {index}\b", line)
+            for plan in plans for line in plan
+        )
+    return f"uses index {name}", predicate
+
+
+def no_full_scan(table: str):
+    return f"no full scan of {table}", lambda plans, dialect: not any(
+        re.search(rf"^\s*(SCAN {table}\b(?! USING)|.*Seq Scan on {table}\b)", line)
+        for plan in plans for line in plan
+    )
+
+
+def no_sort():
+    return "no sort step", lambda plans, dialect: not any(
+        "USE TEMP B-TREE FOR ORDER BY" in line or re.search(r"(^|->\s*)(Incremental )?Sort\b", line.strip())
+        for plan in plans for line in plan
+    )
+
+
+EXPECTATIONS = {
+    "feed_listing": [uses_index("ix_questions_status")],
+    "notifications_page": [uses_index("ix_notifications_user_created"), no_full_scan("notifications"), no_sort()],
+    "comments_page": [no_full_scan("questions"), no_full_scan("users")],
+    "login_lookup": [uses_index("ix_users_email"), no_full_scan("users"), no_sort()],
+    "like_toggle": [uses_index("_question_user_uc", "sqlite_autoindex_question_likes_1"), no_full_scan("question_likes"), no_full_scan("questions")],
+}
+
+
+def explain(connection, dialect: str, statement: str, parameters) -> list:
+    if dialect == "postgresql":
+        rows = connection.exec_driver_sql("EXPLAIN (COSTS off) " + statement, parameters or ()).fetchall()
+        return [row[0] for row in rows]
+    # SQLite rows are (id, parent, notused, detail); indent children under their parent
+    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters or ()).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def pick_fixtures(db):
+    """A seeded user with a full notifications page and the question with most comments"""
+    from sqlalchemy import func
+    from app.models.notification_model import Notification
+    from app.models.question_model import Question
+    from app.models.user_model import User
+
+    user_id = (db.query(Notification.user_id).group_by(Notification.user_id)
+               .order_by(func.count(Notification.id).desc()).limit(1).scalar())
+    email = db.query(User.email).filter(User.id == user_id).scalar()
+    question_id = db.query(Question.id).order_by(Question.comments_count.desc()).limit(1).scalar()
+    return {"email": email, "question_id": question_id}
+
+
+def capture_plans(client, engine, fixtures: dict, headers: dict) -> tuple:
+    """Plans per scenario, and the scenarios that returned an unexpected status"""
+    from sqlalchemy import event
+
+    from app.core.slow_queries import normalize
+    from seed_data import PASSWORD
+
+    dialect = engine.dialect.name
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(CAPTURED):
+            captured.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    results, errors = {}, []
+    try:
+        for name, (method, path, authenticated) in SCENARIOS.items():
+            captured.clear()
+            body = {"email": fixtures["email"], "password": PASSWORD} if name == "login_lookup" else None
+            response = client.request(method, path.format(**fixtures), json=body,
+                                      headers=headers if authenticated else None)
+            expected = EXPECTED_STATUS.get(name)
+            if not (response.status_code == expected if expected else 200 <= response.status_code < 300):
+                print(f"FAIL {name} returned {response.status_code}: {response.text[:200]}")
+                errors.append(f"{name}: status {response.status_code}")
+            entries = []
+            with engine.connect() as connection:
+                for statement, parameters in list(captured):
+                    entry = {"statement": normalize(statement), "plan": explain(connection, dialect, statement, parameters)}
+                    # Collapse repeats (per-row lookups) so snapshots stay readable; the count still diffs
+                    if entries and entries[-1]["statement"] == entry["statement"] and entries[-1]["plan"] == entry["plan"]:
+                        entries[-1]["executions"] += 1
+                    else:
+                        entries.append(dict(entry, executions=1))
+            results[name] = entries
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return results, errors
+
+
+def check(results: dict, dialect: str) -> list:
+    failures = []
+    for name, expectations in EXPECTATIONS.items():
+        plans = [entry["plan"] for entry in results.get(name, [])]
+        for label, predicate in expectations:
+            ok = predicate(plans, dialect)
+            print(f"  {'ok  ' if ok else 'FAIL'} {name}: {label}")
+            if not ok:
+                failures.append(f"{name}: {label}")
+    return failures
+
+
+def render(entries: list) -> list:
+    lines = []
+    for entry in entries:
+        repeats = f"  [x{entry['executions']}]" if entry["executions"] > 1 else ""
+        lines.append(entry["statement"] + repeats)
+        lines.extend(f"    {line}" for line in entry["plan"])
+    return lines
+
+
+def diff(results: dict, snapshot: dict) -> list:
+    changed = []
+    for name in SCENARIOS:
+        before, after = render(snapshot.get(name, [])), render(results.get(name, []))
+        if before != after:
+            changed.append(name)
+            sys.stdout.writelines(line + "\n" for line in difflib.unified_diff(
+                before, after, f"snapshot/{name}", f"current/{name}", lineterm=""))
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check query plans of the hot statements")
+    parser.add_argument("--database-url", default=None, help="Disposable database to use instead of a temporary SQLite file")
+    parser.add_argument("--skip-seed", action="store_true", help="The database is already seeded")
+    parser.add_argument("--users", type=int, default=20000, help="Seed scale (see seed_data.py)")
+    parser.add_argument("--snapshot", default=None, help="Snapshot file (default baselines/query_plans_<dialect>.json)")
+    parser.add_argument("--update", action="store_true", help="Store the current plans as the snapshot")
+    parser.add_argument("--yes", action="store_true", help="Allow running against a non-SQLite database")
+    args = parser.parse_args()
+
+    # Must be set before the app settings are first imported
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'query_plans.db')}"
+    os.environ["DEBUG"] = "false"
+    os.environ["SLOW_QUERY_ENABLED"] = "false"
+    os.environ["TRACING_ENABLED"] = "false"
+
+    from fastapi.testclient import TestClient
+
+    import main as app_main
+    import seed_data
+    from app.core.database import SessionLocal, engine, init_db
+    from app.routes.auth_routes import create_access_token
+
+    dialect = engine.dialect.name
+    if dialect != "sqlite" and not args.yes:
+        print(f"Refusing to run against {engine.url.render_as_string(hide_password=True)} without --yes")
+        sys.exit(1)
+
+    init_db()
+    if not args.skip_seed:
+        seed_args = argparse.Namespace(
+            users=args.users, days=365, item_skew=1.0, user_skew=0.8, streak_fraction=0.4,
+            batch_size=50000, seed=42, **{table: None for table in seed_data.RATIOS}
+        )
+        seed_data.seed(seed_args, engine, SessionLocal)
+
+    db = SessionLocal()
+    try:
+        fixtures = pick_fixtures(db)
+    finally:
+        db.close()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': fixtures['email']})}"}
+
+    results, errors = capture_plans(TestClient(app_main.app, raise_server_exceptions=False), engine, fixtures, headers)
+    print(f"\nPlan properties ({dialect}):")
+    failures = errors + check(results, dialect)
+
+    snapshot_path = args.snapshot or os.path.join(BASELINE_DIR, f"query_plans_{dialect}.json")
+    if args.update and errors:
+        print(f"Snapshot not saved: {len(errors)} scenarios returned an unexpected status")
+        changed = []
+    elif args.update:
+        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        with open(snapshot_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Snapshot saved to {snapshot_path}")
+        changed = []
+    elif os.path.exists(snapshot_path):
+        with open(snapshot_path) as f:
+            changed = diff(results, json.load(f))
+        if not changed:
+            print(f"Plans match {snapshot_path}")
+    else:
+        print(f"No snapshot at {snapshot_path}; run with --update to create one")
+        changed = []
+
+    if failures or changed:
+        print(f"{len(failures)} failed checks, {len(changed)} changed scenarios: {', '.join(changed) or '-'}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Fill the database with synthetic data at production scale.
+
+Generates users, contents, questions, question comments, content
+comments, question likes and saves, notifications (with their unread
+counters) and wellness milestone unlocks. Engagement is skewed the way
+real traffic is: a few questions and contents attract most likes and
+comments (Zipf-like popularity, --item-skew) and a minority of users
+does most of the liking, commenting and asking (--user-skew).
+Denormalised counters (likes_count, comments_count, saves_count) match
+the generated rows.
+
+Row counts scale with --users (see RATIOS, about 12 rows per user in
+total); any table can be overridden, e.g. --questions 500000. Rows are
+written in batches with COPY on PostgreSQL and executemany on SQLite,
+using ids after the current maximum so existing data is left alone.
+Every seeded account shares the password printed at the end.
+
+Usage:
+    python benchmarks/seed_data.py --users 10000
+    python benchmarks/seed_data.py --database-url sqlite:////tmp/scale.db --users 850000   # ~10M rows
+    python benchmarks/seed_data.py --database-url postgresql://... --users 2000000 --yes
+"""
+
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_question_clustering import make_topics, make_question
+
+PASSWORD = "SeedData123"
+
+# Rows per seeded user
+RATIOS = {
+    "contents": 0.01,
+    "questions": 0.3,
+    "question_comments": 1.5,
+    "comments": 0.5,
+    "question_likes": 4.0,
+    "question_saves": 0.5,
+    "notifications": 3.0,
+}
+
+COMMENT_PHRASES = [
+    "Thank you for sharing this.", "I went through the same thing last year.", "You are not alone.",
+    "Talking to a counsellor helped me a lot.", "Sending you strength.", "Have you tried journaling?",
+    "Small steps every day make a difference.", "This really resonates with me.", "Please reach out to someone you trust.",
+    "Breathing exercises help me at night.", "It gets better, I promise.", "I am proud of you for asking.",
+]
+CONTENT_TOPICS = ["Addictions", "Relationships", "Anxiety", "Depression", "Trauma", "Self Care"]
+CONTENT_SENTENCES = [
+    "Take a few slow breaths before you respond.", "Sleep and routine matter more than we think.",
+    "Recovery is not a straight line.", "Name the feeling before you try to change it.",
+    "Reach out to one person today.", "Notice the urge, then wait ten minutes.",
+    "Write down three things that went well.", "Boundaries protect the relationships you value.",
+]
+
+
+class SkewedSampler:
+    """Draws offsets 0..n-1 with Zipf-like popularity; which offsets are popular is random"""
+
+    def __init__(self, n: int, skew: float, rng: np.random.Generator):
+        weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** skew
+        self.cdf = np.cumsum(weights)
+        self.cdf /= self.cdf[-1]
+        self.order = rng.permutation(n)
+        self.rng = rng
+
+    def sample(self, size: int) -> np.ndarray:
+        ranks = np.searchsorted(self.cdf, self.rng.random(size), side="right")
+        return self.order[np.minimum(ranks, len(self.order) - 1)]
+
+
+def unique_pairs(items: SkewedSampler, users: SkewedSampler, n_users: int, size: int, rng) -> np.ndarray:
+    """`size` distinct item*n_users+user keys; popular pairs saturate, so top up for a few rounds"""
+    keys = np.empty(0, dtype=np.int64)
+    for _ in range(6):
+        missing = size - len(keys)
+        if missing <= 0:
+            break
+        draw = int(missing * 1.2) + 16
+        new = items.sample(draw).astype(np.int64) * n_users + users.sample(draw)
+        keys = np.unique(np.concatenate([keys, new]))
+    return rng.permutation(keys)[:size]
+
+
+def after(rng, created: np.ndarray, span: int) -> np.ndarray:
+    """A second offset somewhere between each `created` offset and now"""
+    return created + (rng.random(len(created)) * (span - created)).astype(np.int64)
+
+
+class BulkLoader:
+    """Batched inserts over one raw DBAPI connection: COPY on PostgreSQL, executemany elsewhere"""
+
+    def __init__(self, engine, start: datetime):
+        self.dialect = engine.dialect.name
+        self.connection = engine.raw_connection()
+        self.start = np.datetime64(start.replace(microsecond=0), "s")
+        self.tables = []
+        cursor = self.connection.cursor()
+        if self.dialect == "postgresql":
+            cursor.execute("SET synchronous_commit TO OFF")
+        elif self.dialect == "sqlite":
+            cursor.execute("PRAGMA synchronous = OFF")
+        cursor.close()
+
+    def next_id(self, table: str) -> int:
+        cursor = self.connection.cursor()
+        cursor.execute(f"SELECT MAX(id) FROM {table}")
+        value = cursor.fetchone()[0]
+        cursor.close()
+        return (value or 0) + 1
+
+    def timestamps(self, offsets: np.ndarray) -> list:
+        values = np.datetime_as_string(self.start + offsets.astype("timedelta64[s]"), unit="s")
+        return np.char.replace(values, "T", " ").tolist()
+
+    def insert(self, table: str, columns: list, rows: list):
+        cursor = self.connection.cursor()
+        if self.dialect == "postgresql":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)  # None -> empty field -> NULL
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        else:
+            placeholders = ", ".join("?" for _ in columns)
+            cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+        cursor.close()
+        self.connection.commit()
+        if table not in self.tables:
+            self.tables.append(table)
+
+    def finish(self):
+        """Move id sequences past the explicit ids and refresh planner statistics"""
+        cursor = self.connection.cursor()
+        for table in self.tables:
+            if self.dialect == "postgresql" and table != "notification_counters":
+                cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))")
+            cursor.execute(f"ANALYZE {table}")
+        cursor.close()
+        self.connection.commit()
+        self.connection.close()
+
+
+def load(loader: BulkLoader, table: str, columns: list, total: int, batch_size: int, make_batch):
+    """Insert `total` rows produced `batch_size` at a time by make_batch(lo, hi) -> list of columns"""
+    started = time.perf_counter()
+    for lo in range(0, total, batch_size):
+        hi = min(lo + batch_size, total)
+        loader.insert(table, columns, list(zip(*make_batch(lo, hi))))
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed else 0
+    print(f"{table:<24}{total:>12,} rows {elapsed:>8.1f}s {rate:>12,.0f} rows/s")
+    return total, elapsed
+
+
+def seed(args, engine, SessionLocal):
+    rng = np.random.default_rng(args.seed)
+    text_rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    span = args.days * 86400
+    loader = BulkLoader(engine, now - timedelta(days=args.days))
+    counts = {table: max(1, int(getattr(args, table) if getattr(args, table) is not None else args.users * ratio))
+              for table, ratio in RATIOS.items()}
+    n_users = args.users
+    batch = args.batch_size
+    results = []
+
+    # Text pools; rows pick from them by index
+    topics = make_topics(200, text_rng)
+    question_pool = np.array([make_question(text_rng.choice(topics), text_rng) for _ in range(2000)], dtype=object)
+    comment_pool = np.array([" ".join(text_rng.sample(COMMENT_PHRASES, 2)) for _ in range(500)], dtype=object)
+    content_bodies = np.array([" ".join(text_rng.choices(CONTENT_SENTENCES, k=30)) for _ in range(200)], dtype=object)
+
+    # Users
+    user_base = loader.next_id("users")
+    user_created = np.sort(rng.integers(0, span, n_users))  # ids grow with signup time
+    user_seen = after(rng, user_created, span)
+    has_streak = rng.random(n_users) < args.streak_fraction
+    streak_days = np.minimum(rng.pareto(1.2, n_users) * 3, args.days).astype(np.int64)
+    streak_start = np.maximum(user_created, span - streak_days * 86400 - rng.integers(0, 86400, n_users))
+    author_users = SkewedSampler(n_users, args.user_skew, rng)
+    active_users = SkewedSampler(n_users, args.user_skew, rng)
+    from app.routes.auth_routes import pwd_context
+    password_hash = pwd_context.hash(PASSWORD)  # one hash for everyone; hashing per user would dominate
+
+    def user_batch(lo, hi):
+        ids = range(user_base + lo, user_base + hi)
+        created = loader.timestamps(user_created[lo:hi])
+        streak = loader.timestamps(streak_start[lo:hi])
+        return (
+            list(ids),
+            [f"seed{i}@example.com" for i in ids],
+            [f"seed_{i}" for i in ids],
+            [password_hash] * (hi - lo),
+            ["active"] * (hi - lo),
+            (rng.random(hi - lo) < 0.6).tolist(),
+            ["user"] * (hi - lo),
+            created,
+            created,
+            loader.timestamps(user_seen[lo:hi]),
+            [s if has else None for s, has in zip(streak, has_streak[lo:hi])],
+        )
+
+    results.append(load(loader, "users", [
+        "id", "email", "username", "password_hash", "status", "is_verified", "role",
+        "created_at", "updated_at", "last_seen_at", "streak_started_at"
+    ], n_users, batch, user_batch))
+
+    # Engagement is drawn before the parents so their counters can be written in one pass
+    n_contents, n_questions = counts["contents"], counts["questions"]
+    popular_contents = SkewedSampler(n_contents, args.item_skew, rng)
+    popular_questions = SkewedSampler(n_questions, args.item_skew, rng)
+    content_comment_targets = popular_contents.sample(counts["comments"])
+    question_comment_targets = popular_questions.sample(counts["question_comments"])
+    like_keys = unique_pairs(popular_questions, active_users, n_users, counts["question_likes"], rng)
+    save_keys = unique_pairs(popular_questions, active_users, n_users, counts["question_saves"], rng)
+
+    # Contents
+    content_base = loader.next_id("contents")
+    content_created = rng.integers(0, span, n_contents)
+    content_comments = np.bincount(content_comment_targets, minlength=n_contents)
+    content_likes = (rng.pareto(1.1, n_contents) * 20).astype(np.int64)
+    content_topics = np.array(text_rng.choices(CONTENT_TOPICS, k=len(content_bodies)), dtype=object)
+
+    def content_batch(lo, hi):
+        pick = rng.integers(0, len(content_bodies), hi - lo)
+        created = loader.timestamps(content_created[lo:hi])
+        return (
+            list(range(content_base + lo, content_base + hi)),
+            [f"{topic} guide {i}" for topic, i in zip(content_topics[pick].tolist(), pick.tolist())],
+            content_bodies[pick].tolist(),
+            content_topics[pick].tolist(),
+            ["text"] * (hi - lo),
+            [True] * (hi - lo),
+            ["Admin"] * (hi - lo),
+            content_likes[lo:hi].tolist(),
+            content_comments[lo:hi].tolist(),
+            ["published"] * (hi - lo),
+            (rng.random(hi - lo) < 0.02).tolist(),
+            created,
+            created,
+            created,
+        )
+
+    results.append(load(loader, "contents", [
+        "id", "title", "body", "topic", "post_type", "is_text_only", "author_name", "likes_count",
+        "comments_count", "status", "is_featured", "created_at", "updated_at", "published_at"
+    ], n_contents, batch, content_batch))
+
+    # Questions
+    question_base = loader.next_id("questions")
+    question_authors = author_users.sample(n_questions)
+    question_created = after(rng, user_created[question_authors], span)
+    question_anonymous = rng.random(n_questions) < 0.15
+    question_likes = np.bincount(like_keys // n_users, minlength=n_questions)
+    question_saves = np.bincount(save_keys // n_users, minlength=n_questions)
+    question_comments = np.bincount(question_comment_targets, minlength=n_questions)
+    question_text = rng.integers(0, len(question_pool), n_questions)
+
+    def question_batch(lo, hi):
+        texts = question_pool[question_text[lo:hi]]
+        authors = (question_authors[lo:hi] + user_base).tolist()
+        anonymous = question_anonymous[lo:hi].tolist()
+        created = loader.timestamps(question_created[lo:hi])
+        return (
+            list(range(question_base + lo, question_base + hi)),
+            [t[0] for t in texts],
+            [t[2] for t in texts],
+            [t[1] for t in texts],
+            [False] * (hi - lo),
+            ["Anonymous User" if anon else f"seed_{a}" for a, anon in zip(authors, anonymous)],
+            anonymous,
+            question_likes[lo:hi].tolist(),
+            question_comments[lo:hi].tolist(),
+            question_saves[lo:hi].tolist(),
+            np.where(rng.random(hi - lo) < 0.97, "published", "archived").tolist(),
+            (rng.random(hi - lo) < 0.01).tolist(),
+            authors,
+            created,
+            created,
+        )
+
+    results.append(load(loader, "questions", [
+        "id", "title", "category", "content", "has_image", "author_name", "is_anonymous", "likes_count",
+        "comments_count", "saves_count", "status", "is_featured", "user_id", "created_at", "updated_at"
+    ], n_questions, batch, question_batch))
+
+    # Question comments, content comments, likes and saves
+    def comment_batch(base, targets, parent_base, parent_created, with_anonymous):
+        def make(lo, hi):
+            parents = targets[lo:hi]
+            created = loader.timestamps(after(rng, parent_created[parents], span))
+            columns = [
+                list(range(base + lo, base + hi)),
+                (parents + parent_base).tolist(),
+                (active_users.sample(hi - lo) + user_base).tolist(),
+                comment_pool[rng.integers(0, len(comment_pool), hi - lo)].tolist(),
+            ]
+            if with_anonymous:
+                columns.append((rng.random(hi - lo) < 0.2).tolist())
+            return columns + [created, created]
+        return make
+
+    results.append(load(loader, "question_comments", [
+        "id", "question_id", "user_id", "text", "is_anonymous", "created_at", "updated_at"
+    ], len(question_comment_targets), batch, comment_batch(
+        loader.next_id("question_comments"), question_comment_targets, question_base, question_created, True)))
+    results.append(load(loader, "comments", [
+        "id", "content_id", "user_id", "text", "created_at", "updated_at"
+    ], len(content_comment_targets), batch, comment_batch(
+        loader.next_id("comments"), content_comment_targets, content_base, content_created, False)))
+
+    def pair_batch(base, keys):
+        def make(lo, hi):
+            questions, users = np.divmod(keys[lo:hi], n_users)
+            return (
+                list(range(base + lo, base + hi)),
+                (questions + question_base).tolist(),
+                (users + user_base).tolist(),
+                loader.timestamps(after(rng, np.maximum(question_created[questions], user_created[users]), span)),
+            )
+        return make
+
+    for table, keys in (("question_likes", like_keys), ("question_saves", save_keys)):
+        results.append(load(loader, table, ["id", "question_id", "user_id", "created_at"], len(keys), batch,
+                            pair_batch(loader.next_id(table), keys)))
+
+    # Notifications go to question authors, as likes and comments do in the app
+    n_notifications = counts["notifications"]
+    notification_questions = popular_questions.sample(n_notifications)
+    notification_recipients = question_authors[notification_questions]
+    notification_read = rng.random(n_notifications) < 0.75
+    notification_base = loader.next_id("notifications")
+
+    def notification_batch(lo, hi):
+        questions = notification_questions[lo:hi]
+        is_like = rng.random(hi - lo) < 0.6
+        actors = (active_users.sample(hi - lo) + user_base).tolist()
+        titles = [f"seed_{a} liked your question" if like else f"seed_{a} commented on your question"
+                  for a, like in zip(actors, is_like.tolist())]
+        created = loader.timestamps(after(rng, question_created[questions], span))
+        return (
+            list(range(notification_base + lo, notification_base + hi)),
+            np.where(is_like, "like", "comment").tolist(),
+            titles,
+            [t[0] for t in question_pool[question_text[questions]]],
+            (questions + question_base).tolist(),
+            [f"seed_{a}" for a in actors],
+            (notification_recipients[lo:hi] + user_base).tolist(),
+            notification_read[lo:hi].tolist(),
+            [1] * (hi - lo),
+            created,
+            created,
+        )
+
+    results.append(load(loader, "notifications", [
+        "id", "notification_type", "title", "body", "question_id", "author_name", "user_id", "is_read",
+        "actor_count", "created_at", "updated_at"
+    ], n_notifications, batch, notification_batch))
+
+    # Seeded users are new, so their counters can be inserted rather than upserted
+    unread = np.bincount(notification_recipients[~notification_read], minlength=n_users)
+    received = np.bincount(notification_recipients, minlength=n_users)
+    recipients = np.flatnonzero(received)
+    updated = loader.timestamps(np.full(len(recipients), span))
+
+    def counter_batch(lo, hi):
+        users = recipients[lo:hi]
+        return ((users + user_base).tolist(), unread[users].tolist(), received[users].tolist(), updated[lo:hi])
+
+    results.append(load(loader, "notification_counters", [
+        "user_id", "unread_count", "version", "updated_at"
+    ], len(recipients), batch, counter_batch))
+    loader.finish()
+
+    # Milestone unlocks use the same bulk INSERT ... SELECT as the scheduled job
+    from app.models.wellness_model import Milestone
+    from app.routes.wellness_routes import DEFAULT_MILESTONES
+    from app.services.milestone_engine import unlock_due_milestones
+
+    db = SessionLocal()
+    try:
+        if not db.query(Milestone.id).first():
+            db.add_all([Milestone(**m) for m in DEFAULT_MILESTONES])
+            db.commit()
+        unlocks = unlock_due_milestones(db, batch_size=max(batch, 50000))
+        print(f"{'user_milestones':<24}{unlocks.unlocked:>12,} rows {unlocks.seconds:>8.1f}s")
+        results.append((unlocks.unlocked, unlocks.seconds))
+    finally:
+        db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database with synthetic data at scale")
+    parser.add_argument("--database-url", default=None, help="Target database (defaults to DATABASE_URL / settings)")
+    parser.add_argument("--users", type=int, default=10000, help="Users to create; other tables scale from this")
+    for table, ratio in RATIOS.items():
+        parser.add_argument(f"--{table.replace('_', '-')}", dest=table, type=int, default=None,
+                            help=f"Rows to create (default {ratio} per user)")
+    parser.add_argument("--days", type=int, default=365, help="Spread created_at over this many days")
+    parser.add_argument("--item-skew", type=float, default=1.0, help="Zipf exponent of question/content popularity")
+    parser.add_argument("--user-skew", type=float, default=0.8, help="Zipf exponent of per-user activity")
+    parser.add_argument("--streak-fraction", type=float, default=0.4, help="Share of users with a wellness streak")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Rows per COPY / executemany batch")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--yes", action="store_true", help="Allow seeding a non-SQLite database")
+    args = parser.parse_args()
+
+    if args.users < 1:
+        parser.error("--users must be at least 1")
+    if args.database_url:
+        # Must be set before the app settings are first imported
+        os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("DEBUG", "false")
+
+    import main as app_main  # noqa: F401  imports every model so relationships resolve
+    from app.core.database import SessionLocal, engine, init_db
+
+    target = engine.url.render_as_string(hide_password=True)
+    if engine.dialect.name != "sqlite" and not args.yes:
+        print(f"Refusing to seed {target} without --yes")
+        sys.exit(1)
+
+    print(f"Seeding {target}")
+    init_db()
+    started = time.perf_counter()
+    results = seed(args, engine, SessionLocal)
+    elapsed = time.perf_counter() - started
+    rows = sum(count for count, _ in results)
+    print(f"total: {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+    print(f"Seeded accounts are seed<id>@example.com with password {PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Rebuild question MinHash signatures and near-duplicate clusters.
+
+New and edited questions are indexed at write time; run this once after
+deploying the clustering tables, or after changing the MinHash parameters.
+"""
+
+import sys
+import os
+import time
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal, init_db
+# Import models in correct order (User first, then models that reference User)
+from app.models.user_model import User
+from app.models.content_model import Content
+from app.models.comment_model import Comment
+from app.models.question_model import Question, QuestionComment, QuestionLike, QuestionSave
+from app.models.notification_model import Notification
+from app.models.question_cluster_model import QuestionSignature, QuestionLSHBucket
+from app.services.question_clustering import rebuild_index
+
+def main():
+    """Main function"""
+    print("Question Clustering Rebuild")
+    print("=" * 40)
+
+    init_db()
+    db = SessionLocal()
+
+    try:
+        started = time.perf_counter()
+        total = rebuild_index(db)
+        elapsed = time.perf_counter() - started
+        clusters = db.query(QuestionSignature.cluster_id).distinct().count()
+        print(f"Indexed {total} questions into {clusters} clusters in {elapsed:.1f}s")
+    except Exception as e:
+        db.rollback()
+        print(f"Error rebuilding clusters: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
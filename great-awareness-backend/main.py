@@ -1,19 +1,35 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
+import hmac
 import logging
 
 from app.core.config import settings
-from app.core.database import engine, Base, get_db, init_db, check_db_connection
+from app.core.database import engine, Base, init_db, check_db_connection
 # Import models in dependency order (User before Content due to relationships)
 from app.models.user_model import User
 from app.models.content_model import Content
 from app.models.question_model import Question, QuestionComment, QuestionLike, QuestionSave
-from app.models.notification_model import Notification
+from app.models.notification_model import Notification, NotificationCounter, NotificationArchive
 from app.models.wellness_model import Milestone, UserMilestone
+from app.models.facet_model import FacetCount
+from app.models.question_cluster_model import QuestionSignature, QuestionLSHBucket
+from app.models.outbox_model import OutboxEvent
+from app.models.analytics_model import DailyUserRollup, DailyQuestionRollup, UserStatusRollup, ActivitySketch
 from app.schemas.user_schema import UserCreate, UserResponse
 from app.routes import auth_routes, content_routes, question_routes, notification_routes, admin_routes, wellness_routes
+from app.core import health, metrics, profiling, scheduler, slow_queries, tracing
+from app.core.pubsub import hub, create_backend
+from app.services.facet_service import reconcile_facets
+from app.services.question_stats import refresh_question_stats
+from app.services.related_questions import sync_related_index
+from app.services.notification_service import reconcile_unread_counts
+from app.services.notification_retention import run_notification_retention
+from app.services import outbox
+from app.services.analytics_rollup import refresh_analytics_rollups
+from app.services.activity_tracker import flush_activity
+from app.services.milestone_engine import run_milestone_unlocks
 
 # Configure logging
 logging.basicConfig(level=logging.INFO if settings.debug else logging.WARNING)
@@ -37,6 +53,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metrics (see /metrics): the middleware records requests, collectors read the rest at scrape time
+if settings.metrics_served:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_engine(engine)
+    metrics.registry.add_collector(metrics.collect_core(engine))
+    metrics.registry.add_collector(metrics.collect_services)
+elif settings.metrics_enabled:
+    logger.warning(f"Metrics disabled: set METRICS_TOKEN to serve /metrics in {settings.environment}")
+
 # Include routers
 app.include_router(auth_routes.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(content_routes.router, prefix="/api/content", tags=["content"])
@@ -45,6 +70,30 @@ app.include_router(notification_routes.router, prefix="/api/notifications", tags
 app.include_router(admin_routes.router, prefix="/api", tags=["admin"])
 app.include_router(wellness_routes.router, prefix="/api/wellness", tags=["wellness"])
 
+# Sampled request tracing (the routers' TracedRoute adds the per-phase spans)
+if settings.tracing_enabled:
+    app.add_middleware(tracing.TracingMiddleware, sample_rate=settings.tracing_sample_rate)
+    tracing.instrument_engine(engine)
+
+# Slow-query log (see /api/admin/slow-queries)
+if settings.slow_query_enabled:
+    slow_queries.slow_query_log.configure(
+        settings.slow_query_threshold_seconds,
+        settings.slow_query_explain_after,
+        settings.slow_query_max_shapes
+    )
+    app.add_middleware(slow_queries.SlowQueryMiddleware)
+    slow_queries.instrument_engine(engine)
+
+# On-demand profiling of flagged admin requests (see app/core/profiling.py)
+if settings.profiling_enabled:
+    profiling.store.configure(settings.profiling_dir, settings.profiling_max_profiles)
+    app.add_middleware(
+        profiling.ProfilingMiddleware,
+        interval=settings.profiling_interval_seconds,
+        max_seconds=settings.profiling_max_seconds
+    )
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and check connections on startup"""
@@ -65,12 +114,121 @@ async def startup_event():
         logger.error(f"❌ Failed to initialize database: {e}")
         raise RuntimeError(f"Database initialization failed: {e}")
     
+    # Start background jobs
+    scheduler.register_job(
+        "facet_reconcile",
+        settings.facet_reconcile_interval_seconds,
+        scheduler.with_session(reconcile_facets),
+        run_on_start=True,
+        exclusive=True
+    )
+    scheduler.register_job(
+        "question_stats_refresh",
+        settings.question_stats_refresh_interval_seconds,
+        scheduler.with_session(refresh_question_stats),
+        run_on_start=True
+    )
+    scheduler.register_job(
+        "related_index_sync",
+        settings.related_index_sync_interval_seconds,
+        scheduler.with_session(sync_related_index),
+        run_on_start=True
+    )
+    scheduler.register_job(
+        "notification_unread_reconcile",
+        settings.notification_unread_reconcile_interval_seconds,
+        scheduler.with_session(reconcile_unread_counts),
+        run_on_start=True,
+        exclusive=True
+    )
+    scheduler.register_job(
+        "notification_retention",
+        settings.notification_retention_interval_seconds,
+        scheduler.with_session(run_notification_retention),
+        exclusive=True
+    )
+    scheduler.register_job(
+        "outbox_purge",
+        settings.outbox_purge_interval_seconds,
+        scheduler.with_session(outbox.purge_processed_events),
+        exclusive=True
+    )
+    scheduler.register_job(
+        "analytics_rollup",
+        settings.analytics_rollup_interval_seconds,
+        scheduler.with_session(refresh_analytics_rollups),
+        run_on_start=True,
+        exclusive=True
+    )
+    scheduler.register_job(
+        "activity_flush",
+        settings.activity_flush_interval_seconds,
+        scheduler.with_session(flush_activity)
+    )
+    scheduler.register_job(
+        "milestone_unlock",
+        settings.milestone_unlock_interval_seconds,
+        scheduler.with_session(run_milestone_unlocks),
+        exclusive=True
+    )
+    if settings.slow_query_enabled:
+        scheduler.register_job(
+            "slow_query_explain",
+            settings.slow_query_explain_interval_seconds,
+            scheduler.with_session(slow_queries.slow_query_log.explain_pending)
+        )
+    await scheduler.start_jobs()
+    
+    # Start the real-time push hub
+    await hub.start(create_backend(settings.pubsub_backend, settings.pubsub_socket_dir, settings.database_uri))
+    
+    # Share metrics with the other workers
+    if settings.metrics_served:
+        metrics.writer.configure(settings.metrics_multiprocess_dir, settings.metrics_write_interval_seconds)
+        await metrics.writer.start()
+    if settings.tracing_enabled:
+        tracing.exporter.configure(
+            settings.tracing_export_path,
+            settings.tracing_otlp_endpoint,
+            settings.tracing_export_interval_seconds
+        )
+        await tracing.exporter.start()
+    
+    # Health probing (see /health/ready)
+    health.prober.configure(
+        engine,
+        interval=settings.health_probe_interval_seconds,
+        timeout=settings.health_probe_timeout_seconds,
+        stale_after=settings.health_stale_after_seconds,
+        pool_saturation=settings.health_pool_saturation
+    )
+    await health.prober.start()
+    
+    # Start the outbox dispatcher
+    outbox.dispatcher.configure(
+        batch_size=settings.outbox_batch_size,
+        poll_interval=settings.outbox_poll_interval_seconds,
+        max_attempts=settings.outbox_max_attempts,
+        retry_base_seconds=settings.outbox_retry_base_seconds
+    )
+    await outbox.dispatcher.start()
+    
     logger.info(f"🚀 Psychology App API started in {settings.environment} mode")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down Psychology App API...")
+    await scheduler.stop_jobs()
+    await outbox.dispatcher.stop()
+    try:
+        await asyncio.to_thread(scheduler.with_session(flush_activity))
+    except Exception as e:
+        logger.error(f"Failed to flush activity on shutdown: {e}")
+    await hub.stop()
+    await metrics.writer.stop()
+    await tracing.exporter.stop()
+    await health.prober.stop()
 
 @app.get("/")
 async def root():
@@ -83,25 +241,45 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
-    """Health check endpoint"""
-    try:
-        # Test database connection
-        from sqlalchemy import text
-        db.execute(text("SELECT 1"))
-        
-        return {
-            "status": "healthy",
-            "database": "connected",
-            "environment": settings.environment,
-            "timestamp": "2024-01-01T00:00:00Z"  # Will be actual timestamp in production
-        }
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
+async def health_check():
+    """Health check endpoint: the cached database probe; pool saturation only affects /health/ready"""
+    readiness = health.prober.readiness()
+    if not readiness["healthy"]:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Service unhealthy - database connection failed"
+            detail=f"Service unhealthy - {'; '.join(readiness['reasons'])}"
         )
+    return {
+        "status": "healthy",
+        "database": "connected",
+        "environment": settings.environment,
+        "timestamp": readiness["database"]["last_probe_at"]
+    }
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is serving requests; never touches the database"""
+    return health.prober.liveness()
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness from the background database probe and pool usage"""
+    readiness = health.prober.readiness()
+    return JSONResponse(
+        readiness,
+        status_code=status.HTTP_200_OK if readiness["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request):
+    """Prometheus metrics for this worker, or all workers with metrics_multiprocess_dir set"""
+    if not settings.metrics_served:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if settings.metrics_token and not hmac.compare_digest(
+        request.headers.get("authorization", "").encode(), f"Bearer {settings.metrics_token}".encode()
+    ):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.exposition(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/api/info")
 async def api_info():
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Delete or archive old read notifications in throttled batches.
+
+The API runs the same compaction hourly (notification_retention_* settings);
+use this for a one-off cleanup or to catch up on a large backlog. Both take
+the same lock, so this refuses to start while the job is running.
+
+Usage:
+    python purge_notifications.py --days 90
+    python purge_notifications.py --days 30 --archive --batch-size 5000 --pause 0
+"""
+
+import argparse
+import sys
+import os
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import SessionLocal, advisory_lock, init_db
+# Import models in correct order (User first, then models that reference User)
+from app.models.user_model import User
+from app.models.content_model import Content
+from app.models.comment_model import Comment
+from app.models.question_model import Question, QuestionComment, QuestionLike, QuestionSave
+from app.models.notification_model import Notification, NotificationCounter, NotificationArchive
+from app.services.notification_retention import compact_notifications
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Delete or archive old read notifications")
+    parser.add_argument("--days", type=int, default=settings.notification_retention_days,
+                        help="Only touch read notifications not updated for this many days")
+    parser.add_argument("--archive", action="store_true", help="Move rows to notifications_archive instead of deleting")
+    parser.add_argument("--batch-size", type=int, default=settings.notification_retention_batch_size)
+    parser.add_argument("--pause", type=float, default=settings.notification_retention_pause_seconds,
+                        help="Seconds to sleep between batches")
+    args = parser.parse_args()
+
+    print("Notification Retention")
+    print("=" * 40)
+
+    init_db()
+
+    # Same lock as the scheduled notification_retention job, so the two never overlap
+    with advisory_lock("job:notification_retention") as acquired:
+        if not acquired:
+            print("Notification retention is already running; try again later")
+            return
+
+        db = SessionLocal()
+        try:
+            result = compact_notifications(
+                db,
+                older_than_days=args.days,
+                archive=args.archive,
+                batch_size=args.batch_size,
+                pause_seconds=args.pause
+            )
+            rate = result.processed / result.seconds if result.seconds else 0
+            action = "Archived" if args.archive else "Deleted"
+            print(f"{action} {result.processed} notifications in {result.batches} batches")
+            print(f"Elapsed {result.seconds:.1f}s ({rate:,.0f} rows/s)")
+        except Exception as e:
+            db.rollback()
+            print(f"Error compacting notifications: {e}")
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    main()